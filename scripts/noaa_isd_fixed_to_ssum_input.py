@@ -0,0 +1,283 @@
+# noaa_isd_fixed_to_ssum_input.py
+import os
+import re
+import gzip
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import noaa_isd_to_ssum_input
+
+OUT_SUFFIX = "_SSUM_INPUT.csv"
+
+# raw ISD archive files: <USAF>-<WBAN>-<YEAR>.gz, one station-year each
+ISD_NAME = re.compile(r"^(?P<station>.+?)(?:-(?P<year>\d{4}))?(?:\.gz)?$")
+
+# fixed offsets (0-based, end exclusive) of the ISD control and mandatory data sections
+DATE = (15, 27)  # YYYYMMDDHHMM
+TMP = (87, 92)  # +TTTT, scaled by 10
+DEW = (93, 98)
+MANDATORY_END = 105
+
+# the additional data section starts at 105 with "ADD" and runs to the remarks ("REM") or
+# element quality ("EQD") section, or the end of the record. AA1 (liquid precipitation: PP period
+# hours, DDDD depth, C condition, Q quality) can sit anywhere in it (after AA2, AJ1, ...)
+ADD_TAG = b"ADD"
+ADD_END_TAGS = (b"REM", b"EQD")
+AA1_TAG = b"AA1"
+AA1_DEPTH = (5, 9)  # offsets from the AA1 tag
+
+
+def _station_of(path):
+    m = ISD_NAME.match(os.path.basename(path))
+    return m.group("station")
+
+
+def _discover(paths):
+    # station -> raw ISD files, sorted by name (year order for archive names)
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for d, _, names in os.walk(p):
+                files += [os.path.join(d, f) for f in names if f.endswith(".gz")]
+        elif os.path.isfile(p):
+            files.append(p)
+        else:
+            raise SystemExit(f"Not a directory or ISD file: {p}")
+    stations = {}
+    for f in files:
+        stations.setdefault(_station_of(f), []).append(f)
+    return {s: sorted(fs, key=os.path.basename) for s, fs in sorted(stations.items())}
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        gz = f.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if gz else open(path, "rb")) as f:
+        return np.frombuffer(f.read(), dtype=np.uint8)
+
+
+def _lines(data):
+    # (start, end) byte offsets of every line, without "\n" / "\r\n"
+    nl = np.flatnonzero(data == ord("\n"))
+    starts = np.concatenate(([0], nl + 1))
+    ends = np.concatenate((nl, [len(data)]))
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if len(ends):
+        ends = ends - (data[ends - 1] == ord("\r"))
+    return starts, ends
+
+
+def _digits(data, starts, ends, lo, hi):
+    # fixed-offset decimal field of every line -> (int64 values, all-digit mask)
+    v = np.zeros(len(starts), dtype=np.int64)
+    ok = ends >= starts + hi
+    last = max(len(data) - 1, 0)
+    for k in range(lo, hi):
+        c = data[np.minimum(starts + k, last)].astype(np.int64) - ord("0")
+        ok &= (c >= 0) & (c <= 9)
+        v = v * 10 + c
+    return v, ok
+
+
+def _times(data, starts, ends):
+    # DATE + TIME -> UTC ns; invalid or incomplete dates are NaT (dropped, as in the CSV reader)
+    lo, _ = DATE
+    year, ok = _digits(data, starts, ends, lo, lo + 4)
+    fields = [year]
+    for a in range(lo + 4, lo + 12, 2):
+        v, good = _digits(data, starts, ends, a, a + 2)
+        fields.append(v)
+        ok &= good
+    year, month, day, hour, minute = fields
+    ok &= (month >= 1) & (month <= 12) & (hour < 24) & (minute < 60) & (day >= 1)
+    t = np.full(len(starts), np.iinfo(np.int64).min, dtype=np.int64)
+    if ok.any():
+        months = ((year[ok] - 1970) * 12 + month[ok] - 1).astype("M8[M]")
+        first = months.astype("M8[D]")
+        days = ((months + 1).astype("M8[D]") - first).astype(np.int64)
+        good = day[ok] <= days
+        ns = (first + (day[ok] - 1)).astype("M8[ns]").astype(np.int64)
+        ns += (hour[ok] * 3600 + minute[ok] * 60) * 1_000_000_000
+        idx = np.flatnonzero(ok)[good]
+        t[idx] = ns[good]
+    return t
+
+
+def _temps(data, starts, ends, field):
+    # "+TTTT" -> degrees C; 9999 and malformed values are missing
+    lo, hi = field
+    v, ok = _digits(data, starts, ends, lo + 1, hi)
+    sign = data[np.minimum(starts + lo, max(len(data) - 1, 0))]
+    ok &= (sign == ord("+")) | (sign == ord("-"))
+    v = np.where(sign == ord("-"), -v, v)
+    return np.where(ok & (np.abs(v) != 9999), v / 10.0, np.nan)
+
+
+def _find(data, tag):
+    # sorted byte offsets of every occurrence of `tag`
+    hit = np.ones(max(len(data) - len(tag) + 1, 0), dtype=bool)
+    for k, b in enumerate(tag):
+        hit &= data[k : len(data) - len(tag) + 1 + k] == b
+    return np.flatnonzero(hit)
+
+
+def _first_at(pos, lo, hi):
+    # per line, the first of the sorted offsets `pos` in [lo, hi); -1 if none
+    k = np.searchsorted(pos, lo, side="left")
+    at = pos[np.minimum(k, max(len(pos) - 1, 0))] if len(pos) else np.zeros(len(lo), dtype=np.int64)
+    return np.where((k < len(pos)) & (at < hi), at, -1)
+
+
+def _precip(data, starts, ends, depth_scale_mm):
+    # AA1 depth (0.1 mm units by default) -> mm; no AA1 element in the additional data section,
+    # 9999 or malformed -> 0
+    body = starts + MANDATORY_END + len(ADD_TAG)
+    add = ends >= body
+    last = max(len(data) - 1, 0)
+    for k, b in enumerate(ADD_TAG):
+        add &= data[np.minimum(starts + MANDATORY_END + k, last)] == b
+    section_end = ends.copy()
+    for tag in ADD_END_TAGS:
+        at = _first_at(_find(data, tag), body, ends)
+        section_end = np.where(at >= 0, np.minimum(section_end, at), section_end)
+    aa1 = _first_at(_find(data, AA1_TAG), body, section_end)
+    tag = add & (aa1 >= 0)
+    aa1 = np.where(tag, aa1, starts)
+    lo, hi = AA1_DEPTH
+    v, ok = _digits(data, aa1, np.where(tag, section_end, aa1), lo, hi)
+    ok &= tag & (v != 9999)
+    mm = v.astype(float) * float(depth_scale_mm)
+    return np.where(ok & np.isfinite(mm) & (mm >= 0), mm, 0.0)
+
+
+def decode(path, depth_scale_mm=0.1):
+    # one raw ISD file -> (time ns, temperature_C, dewpoint_C, precip_mm) for its valid records
+    data = _read_bytes(path)
+    starts, ends = _lines(data)
+    full = ends - starts >= MANDATORY_END
+    starts, ends = starts[full], ends[full]
+    t = _times(data, starts, ends)
+    keep = t != np.iinfo(np.int64).min
+    starts, ends = starts[keep], ends[keep]
+    return (
+        t[keep],
+        _temps(data, starts, ends, TMP),
+        _temps(data, starts, ends, DEW),
+        _precip(data, starts, ends, depth_scale_mm),
+    )
+
+
+def _merge(parts, args):
+    # decoded station-year files (in file order) -> one time-sorted SSUM input frame; equal
+    # times keep file order
+    t, Tc, Tdc, Pmm = (np.concatenate([p[i] for p in parts]) for i in range(4))
+    order = np.argsort(t, kind="stable")
+    time = pd.DatetimeIndex(t[order].view("M8[ns]")).tz_localize("UTC")
+    return noaa_isd_to_ssum_input._ssum_frame(time, Tc[order], Tdc[order], Pmm[order], args)
+
+
+def convert_station(files, args):
+    # station-year files -> one time-sorted SSUM input frame
+    return _merge([decode(f, args.precip_depth_scale_mm) for f in files], args)
+
+
+def _decode_file(job):
+    path, depth_scale_mm = job
+    try:
+        return decode(path, depth_scale_mm)
+    except (Exception, SystemExit) as e:
+        return f"{os.path.basename(path)}: {e}"
+
+
+def _write_station(job):
+    station, name, parts, out_dir, args = job
+    errors = [p for p in parts if isinstance(p, str)]
+    if errors:
+        return {"station": station, "files": len(parts), "error": "; ".join(errors)}
+    out_path = os.path.join(out_dir, name + OUT_SUFFIX)
+    try:
+        out = _merge(parts, args)
+        out.to_csv(out_path, index=False)
+    except (Exception, SystemExit) as e:
+        return {"station": station, "files": len(parts), "error": str(e)}
+    return {"station": station, "files": len(parts), "rows": len(out), "out": out_path}
+
+
+def _parse_names(items):
+    # STATION=NAME -> {station: name}
+    names = {}
+    for item in items or []:
+        station, sep, name = item.partition("=")
+        if not sep or not station or not name:
+            raise SystemExit(f"Bad --names {item!r} (expected STATION=NAME)")
+        names[station] = name
+    return names
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    # raw fixed-width ISD files (.gz or plain) or directories searched for *.gz
+    ap.add_argument("--in", dest="in_paths", nargs="+", required=True)
+    ap.add_argument("--out_dir", required=True)
+    ap.add_argument("--workers", type=int, default=None)
+    # output stems, e.g. 726400-14839=Milwaukee_2024; default is the station part of the file name
+    ap.add_argument("--names", nargs="+", default=None)
+
+    ap.add_argument("--precip_depth_scale_mm", type=float, default=0.1)
+
+    ap.add_argument("--snow_temp_c", type=float, default=0.0)
+    ap.add_argument("--snow_ratio", type=float, default=10.0)
+
+    args = ap.parse_args()
+    names = _parse_names(args.names)
+
+    stations = _discover(args.in_paths)
+    if not stations:
+        raise SystemExit(f"No ISD files found in: {args.in_paths}")
+    stems = [names.get(s, s) for s in stations]
+    dup = sorted({n for n in stems if stems.count(n) > 1})
+    if dup:
+        raise SystemExit(f"Duplicate output names: {dup}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    # every station-year file is decoded as its own job, so a single multi-year station is
+    # spread over the workers too; each station's files are then merged and written as one job
+    files = [(f, args.precip_depth_scale_mm) for fs in stations.values() for f in fs]
+
+    def station_jobs(decoded):
+        jobs, k = [], 0
+        for (s, fs), n in zip(stations.items(), stems):
+            jobs.append((s, n, decoded[k : k + len(fs)], args.out_dir, args))
+            k += len(fs)
+        return jobs
+
+    workers = args.workers or os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(files)))
+    if workers == 1:
+        results = [_write_station(j) for j in station_jobs([_decode_file(f) for f in files])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            decoded = list(ex.map(_decode_file, files))
+            results = list(ex.map(_write_station, station_jobs(decoded)))
+
+    failed = [r for r in results if "error" in r]
+    print("NOAA ISD (fixed-width) -> SSUM inputs written")
+    print(f"Stations: {len(results)} (failed: {len(failed)})")
+    print(f"Files: {sum(r['files'] for r in results)}")
+    print(f"Workers: {workers}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['station']}: ERROR {r['error']}")
+        else:
+            print(f"  {r['station']}: files={r['files']} rows={r['rows']} saved={r['out']}")
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import os
+import json
+import heapq
+import shutil
 import argparse
+import tempfile
 import pandas as pd
 import numpy as np
 
+import ssum_snow_profile
+
 EPS = 1e-12
 
 def parse_isd_temp_c(x):
@@ -43,6 +50,69 @@ def parse_aa_precip_mm(x, depth_scale_mm=0.1):
     except Exception:
         return 0.0
 
+def _code_matrix(values, width):
+    # (n, width) uint32 code points, zero padded / truncated
+    u = np.asarray(values, dtype=str)
+    w = max(1, u.dtype.itemsize // 4)
+    m = u.view(np.uint32).reshape(len(u), w)
+    if w >= width:
+        return m[:, :width]
+    return np.pad(m, ((0, 0), (0, width - w)))
+
+def _is_digit(c):
+    return (c >= ord("0")) & (c <= ord("9"))
+
+def _split_notna(col):
+    # object values plus indices of non-null cells; non-string cells never match
+    # the canonical fixed layouts below, so they always reach the scalar parsers
+    raw = np.asarray(col, dtype=object)
+    return raw, np.flatnonzero(~pd.isna(raw))
+
+def parse_isd_temp_c_array(col):
+    # vectorized parse_isd_temp_c for the canonical "+TTTT,Q" form; other cells use the scalar parser
+    raw, si = _split_notna(col)
+    out = np.full(len(raw), np.nan)
+    oi = si[:0]
+    if len(si):
+        vals = np.asarray(raw[si], dtype=str)
+        m = _code_matrix(vals, 6)
+        lens = np.char.str_len(vals)
+        sign = m[:, 0]
+        ok = (sign == ord("+")) | (sign == ord("-"))
+        ok &= _is_digit(m[:, 1]) & _is_digit(m[:, 2]) & _is_digit(m[:, 3]) & _is_digit(m[:, 4])
+        ok &= (lens == 5) | (m[:, 5] == ord(","))
+        d = m[:, 1:5].astype(np.int64) - ord("0")
+        v = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+        v = np.where(sign == ord("-"), -v, v)
+        fast = np.where(np.abs(v) == 9999, np.nan, v / 10.0)
+        out[si[ok]] = fast[ok]
+        oi = si[~ok]
+    for i in oi:
+        out[i] = parse_isd_temp_c(raw[i])
+    return out
+
+def parse_aa_precip_mm_array(col, depth_scale_mm=0.1):
+    # vectorized parse_aa_precip_mm for the canonical "PP,DDDD,C,Q" form; other cells use the scalar parser
+    raw, si = _split_notna(col)
+    out = np.zeros(len(raw), dtype=float)
+    oi = si[:0]
+    if len(si):
+        vals = np.asarray(raw[si], dtype=str)
+        m = _code_matrix(vals, 8)
+        lens = np.char.str_len(vals)
+        ok = (m[:, 0] != ord(",")) & (m[:, 1] != ord(",")) & (m[:, 2] == ord(","))
+        ok &= _is_digit(m[:, 3]) & _is_digit(m[:, 4]) & _is_digit(m[:, 5]) & _is_digit(m[:, 6])
+        ok &= (lens == 7) | (m[:, 7] == ord(","))
+        d = m[:, 3:7].astype(np.int64) - ord("0")
+        v = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+        mm = v.astype(float) * float(depth_scale_mm)
+        mm[(v == 9999) | ~np.isfinite(mm) | (mm < 0)] = 0.0
+        out[si[ok]] = mm[ok]
+        oi = si[~ok]
+    for i in oi:
+        out[i] = parse_aa_precip_mm(raw[i], depth_scale_mm)
+    return out
+
 def rh_from_t_td(Tc, Tdc):
     Tc = np.asarray(Tc, dtype=float)
     Tdc = np.asarray(Tdc, dtype=float)
@@ -59,6 +129,122 @@ def rh_from_t_td(Tc, Tdc):
     rh[m] = r
     return rh
 
+OUT_COLS = ["time", "temperature_C", "humidity_pct", "snowfall_cm", "precip_mm", "dewpoint_C"]
+
+def _convert_frame(df, args, prof=None):
+    prof = prof or ssum_snow_profile.NULL
+    df = df.copy()
+    with prof.stage("time_parsing", len(df)):
+        df["time"] = pd.to_datetime(df["DATE"], errors="coerce", utc=True)
+        df = df.dropna(subset=["time"]).sort_values("time", kind="stable").reset_index(drop=True)
+
+    with prof.stage("value_parsing", len(df)):
+        return _convert_values(df, args)
+
+def _convert_values(df, args):
+    Tc = parse_isd_temp_c_array(df["TMP"])
+    Tdc = parse_isd_temp_c_array(df["DEW"])
+
+    if args.precip_col in df.columns:
+        Pmm = parse_aa_precip_mm_array(df[args.precip_col], args.precip_depth_scale_mm)
+    else:
+        Pmm = np.zeros(len(df), dtype=float)
+
+    return _ssum_frame(df["time"], Tc, Tdc, Pmm, args)
+
+def _ssum_frame(time, Tc, Tdc, Pmm, args):
+    # decoded ISD values (time-sorted) -> SSUM input columns; shared with the fixed-width reader
+    Tc = np.asarray(Tc, dtype=float)
+    Pmm = np.asarray(Pmm, dtype=float)
+
+    snow_mask = np.isfinite(Tc) & (Tc <= float(args.snow_temp_c)) & (Pmm > 0.0)
+    water_cm = Pmm / 10.0
+    snowfall_cm = np.zeros(len(Tc), dtype=float)
+    snowfall_cm[snow_mask] = water_cm[snow_mask] * float(args.snow_ratio)
+
+    return pd.DataFrame(
+        {
+            "time": time,
+            "temperature_C": Tc,
+            "humidity_pct": rh_from_t_td(Tc, Tdc),
+            "snowfall_cm": snowfall_cm,
+            "precip_mm": Pmm,
+            "dewpoint_C": np.asarray(Tdc, dtype=float),
+        },
+        columns=OUT_COLS,
+    )
+
+def _time_key(line):
+    # output times are UTC ISO strings, so text order is time order
+    return line.split(",", 1)[0]
+
+def _convert_chunked(args, prof=None):
+    prof = prof or ssum_snow_profile.NULL
+    header = pd.read_csv(args.in_path, nrows=0).columns
+    need = ["DATE", "TMP", "DEW"]
+    miss = [c for c in need if c not in header]
+    if miss:
+        raise SystemExit(f"Missing required columns: {miss}")
+    usecols = need + ([args.precip_col] if args.precip_col in header else [])
+
+    tmp_dir = None
+    runs = []
+    run0_header = False
+    last_key = None
+    rows = 0
+    reader = pd.read_csv(args.in_path, usecols=usecols, chunksize=int(args.chunk_rows), low_memory=False)
+    try:
+        while True:
+            with prof.stage("read_csv"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            out = _convert_frame(chunk, args, prof)
+            if len(out) == 0:
+                continue
+            with prof.stage("csv_write", len(out)):
+                text = out.to_csv(index=False, header=False)
+            if not runs and (last_key is None or _time_key(text) >= last_key):
+                # input still in time order: append straight to the output
+                with open(args.out_path, "a" if rows else "w", encoding="utf-8", newline="") as f:
+                    if not rows:
+                        f.write(",".join(OUT_COLS) + "\n")
+                    f.write(text)
+            else:
+                # out-of-order input: spill sorted runs and merge them at the end
+                if tmp_dir is None:
+                    out_dir = os.path.dirname(os.path.abspath(args.out_path))
+                    tmp_dir = tempfile.mkdtemp(prefix="ssum_isd_", dir=out_dir)
+                    if rows:
+                        runs.append(os.path.join(tmp_dir, "run_00000.csv"))
+                        os.replace(args.out_path, runs[0])
+                        run0_header = True
+                run = os.path.join(tmp_dir, f"run_{len(runs) + 1:05d}.csv")
+                with open(run, "w", encoding="utf-8", newline="") as f:
+                    f.write(text)
+                runs.append(run)
+            last_key = _time_key(text.rstrip("\n").rsplit("\n", 1)[-1])
+            rows += len(out)
+
+        if not rows:
+            pd.DataFrame(columns=OUT_COLS).to_csv(args.out_path, index=False)
+        elif runs:
+            files = [open(r, "r", encoding="utf-8", newline="") for r in runs]
+            try:
+                if run0_header:
+                    files[0].readline()
+                with open(args.out_path, "w", encoding="utf-8", newline="") as f:
+                    f.write(",".join(OUT_COLS) + "\n")
+                    # heapq.merge is stable: equal times keep input order
+                    f.writelines(heapq.merge(*files, key=_time_key))
+            finally:
+                for fh in files:
+                    fh.close()
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return rows
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", required=True)
@@ -70,44 +256,47 @@ def main():
     ap.add_argument("--snow_temp_c", type=float, default=0.0)
     ap.add_argument("--snow_ratio", type=float, default=10.0)
 
-    args = ap.parse_args()
-
-    df = pd.read_csv(args.in_path, low_memory=False)
-
-    need = ["DATE", "TMP", "DEW"]
-    miss = [c for c in need if c not in df.columns]
-    if miss:
-        raise SystemExit(f"Missing required columns: {miss}")
-
-    df["time"] = pd.to_datetime(df["DATE"], errors="coerce", utc=True)
-    df = df.dropna(subset=["time"]).sort_values("time").reset_index(drop=True)
+    # convert in chunks of this many ISD rows (bounded memory for very large exports)
+    ap.add_argument("--chunk_rows", type=int, default=None)
 
-    df["temperature_C"] = df["TMP"].apply(parse_isd_temp_c)
-    df["dewpoint_C"] = df["DEW"].apply(parse_isd_temp_c)
+    # per-stage wall / CPU / peak RSS into <out>_timings.json; optional cProfile dump
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--cprofile", default=None, help="write cProfile stats to this path")
 
-    df["humidity_pct"] = rh_from_t_td(df["temperature_C"].values, df["dewpoint_C"].values)
-
-    if args.precip_col in df.columns:
-        df["precip_mm"] = df[args.precip_col].apply(lambda x: parse_aa_precip_mm(x, args.precip_depth_scale_mm))
-    else:
-        df["precip_mm"] = 0.0
+    args = ap.parse_args()
+    prof = ssum_snow_profile.Profiler(enabled=args.profile)
 
-    Tc = df["temperature_C"].astype(float).values
-    Pmm = df["precip_mm"].astype(float).values
+    with ssum_snow_profile.cprofile(args.cprofile):
+        if args.chunk_rows:
+            rows = _convert_chunked(args, prof)
+        else:
+            with prof.stage("read_csv"):
+                df = pd.read_csv(args.in_path, low_memory=False)
 
-    snow_mask = np.isfinite(Tc) & (Tc <= float(args.snow_temp_c)) & (Pmm > 0.0)
-    water_cm = Pmm / 10.0
-    snowfall_cm = np.zeros(len(df), dtype=float)
-    snowfall_cm[snow_mask] = water_cm[snow_mask] * float(args.snow_ratio)
+            need = ["DATE", "TMP", "DEW"]
+            miss = [c for c in need if c not in df.columns]
+            if miss:
+                raise SystemExit(f"Missing required columns: {miss}")
 
-    df["snowfall_cm"] = snowfall_cm
+            out = _convert_frame(df, args, prof)
+            rows = len(out)
 
-    out = df[["time", "temperature_C", "humidity_pct", "snowfall_cm", "precip_mm", "dewpoint_C"]].copy()
+            with prof.stage("csv_write", rows):
+                out.to_csv(args.out_path, index=False)
 
-    out.to_csv(args.out_path, index=False)
     print("NOAA -> SSUM input written")
-    print(f"Rows: {len(out)}")
+    print(f"Rows: {rows}")
     print(f"Saved: {args.out_path}")
 
+    if args.profile:
+        timings_path = os.path.splitext(args.out_path)[0] + "_timings.json"
+        with open(timings_path, "w", encoding="utf-8") as f:
+            json.dump({"timings": prof.to_dict(rows=rows)}, f, indent=2)
+        print("Timings:")
+        prof.print()
+        print(f"Saved: {timings_path}")
+    if args.cprofile:
+        print(f"Saved: {args.cprofile}")
+
 if __name__ == "__main__":
     main()
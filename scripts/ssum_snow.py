@@ -5,6 +5,14 @@ import argparse
 import numpy as np
 import pandas as pd
 
+import ssum_snow_io
+import ssum_snow_core
+import ssum_snow_cache
+import ssum_snow_compact
+import ssum_snow_chunked
+import ssum_snow_corridors
+import ssum_snow_profile
+
 EPS = 1e-12
 
 
@@ -27,53 +35,37 @@ def _segment_ids(t: pd.Series, gap_hours: float) -> pd.Series:
     return cut.cumsum().astype(int)
 
 
-def _rolling_range(x: pd.Series, win: int) -> pd.Series:
-    mp = max(6, win // 3)
-    rmax = x.rolling(win, min_periods=mp).max()
-    rmin = x.rolling(win, min_periods=mp).min()
-    return (rmax - rmin)
-
-
-def _compute_feats_by_segment(df: pd.DataFrame, win: int, win_stress: int) -> pd.DataFrame:
-    def apply_one(g):
-        temp = g["temperature_C"].astype(float)
-        rh = g["humidity_pct"].astype(float)
-
-        dT = _rolling_range(temp, win)
-        dH = _rolling_range(rh, win)
-
-        # Core Potential (CP)
-        cp = (dT * dH) / float(max(1, win))
-
-        # Structural stress: rolling sum of CP "jerk"
-        cp_jerk = cp.diff().abs()
-        mp_stress = max(6, int(win_stress) // 3)
-        s_struct = cp_jerk.rolling(int(win_stress), min_periods=mp_stress).sum()
-
-        return pd.DataFrame({"CP": cp, "S_struct": s_struct}, index=g.index)
-
-    gb = df.groupby("segment_id", group_keys=False)
-    try:
-        feats = gb.apply(apply_one, include_groups=False)
-    except TypeError:
-        feats = gb.apply(apply_one)
-    return feats
+def _compute_feats_by_segment(df: pd.DataFrame, win: int, win_stress: int, time_windows=False) -> pd.DataFrame:
+    cp, s_struct = ssum_snow_core.features(
+        df["segment_id"].to_numpy(),
+        df["temperature_C"].to_numpy(dtype=float),
+        df["humidity_pct"].to_numpy(dtype=float),
+        win,
+        win_stress,
+        ssum_snow_io._to_epoch_ns(df["time"]) if time_windows else None,
+    )
+    return pd.DataFrame({"CP": cp, "S_struct": s_struct}, index=df.index)
 
 
-def _pack_rows(dfx):
+def _pack_rows(df, idx):
+    times = df["time"].iloc[idx]
+    cols = {
+        c: df[c].to_numpy()
+        for c in ["CP", "SCE", "S_struct", "admissible", "snowfall_cm", "depth_est_cm", "corridor_score", "segment_id"]
+    }
     rows = []
-    for _, r in dfx.iterrows():
+    for t, i in zip(times, idx):
         rows.append(
             {
-                "time": str(r["time"]),
-                "CP": _safe_float(r["CP"]),
-                "SCE": _safe_float(r["SCE"]),
-                "S_struct": _safe_float(r["S_struct"]),
-                "admissible": bool(r["admissible"]),
-                "snowfall_cm": _safe_float(r["snowfall_cm"]),
-                "depth_est_cm": _safe_float(r["depth_est_cm"]),
-                "corridor_score": _safe_float(r["corridor_score"]),
-                "segment_id": int(r["segment_id"]),
+                "time": str(t),
+                "CP": _safe_float(cols["CP"][i]),
+                "SCE": _safe_float(cols["SCE"][i]),
+                "S_struct": _safe_float(cols["S_struct"][i]),
+                "admissible": bool(cols["admissible"][i]),
+                "snowfall_cm": _safe_float(cols["snowfall_cm"][i]),
+                "depth_est_cm": _safe_float(cols["depth_est_cm"][i]),
+                "corridor_score": _safe_float(cols["corridor_score"][i]),
+                "segment_id": int(cols["segment_id"][i]),
             }
         )
     return rows
@@ -94,159 +86,335 @@ def _print_row(label, r):
     )
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="in_path", required=True)
-    ap.add_argument("--out_dir", required=True)
-
-    ap.add_argument("--tct_window_hours", type=int, default=24)
-    # v1.2: ACTIVE. If omitted, defaults to tct_window_hours (matches v1.1 behavior).
-    ap.add_argument("--stress_window_hours", type=int, default=None)
-
-    ap.add_argument("--cp_threshold", type=float, default=0.08)
-    ap.add_argument("--s_max", type=float, default=2.5)
-    ap.add_argument("--k_depth", type=float, default=13.0)
-    ap.add_argument("--gap_hours", type=float, default=6.0)
-
-    args = ap.parse_args()
+def _read_input(src, prof=None) -> pd.DataFrame:
+    prof = prof or ssum_snow_profile.NULL
+    # round_trip parsing so values written by to_csv read back bit-for-bit
+    with prof.stage("read_csv"):
+        df = pd.read_csv(src, float_precision="round_trip")
+    return _prepare_input(df, prof)
 
-    df = pd.read_csv(args.in_path)
 
+def _prepare_input(df: pd.DataFrame, prof=None) -> pd.DataFrame:
+    prof = prof or ssum_snow_profile.NULL
     need = ["time", "temperature_C", "humidity_pct", "snowfall_cm"]
     missing = [c for c in need if c not in df.columns]
     if missing:
         raise SystemExit(f"Missing required columns: {missing}")
 
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    df = df.dropna(subset=["time"]).sort_values("time").reset_index(drop=True)
+    with prof.stage("time_parsing", len(df)):
+        df["time"] = pd.to_datetime(df["time"], errors="coerce")
+        df = df.dropna(subset=["time"]).sort_values("time").reset_index(drop=True)
+    return df
 
-    df["segment_id"] = _segment_ids(df["time"], args.gap_hours)
 
+def _params_from_args(args) -> dict:
     win = int(args.tct_window_hours)
-    win_stress = win if args.stress_window_hours is None else int(args.stress_window_hours)
-    feats = _compute_feats_by_segment(df, win, win_stress)
+    params = {
+        "tct_window_hours": win,
+        "stress_window_hours": win if args.stress_window_hours is None else int(args.stress_window_hours),
+        "cp_threshold": float(args.cp_threshold),
+        "s_max": float(args.s_max),
+        "k_depth": float(args.k_depth),
+        "gap_hours": float(args.gap_hours),
+    }
+    # only present when enabled, so default params (and summaries / cache keys) are unchanged
+    if getattr(args, "hourly", None):
+        params["hourly"] = args.hourly
+    if getattr(args, "time_windows", False):
+        params["window_mode"] = "time"
+    return params
+
+
+def _normalize_hourly(df: pd.DataFrame, rule: str, prof=None) -> pd.DataFrame:
+    # one row per observed hour, stamped at the start of the hour (ssum_snow_core.hourly_reduce:
+    # `rule` for state variables, the largest report for snowfall / precip, last row otherwise)
+    prof = prof or ssum_snow_profile.NULL
+    n = len(df)
+    with prof.stage("hourly_normalization", n):
+        hours, first = ssum_snow_core.hourly_bins(ssum_snow_io._to_epoch_ns(df["time"]))
+        last = np.r_[first[1:], n] - 1
+        out = {}
+        for c in df.columns:
+            col = df[c]
+            if c == "time":
+                t = pd.to_datetime(hours, unit="ns", utc=True)
+                tz = col.dt.tz
+                out[c] = t.tz_convert(tz) if tz is not None else t.tz_localize(None)
+            elif pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+                out[c] = ssum_snow_core.hourly_reduce(col.to_numpy(dtype=float), first, ssum_snow_core.hourly_rule(c, rule))
+            else:
+                out[c] = col.to_numpy()[last]
+        return pd.DataFrame(out, columns=df.columns)
+
+
+def _compute_features(df: pd.DataFrame, params: dict, prof=None) -> pd.DataFrame:
+    # segment_id, CP and S_struct: everything that depends on the window / gap params only
+    prof = prof or ssum_snow_profile.NULL
+    if params.get("hourly"):
+        df = _normalize_hourly(df, params["hourly"], prof)
+    n = len(df)
+    with prof.stage("segment_ids", n):
+        df["segment_id"] = _segment_ids(df["time"], params["gap_hours"])
+
+    win = int(params["tct_window_hours"])
+    win_stress = int(params["stress_window_hours"])
+    with prof.stage("compute_feats_by_segment", n):
+        feats = _compute_feats_by_segment(df, win, win_stress, params.get("window_mode") == "time")
 
     df["CP"] = feats["CP"]
     df["S_struct"] = feats["S_struct"]
+    return df
 
-    # Structural Confidence Envelope
-    # `SCE = exp(-S_struct)`
-    df["SCE"] = np.exp(-df["S_struct"].astype(float))
-    df.loc[pd.isna(df["S_struct"]), "SCE"] = np.nan
-
-    # Admissibility corridor rule
-    df["admissible"] = (
-        (df["CP"] >= float(args.cp_threshold))
-        & (df["S_struct"] <= float(args.s_max))
-        & (~pd.isna(df["CP"]))
-        & (~pd.isna(df["S_struct"]))
-    )
-
-    # Depth estimate (monotone in CP)
-    # `depth_est_cm = k_depth * log(CP + 1)`
-    df["depth_est_cm"] = float(args.k_depth) * np.log(df["CP"].astype(float) + 1.0)
-    df.loc[pd.isna(df["CP"]), "depth_est_cm"] = 0.0
-    df.loc[df["depth_est_cm"] < 0.0, "depth_est_cm"] = 0.0
-
-    # Optional min/max band using SCE (kept for continuity)
-    sce = df["SCE"].astype(float)
-    df["depth_min_cm"] = df["depth_est_cm"] * np.clip(sce, 0.0, 1.0)
-    df["depth_max_cm"] = df["depth_est_cm"] * (2.0 - np.clip(sce, 0.0, 1.0))
 
-    # NEW: Corridor Score (forecastable snow window score)
-    # `corridor_score = depth_est_cm * SCE`
-    df["corridor_score"] = df["depth_est_cm"].astype(float) * np.clip(sce, 0.0, 1.0)
-    df.loc[pd.isna(df["SCE"]), "corridor_score"] = np.nan
+def _compute_series(df: pd.DataFrame, params: dict, prof=None) -> pd.DataFrame:
+    prof = prof or ssum_snow_profile.NULL
+    df = _compute_features(df, params, prof)
+    with prof.stage("sce_admissibility", len(df)):
+        return _finish_series(df, params)
 
-    _make_outdir(args.out_dir)
-    series_path = os.path.join(args.out_dir, "series.csv")
-    summary_path = os.path.join(args.out_dir, "summary.json")
 
-    df.to_csv(series_path, index=False)
+def _finish_series(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+    cols = ssum_snow_core.finish(df["CP"].to_numpy(dtype=float), df["S_struct"].to_numpy(dtype=float), params)
+    for c, v in cols.items():
+        df[c] = v
+    return df
 
-    stable = df.dropna(subset=["CP", "S_struct", "SCE", "corridor_score"])
 
-    # Existing top lists
-    top_cp_df = stable.sort_values("CP", ascending=False).head(12)
-    top_depth_df = stable.sort_values("depth_est_cm", ascending=False).head(12)
+def _build_summary(df: pd.DataFrame, params: dict):
+    cp = df["CP"].to_numpy(dtype=float)
+    depth = df["depth_est_cm"].to_numpy(dtype=float)
+    corr = df["corridor_score"].to_numpy(dtype=float)
+    snow = df["snowfall_cm"].to_numpy(dtype=float) > 0.0
 
-    adm = stable[stable["admissible"]]
-    top_depth_adm_df = adm.sort_values("depth_est_cm", ascending=False).head(12)
-
-    snow_adm = adm[adm["snowfall_cm"].astype(float) > 0.0]
-    top_depth_snow_adm_df = snow_adm.sort_values("depth_est_cm", ascending=False).head(12)
-
-    # NEW top corridor score lists
-    top_corr_any_df = stable.sort_values("corridor_score", ascending=False).head(12)
-    top_corr_adm_df = adm.sort_values("corridor_score", ascending=False).head(12)
-    top_corr_snow_adm_df = snow_adm.sort_values("corridor_score", ascending=False).head(12)
-
-    # Observed snow events sample (for quick inspection)
-    obs_df = stable[stable["snowfall_cm"].astype(float) > 0.0].head(200)
+    stable = (
+        np.isfinite(cp)
+        & np.isfinite(df["S_struct"].to_numpy(dtype=float))
+        & np.isfinite(df["SCE"].to_numpy(dtype=float))
+        & np.isfinite(corr)
+    )
+    adm = stable & df["admissible"].to_numpy(dtype=bool)
+    snow_adm = adm & snow
+
+    tops = {
+        # Existing top lists
+        "top_CP": ssum_snow_core.top_k(cp, stable, 12),
+        "top_depth_any": ssum_snow_core.top_k(depth, stable, 12),
+        "top_depth_admissible": ssum_snow_core.top_k(depth, adm, 12),
+        "top_depth_admissible_snow": ssum_snow_core.top_k(depth, snow_adm, 12),
+        # NEW top corridor score lists
+        "top_corridor_any": ssum_snow_core.top_k(corr, stable, 12),
+        "top_corridor_admissible": ssum_snow_core.top_k(corr, adm, 12),
+        "top_corridor_admissible_snow": ssum_snow_core.top_k(corr, snow_adm, 12),
+        # Observed snow events sample (for quick inspection)
+        "observed_snow_events_first200": np.flatnonzero(stable & snow)[:200],
+    }
 
     summary = {
         "rows": int(len(df)),
         "start": str(df["time"].iloc[0]) if len(df) else None,
         "end": str(df["time"].iloc[-1]) if len(df) else None,
         "segments": int(df["segment_id"].nunique()),
-        "params": {
-            "tct_window_hours": int(args.tct_window_hours),
-            "stress_window_hours": int(win_stress),
-            "cp_threshold": float(args.cp_threshold),
-            "s_max": float(args.s_max),
-            "k_depth": float(args.k_depth),
-            "gap_hours": float(args.gap_hours),
-        },
-        "top_CP": _pack_rows(top_cp_df),
-        "top_depth_any": _pack_rows(top_depth_df),
-        "top_depth_admissible": _pack_rows(top_depth_adm_df),
-        "top_depth_admissible_snow": _pack_rows(top_depth_snow_adm_df),
-        "top_corridor_any": _pack_rows(top_corr_any_df),
-        "top_corridor_admissible": _pack_rows(top_corr_adm_df),
-        "top_corridor_admissible_snow": _pack_rows(top_corr_snow_adm_df),
-        "observed_snow_events_first200": _pack_rows(obs_df),
+        "params": dict(params),
     }
+    for key, idx in tops.items():
+        summary[key] = _pack_rows(df, idx)
 
-    with open(summary_path, "w", encoding="utf-8") as f:
-        json.dump(summary, f, indent=2)
+    return summary, tops
 
-    print("SSUM-Snow run complete")
-    print(f"Rows: {len(df)}")
-    print(f"Segments: {df['segment_id'].nunique()}")
-    print(f"Time: {df['time'].iloc[0]} -> {df['time'].iloc[-1]}")
-    print(f"Saved: {series_path}")
-    print(f"Saved: {summary_path}")
 
-    if len(top_depth_df) > 0:
-        _print_row("Top depth point (overall, may be inadmissible):", top_depth_df.iloc[0])
-    else:
-        print("Top depth point: none")
+def _print_tops(df, tops):
+    labels = [
+        ("top_depth_any", "Top depth point (overall, may be inadmissible):", "Top depth point: none"),
+        ("top_depth_admissible", "Top depth point (admissible corridor):", None),
+        ("top_depth_admissible_snow", "Top depth point (admissible + snowfall > 0):", None),
+        ("top_corridor_any", "Top corridor_score (overall):", None),
+        ("top_corridor_admissible", "Top corridor_score (admissible corridor):", None),
+        ("top_corridor_admissible_snow", "Top corridor_score (admissible + snowfall > 0):", None),
+    ]
+    for key, label, none_label in labels:
+        idx = tops[key]
+        if len(idx) > 0:
+            _print_row(label, df.iloc[idx[0]])
+        else:
+            print(none_label or f"{label[:-1]}: none")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", required=True)
+    ap.add_argument("--out_dir", required=True)
+
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    # v1.2: ACTIVE. If omitted, defaults to tct_window_hours (matches v1.1 behavior).
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+
+    # hourly normalization before the features (one row per observed hour, --hourly picks the
+    # rule for state variables) and time-based windows (window hours are hours of time, not rows)
+    ap.add_argument("--hourly", choices=ssum_snow_core.HOURLY_RULES, default=None)
+    ap.add_argument("--time_windows", action="store_true")
+
+    # series output format; npz/parquet store time as int64 epoch and are loaded without parsing
+    ap.add_argument("--format", choices=ssum_snow_io.FORMATS, default="csv")
+    ap.add_argument("--float32", action="store_true")
+
+    # per-stage wall / CPU / peak RSS into summary.json["timings"]; optional cProfile dump
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--cprofile", default=None, help="write cProfile stats to this path")
+
+    # segment_id / CP / S_struct cache keyed by input hash + window / gap params; a hit skips
+    # parsing and feature computation (threshold and k_depth changes still hit)
+    ap.add_argument("--cache_dir", default=None)
+    ap.add_argument("--cache_max_mb", type=float, default=ssum_snow_cache.DEFAULT_MAX_BYTES / 2**20)
+
+    # chunked read, features / summary / corridors in float64 blocks, series held and written in
+    # compact form (float32, bit-packed admissible, depth band on demand); precision bounds in
+    # ssum_snow_compact.py
+    ap.add_argument("--compact", action="store_true")
+    ap.add_argument(
+        "--memory_budget_mb",
+        type=float,
+        default=None,
+        help="pre-flight check: refuse inputs whose estimated peak (rows x measured bytes/row, scaled by "
+        "the input's extra columns) exceeds this; memory is not limited during the run",
+    )
+
+    # out-of-core run: time-sorted blocks of about this many rows, series.csv written block by
+    # block; outputs match the in-memory run (ssum_snow_chunked.py)
+    ap.add_argument("--chunk_rows", type=int, default=None)
 
-    if len(top_depth_adm_df) > 0:
-        _print_row("Top depth point (admissible corridor):", top_depth_adm_df.iloc[0])
-    else:
-        print("Top depth point (admissible corridor): none")
+    # corridors.csv: one row per contiguous admissible run (snow: admissible + snowfall > 0)
+    ap.add_argument("--corridors", choices=ssum_snow_corridors.MODES, default=None)
 
-    if len(top_depth_snow_adm_df) > 0:
-        _print_row("Top depth point (admissible + snowfall > 0):", top_depth_snow_adm_df.iloc[0])
-    else:
-        print("Top depth point (admissible + snowfall > 0): none")
+    args = ap.parse_args()
+    params = _params_from_args(args)
+    prof = ssum_snow_profile.Profiler(enabled=args.profile)
+
+    if args.compact and args.cache_dir:
+        raise SystemExit("--compact reads the input in chunks and does not use --cache_dir")
+    if args.chunk_rows:
+        clash = [
+            flag
+            for flag, on in (
+                ("--compact", args.compact),
+                ("--cache_dir", args.cache_dir),
+                ("--hourly", args.hourly),
+                ("--time_windows", args.time_windows),
+                ("--corridors", args.corridors),
+                (f"--format {args.format}", args.format != "csv"),
+            )
+            if on
+        ]
+        if clash:
+            raise SystemExit(f"--chunk_rows writes series.csv block by block and does not combine with {', '.join(clash)}")
+    estimated_peak = None
+    if args.memory_budget_mb is not None:
+        rows = ssum_snow_compact.count_rows(args.in_path)
+        estimated_peak = ssum_snow_compact.budget_check(
+            min(rows, args.chunk_rows) if args.chunk_rows else rows,
+            args.memory_budget_mb * 2**20,
+            args.compact,
+            chunked=bool(args.chunk_rows),
+            extra_per_row=ssum_snow_compact.extra_bytes_per_row(args.in_path, args.compact),
+        )
+
+    with ssum_snow_profile.cprofile(args.cprofile):
+        cache_hit = None
+        if args.chunk_rows:
+            df = None
+        elif args.compact:
+            series, summary, df, tops, corridors = ssum_snow_compact.compute(
+                args.in_path, params, prof, args.corridors
+            )
+        else:
+            compute = lambda: _compute_features(_read_input(args.in_path, prof), params, prof)
+            if args.cache_dir:
+                cache = ssum_snow_cache.FeatureCache(args.cache_dir, int(args.cache_max_mb * 2**20))
+                with prof.stage("input_hash"):
+                    digest = ssum_snow_cache.file_digest(args.in_path)
+                df, cache_hit = ssum_snow_cache.cached_features(cache, digest, params, compute)
+            else:
+                df = compute()
+
+            with prof.stage("sce_admissibility", len(df)):
+                df = _finish_series(df, params)
+
+        _make_outdir(args.out_dir)
+        series_path = os.path.join(args.out_dir, "series" + ssum_snow_io.EXT[args.format])
+        summary_path = os.path.join(args.out_dir, "summary.json")
+
+        if args.compact:
+            n = series.n
+        else:
+            n = 0 if df is None else len(df)
+        corridors_path = os.path.join(args.out_dir, ssum_snow_corridors.TABLE_NAME)
+        station = ssum_snow_corridors.station_name(args.in_path)
+        if args.chunk_rows:
+            summary, df, tops = ssum_snow_chunked.run(args.in_path, series_path, params, args.chunk_rows, prof)
+            n = summary["rows"]
+        elif args.compact:
+            if args.corridors:
+                corridors = ssum_snow_corridors.frame(corridors, station, series.tz)
+            with prof.stage("series_write", n):
+                series.write(series_path, args.format)
+            summary["compact"] = {
+                "bytes": series.nbytes,
+                "memory_budget_mb": args.memory_budget_mb,
+                # the budget is a pre-flight estimate (ssum_snow_compact.estimate_peak), not a limit
+                "memory_budget_check": None if estimated_peak is None else "pre-flight estimate",
+                "estimated_peak_mb": None if estimated_peak is None else round(estimated_peak / 2**20, 1),
+                "rel_err": ssum_snow_compact.REL_ERR,
+            }
+        else:
+            with prof.stage("series_write", n):
+                ssum_snow_io.write_frame(df, series_path, args.format, float32=args.float32)
 
-    if len(top_corr_any_df) > 0:
-        _print_row("Top corridor_score (overall):", top_corr_any_df.iloc[0])
-    else:
-        print("Top corridor_score (overall): none")
+            with prof.stage("summary_build", n):
+                summary, tops = _build_summary(df, params)
+
+            if args.corridors:
+                with prof.stage("corridors", n):
+                    corridors = ssum_snow_corridors.table(df, station, args.corridors)
+
+        if args.corridors:
+            ssum_snow_corridors.write_table(corridors, corridors_path)
+            summary["corridors"] = {"mode": args.corridors, "count": int(len(corridors))}
+
+        with prof.stage("json_write"):
+            with open(summary_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+
+    if args.profile:
+        # second write adds the timings block (json_write above is the plain summary write)
+        summary["timings"] = prof.to_dict(rows=n, segments=summary["segments"])
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    print("SSUM-Snow run complete")
+    print(f"Rows: {n}")
+    print(f"Segments: {summary['segments']}")
+    print(f"Time: {summary['start']} -> {summary['end']}")
+    if args.compact:
+        print(f"Compact series: {series.nbytes / 2**20:.1f} MiB")
+    if cache_hit is not None:
+        print(f"Feature cache: {'hit' if cache_hit else 'miss'} ({args.cache_dir})")
+    print(f"Saved: {series_path}")
+    print(f"Saved: {summary_path}")
+    if args.corridors:
+        print(f"Saved: {corridors_path} ({len(corridors)} corridors)")
 
-    if len(top_corr_adm_df) > 0:
-        _print_row("Top corridor_score (admissible corridor):", top_corr_adm_df.iloc[0])
-    else:
-        print("Top corridor_score (admissible corridor): none")
+    _print_tops(df, tops)
 
-    if len(top_corr_snow_adm_df) > 0:
-        _print_row("Top corridor_score (admissible + snowfall > 0):", top_corr_snow_adm_df.iloc[0])
-    else:
-        print("Top corridor_score (admissible + snowfall > 0): none")
+    if args.profile:
+        print("Timings:")
+        prof.print()
+    if args.cprofile:
+        print(f"Saved: {args.cprofile}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
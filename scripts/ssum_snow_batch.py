@@ -0,0 +1,293 @@
+# ssum_snow_batch.py
+import os
+import json
+import glob
+import argparse
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ssum_snow
+import ssum_snow_io
+import ssum_snow_core
+import ssum_snow_cache
+import ssum_snow_matrix
+import ssum_snow_corridors
+
+INPUT_SUFFIX = "_SSUM_INPUT.csv"
+
+
+def _station_name(path):
+    return os.path.basename(path)[: -len(INPUT_SUFFIX)]
+
+
+def _discover(paths):
+    # (station, source path, zip member or None), sorted by station
+    tasks = []
+    for p in paths:
+        if os.path.isdir(p):
+            for f in sorted(glob.glob(os.path.join(p, "*" + INPUT_SUFFIX))):
+                tasks.append((_station_name(f), f, None))
+        elif zipfile.is_zipfile(p):
+            with zipfile.ZipFile(p) as z:
+                for m in sorted(z.namelist()):
+                    if m.endswith(INPUT_SUFFIX):
+                        tasks.append((_station_name(m), p, m))
+        elif os.path.isfile(p) and p.endswith(INPUT_SUFFIX):
+            tasks.append((_station_name(p), p, None))
+        else:
+            raise SystemExit(f"Not a directory, zip or *{INPUT_SUFFIX} file: {p}")
+
+    seen = {}
+    for station, path, member in tasks:
+        src = path if member is None else f"{path}:{member}"
+        if station in seen:
+            raise SystemExit(f"Duplicate station {station}: {seen[station]} and {src}")
+        seen[station] = src
+
+    return sorted(tasks)
+
+
+def _read_task(path, member):
+    if member is None:
+        return ssum_snow._read_input(path)
+    with zipfile.ZipFile(path) as z:
+        with z.open(member) as f:
+            return ssum_snow._read_input(f)
+
+
+def _features(path, member, params, cache_dir, cache_max_bytes):
+    # (features frame, cache hit or None when caching is off)
+    compute = lambda: ssum_snow._compute_features(_read_task(path, member), params)
+    if not cache_dir:
+        return compute(), None
+    cache = ssum_snow_cache.FeatureCache(cache_dir, cache_max_bytes)
+    digest = ssum_snow_cache.file_digest(path, member)
+    return ssum_snow_cache.cached_features(cache, digest, params, compute)
+
+
+def _index_entry(station, df, summary):
+    adm = df["admissible"].to_numpy(dtype=bool)
+    snow = df["snowfall_cm"].to_numpy(dtype=float) > 0.0
+    top = summary["top_corridor_admissible"]
+    return {
+        "station": station,
+        "rows": summary["rows"],
+        "start": summary["start"],
+        "end": summary["end"],
+        "segments": summary["segments"],
+        "admissible_rows": int(adm.sum()),
+        "snow_rows": int(snow.sum()),
+        "admissible_snow_rows": int((adm & snow).sum()),
+        "top_corridor_admissible_time": top[0]["time"] if top else None,
+        "top_corridor_admissible_score": top[0]["corridor_score"] if top else None,
+    }
+
+
+def _task_bytes(task):
+    # input size, used to group stations of similar length into matrix blocks
+    _, path, member = task
+    if member is None:
+        return os.path.getsize(path)
+    with zipfile.ZipFile(path) as z:
+        return z.getinfo(member).file_size
+
+
+def _write_station(station, source, df, cache_hit, out_dir, params, fmt, float32, corridors):
+    st_dir = os.path.join(out_dir, station)
+    ssum_snow._make_outdir(st_dir)
+    series_name = "series" + ssum_snow_io.EXT[fmt]
+    ssum_snow_io.write_frame(df, os.path.join(st_dir, series_name), fmt, float32=float32)
+
+    summary, _ = ssum_snow._build_summary(df, params)
+    with open(os.path.join(st_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    entry = _index_entry(station, df, summary)
+    entry["source"] = source
+    entry["series"] = f"{station}/{series_name}"
+    entry["summary"] = f"{station}/summary.json"
+    if corridors:
+        tab = ssum_snow_corridors.table(df, station, corridors)
+        ssum_snow_corridors.write_table(tab, os.path.join(st_dir, ssum_snow_corridors.TABLE_NAME))
+        entry["corridors"] = f"{station}/{ssum_snow_corridors.TABLE_NAME}"
+        entry["corridor_count"] = int(len(tab))
+    if cache_hit is not None:
+        entry["feature_cache"] = "hit" if cache_hit else "miss"
+    return entry
+
+
+def _source(path, member):
+    return path if member is None else f"{path}:{member}"
+
+
+def _run_station(job):
+    (station, path, member), out_dir, params, fmt, float32, corridors, cache_dir, cache_max_bytes = job
+    source = _source(path, member)
+    try:
+        df, cache_hit = _features(path, member, params, cache_dir, cache_max_bytes)
+        df = ssum_snow._finish_series(df, params)
+        return _write_station(station, source, df, cache_hit, out_dir, params, fmt, float32, corridors)
+    except (Exception, SystemExit) as e:
+        return {"station": station, "source": source, "error": str(e)}
+
+
+def _run_block(job):
+    # --engine matrix: one block of stations through ssum_snow_matrix; cache misses are
+    # computed together, then every station of the block is finished together. Stations that
+    # fail to read or prepare become error entries and stay out of the matrix
+    tasks, out_dir, params, fmt, float32, corridors, cache_dir, cache_max_bytes = job
+    cache = ssum_snow_cache.FeatureCache(cache_dir, cache_max_bytes) if cache_dir else None
+    entries = {}
+    frames = {}
+    hits = {}
+    keys = {}
+    for station, path, member in tasks:
+        try:
+            if cache is not None:
+                keys[station] = ssum_snow_cache.feature_key(ssum_snow_cache.file_digest(path, member), params)
+                df = cache.get(keys[station])
+                hits[station] = df is not None
+                if df is not None:
+                    frames[station] = df
+                    continue
+            frames[station] = ssum_snow_matrix.prepare_frame(_read_task(path, member), params)
+        except (Exception, SystemExit) as e:
+            entries[station] = {"station": station, "source": _source(path, member), "error": str(e)}
+
+    misses = [st for st in frames if not hits.get(st)]
+    frames.update(zip(misses, ssum_snow_matrix.feature_frames([frames[st] for st in misses], params)))
+    if cache is not None:
+        for st in misses:
+            cache.put(keys[st], frames[st])
+    frames = dict(zip(frames, ssum_snow_matrix.finish_frames(list(frames.values()), params)))
+
+    for station, path, member in tasks:
+        if station in entries:
+            continue
+        try:
+            entries[station] = _write_station(
+                station,
+                _source(path, member),
+                frames[station],
+                hits.get(station),
+                out_dir,
+                params,
+                fmt,
+                float32,
+                corridors,
+            )
+        except (Exception, SystemExit) as e:
+            entries[station] = {"station": station, "source": _source(path, member), "error": str(e)}
+    return [entries[station] for station, _, _ in tasks]
+
+
+def _combine_corridors(out_dir, entries):
+    # station tables appended as text (stations are already sorted), one header
+    path = os.path.join(out_dir, ssum_snow_corridors.TABLE_NAME)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        out.write(",".join(ssum_snow_corridors.COLUMNS) + "\n")
+        for e in entries:
+            if "corridors" in e:
+                with open(os.path.join(out_dir, e["corridors"]), encoding="utf-8", newline="") as f:
+                    next(f)
+                    out.writelines(f)
+    return ssum_snow_corridors.TABLE_NAME
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_paths", nargs="+", required=True)
+    ap.add_argument("--out_dir", required=True)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--format", choices=ssum_snow_io.FORMATS, default="csv")
+    ap.add_argument("--float32", action="store_true")
+    # frame: one pandas pipeline per station; matrix: blocks of stations as stations x rows arrays
+    ap.add_argument("--engine", choices=["frame", "matrix"], default="frame")
+    ap.add_argument("--block_stations", type=int, default=ssum_snow_matrix.DEFAULT_BLOCK_STATIONS)
+    # shared feature cache; safe for all workers to use at once
+    ap.add_argument("--cache_dir", default=None)
+    ap.add_argument("--cache_max_mb", type=float, default=ssum_snow_cache.DEFAULT_MAX_BYTES / 2**20)
+    # per-station corridors.csv plus one combined, station-sorted corridors.csv in out_dir
+    ap.add_argument("--corridors", choices=ssum_snow_corridors.MODES, default=None)
+
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+    ap.add_argument("--hourly", choices=ssum_snow_core.HOURLY_RULES, default=None)
+    ap.add_argument("--time_windows", action="store_true")
+
+    args = ap.parse_args()
+    params = ssum_snow._params_from_args(args)
+
+    tasks = _discover(args.in_paths)
+    if not tasks:
+        raise SystemExit(f"No *{INPUT_SUFFIX} inputs found in: {args.in_paths}")
+
+    ssum_snow._make_outdir(args.out_dir)
+
+    cache_max_bytes = int(args.cache_max_mb * 2**20)
+    opts = (args.out_dir, params, args.format, args.float32, args.corridors, args.cache_dir, cache_max_bytes)
+    if args.engine == "matrix":
+        groups = ssum_snow_matrix.blocks([_task_bytes(t) for t in tasks], args.block_stations)
+        jobs = [([tasks[i] for i in g],) + opts for g in groups]
+        run = _run_block
+    else:
+        jobs = [(t,) + opts for t in tasks]
+        run = _run_station
+
+    workers = args.workers or os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(jobs)))
+
+    if workers == 1:
+        results = [run(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(run, jobs))
+
+    if args.engine == "matrix":
+        by_station = {e["station"]: e for block in results for e in block}
+        entries = [by_station[station] for station, _, _ in tasks]
+    else:
+        entries = results
+
+    failed = [e for e in entries if "error" in e]
+    index = {
+        "stations": len(entries),
+        "failed": len(failed),
+        "rows": int(np.sum([e["rows"] for e in entries if "error" not in e])),
+        "params": params,
+        "results": entries,
+    }
+
+    if args.corridors:
+        index["corridors"] = _combine_corridors(args.out_dir, entries)
+
+    index_path = os.path.join(args.out_dir, "index.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+
+    print("SSUM-Snow batch complete")
+    print(f"Stations: {len(entries)} (failed: {len(failed)})")
+    print(f"Engine: {args.engine}")
+    print(f"Workers: {workers}")
+    print(f"Saved: {index_path}")
+    if args.corridors:
+        print(f"Saved: {os.path.join(args.out_dir, index['corridors'])}")
+    for e in entries:
+        if "error" in e:
+            print(f"  {e['station']}: ERROR {e['error']}")
+        else:
+            print(f"  {e['station']}: rows={e['rows']} segments={e['segments']} admissible={e['admissible_rows']}")
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
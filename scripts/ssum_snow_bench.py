@@ -0,0 +1,410 @@
+# ssum_snow_bench.py
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow
+import ssum_snow_core
+import ssum_snow_verify
+import ssum_snow_calibrate
+import ssum_snow_profile
+import noaa_isd_to_ssum_input
+
+BENCH_VERSION = 1
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+# entry points that must not import pandas (scheduled incremental runs)
+PANDAS_FREE = ["ssum_snow_core", "ssum_snow_stream"]
+
+COLD_START_MODULES = PANDAS_FREE + ["ssum_snow"]
+
+
+def _isd_temp(values_c, missing):
+    t10 = np.round(values_c * 10.0).astype(np.int64)
+    sign = np.where(t10 < 0, "-", "+")
+    code = np.char.add(np.char.add(sign, np.char.zfill(np.abs(t10).astype(str), 4)), ",5")
+    return np.where(missing, "+9999,9", code)
+
+
+def synth_isd(seed, years=1, start_year=2000, irregular=True, gap_rate=0.002, max_gap_hours=72):
+    # deterministic ISD-like hourly export (DATE, TMP, DEW, AA1) for one synthetic station;
+    # `irregular` adds off-hour special observations and jittered report minutes,
+    # `gap_rate` is the per-hour chance of an outage (7..max_gap_hours) that starts a new segment
+    rng = np.random.default_rng(seed)
+    n = int(round(float(years) * 8760))
+    hours = np.arange(n, dtype=np.int64)
+
+    if gap_rate > 0 and n:
+        starts = np.flatnonzero(rng.random(n) < float(gap_rate))
+        keep = np.ones(n, dtype=bool)
+        for s, length in zip(starts, rng.integers(7, max(8, int(max_gap_hours) + 1), len(starts))):
+            keep[s + 1 : s + 1 + length] = False
+        hours = hours[keep]
+
+    minutes = np.full(len(hours), 52, dtype=np.int64)
+    if irregular and len(hours):
+        jitter = rng.random(len(hours)) < 0.05
+        minutes[jitter] = rng.integers(0, 60, int(jitter.sum()))
+        extra = hours[rng.random(len(hours)) < 0.08]
+        hours = np.concatenate((hours, extra))
+        minutes = np.concatenate((minutes, rng.integers(0, 52, len(extra))))
+
+    t0 = pd.Timestamp(f"{int(start_year)}-01-01")
+    t_ns = t0.value + (hours * 3600 + minutes * 60) * 1_000_000_000
+    order = np.argsort(t_ns, kind="stable")
+    t_ns = t_ns[order]
+    hours = hours[order]
+    m = len(t_ns)
+
+    # seasonal + diurnal cycle with AR(1) weather noise
+    day = hours / 24.0
+    noise = np.zeros(m)
+    eps = rng.normal(0.0, 1.2, m)
+    for i in range(1, m):
+        noise[i] = 0.97 * noise[i - 1] + eps[i]
+    temp = 8.0 - 14.0 * np.cos(2.0 * np.pi * day / 365.0) + 4.0 * np.sin(2.0 * np.pi * (day % 1.0)) + noise
+    dew = temp - np.abs(rng.normal(4.0, 2.5, m))
+
+    # precipitation events: a few hours each, heavier in the cold season
+    wet = np.zeros(m, dtype=bool)
+    ev = np.flatnonzero(rng.random(m) < 0.01)
+    for s, length in zip(ev, rng.integers(2, 12, len(ev))):
+        wet[s : s + length] = True
+    depth = np.where(wet, rng.gamma(1.2, 8.0, m), 0.0).astype(np.int64)
+    aa1 = np.where(
+        wet,
+        np.char.add(np.char.add("01,", np.char.zfill(depth.astype(str), 4)), ",9,5"),
+        "",
+    )
+    aa1 = np.where(wet & (rng.random(m) < 0.02), "01,9999,9,5", aa1)
+
+    return pd.DataFrame(
+        {
+            "STATION": f"SYN{int(seed):06d}",
+            "DATE": pd.to_datetime(t_ns).strftime("%Y-%m-%dT%H:%M:%S"),
+            "SOURCE": "4",
+            "TMP": _isd_temp(temp, rng.random(m) < 0.01),
+            "DEW": _isd_temp(dew, rng.random(m) < 0.01),
+            "AA1": aa1,
+        }
+    )
+
+
+def _bench_station(k, args, stages, tmp_dir):
+    seed = int(args.seed) * 1_000_003 + k
+    with stages.stage("generate"):
+        raw = synth_isd(seed, args.years, args.start_year, not args.regular, args.gap_rate)
+    isd_path = os.path.join(tmp_dir, f"isd_{k}.csv")
+    raw.to_csv(isd_path, index=False)
+    n_raw = len(raw)
+    del raw
+
+    with stages.stage("read_isd_csv", n_raw):
+        raw = pd.read_csv(isd_path, low_memory=False)
+    with stages.stage("convert", n_raw):
+        inp = noaa_isd_to_ssum_input._convert_frame(raw, args)
+    del raw
+
+    input_path = os.path.join(tmp_dir, f"input_{k}.csv")
+    n_inp = len(inp)
+    with stages.stage("write_input_csv", n_inp):
+        inp.to_csv(input_path, index=False)
+    del inp
+
+    with stages.stage("read_input", n_inp):
+        df = ssum_snow._read_input(input_path)
+    n = len(df)
+    with stages.stage("compute_series", n):
+        df = ssum_snow._compute_series(df, args.params)
+    with stages.stage("build_summary", n):
+        summary, _ = ssum_snow._build_summary(df, args.params)
+    with stages.stage("write_series_csv", n):
+        df.to_csv(os.path.join(tmp_dir, f"series_{k}.csv"), index=False)
+    with stages.stage("write_summary_json", n):
+        with open(os.path.join(tmp_dir, f"summary_{k}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if not args.no_calibration:
+        with stages.stage("calibrate", n):
+            cal = ssum_snow_calibrate._prepare_series(df, args)
+            out, report = ssum_snow_calibrate._calibrate(cal, args)
+        with stages.stage("write_predictions_csv", n):
+            out.to_csv(os.path.join(tmp_dir, f"predictions_{k}.csv"), index=False)
+
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    return n, summary["segments"]
+
+
+def _run_checks(args):
+    checks = []
+    # each reference is recomputed with the params recorded in its own summary, and compared the
+    # way the release gate compares it (ssum_snow_verify, same tolerances)
+    tol = {"atol": float(args.atol), "rtol": float(args.rtol), "cols": {}, "exact": ssum_snow_verify.EXACT_COLS}
+
+    trace_dir = os.path.join(args.repo_root, "results_hourly_reference_traces")
+    summaries_zip = os.path.join(args.repo_root, "evidence", "results_hourly_summaries_all_stations.zip")
+    trace_input = os.path.join(args.repo_root, "inputs", "Milwaukee_2024_SSUM_INPUT.csv")
+    if os.path.isdir(trace_dir) and os.path.exists(trace_input):
+        with open(os.path.join(trace_dir, "Milwaukee_2024_summary.json"), "r", encoding="utf-8") as f:
+            params = json.load(f)["params"]
+        df = ssum_snow._compute_series(ssum_snow._read_input(trace_input), params)
+        summary, _ = ssum_snow._build_summary(df, params)
+        with tempfile.TemporaryDirectory(prefix="ssum_gate_") as d:
+            # written as ssum_snow.py writes them, so the series compares through the same CSV text
+            out_dir = os.path.join(d, "Milwaukee_2024")
+            os.makedirs(out_dir)
+            df.to_csv(os.path.join(out_dir, ssum_snow_verify.SERIES_CSV), index=False)
+            with open(os.path.join(out_dir, ssum_snow_verify.SUMMARY_JSON), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            got = ssum_snow_verify.discover([d])["Milwaukee_2024"]
+            # the traces alone, then the release gate command with both reference sets
+            for name, refs in (
+                ("reference_trace:Milwaukee_2024", [trace_dir]),
+                ("release_gate:Milwaukee_2024", [p for p in (summaries_zip, trace_dir) if os.path.exists(p)]),
+            ):
+                ref = ssum_snow_verify.discover(refs).get("Milwaukee_2024", {})
+                r = ssum_snow_verify.verify_station(("Milwaukee_2024", got, ref, tol, ssum_snow_verify.CHUNK_ROWS))
+                checks.append({"name": name, "ok": r["ok"], "issues": r["issues"]})
+
+    inputs_zip = os.path.join(args.repo_root, "evidence", "inputs_all_stations.zip")
+    if os.path.exists(inputs_zip) and os.path.exists(summaries_zip):
+        with zipfile.ZipFile(inputs_zip) as zi, zipfile.ZipFile(summaries_zip) as zs:
+            refs = {os.path.basename(m)[: -len("_summary.json")]: m for m in zs.namelist() if m.endswith("_summary.json")}
+            for m in sorted(zi.namelist()):
+                if not m.endswith("_SSUM_INPUT.csv"):
+                    continue
+                station = os.path.basename(m)[: -len("_SSUM_INPUT.csv")]
+                if station not in refs:
+                    continue
+                ref_summary = json.loads(zs.read(refs[station]).decode("utf-8"))
+                params = ref_summary["params"]
+                with zi.open(m) as f:
+                    df = ssum_snow._compute_series(ssum_snow._read_input(f), params)
+                summary, _ = ssum_snow._build_summary(df, params)
+                issues = ssum_snow_verify.compare_summary(summary, ref_summary, tol)
+                checks.append({"name": f"evidence:{station}", "ok": not issues, "issues": issues})
+
+    if not checks:
+        checks.append({"name": "reference_data", "ok": False, "issues": [f"no reference data under {args.repo_root}"]})
+    return checks
+
+
+def _cold_start(repeats):
+    # fresh interpreters, best of `repeats`: import time of each entry module (and whether it
+    # pulled in pandas), a one-observation ssum_snow_stream.py update and a one-row ssum_snow.py
+    # run from process start (ssum_snow.py always imports pandas: its input is read as a frame)
+    code = "import sys, time; t = time.perf_counter(); import {}; print(time.perf_counter() - t, 'pandas' in sys.modules)"
+    out = {"repeats": int(repeats), "imports": {}}
+    for m in COLD_START_MODULES:
+        best = None
+        for _ in range(repeats):
+            r = subprocess.run([sys.executable, "-c", code.format(m)], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+            wall, pandas_loaded = r.stdout.split()
+            best = float(wall) if best is None else min(best, float(wall))
+        out["imports"][m] = {"import_s": round(best, 6), "loads_pandas": pandas_loaded == "True"}
+
+    with tempfile.TemporaryDirectory(prefix="ssum_cold_") as d:
+        src = os.path.join(d, "obs.csv")
+        with open(src, "w", encoding="utf-8") as f:
+            f.write("time,temperature_C,humidity_pct,snowfall_cm\n2024-01-01 00:00:00+00:00,-3.0,85.0,0.0\n")
+        runs = {
+            "stream_update_s": lambda i: ["ssum_snow_stream.py", "--in", src, "--state", os.path.join(d, f"state_{i}.json")],
+            "batch_run_s": lambda i: ["ssum_snow.py", "--in", src, "--out_dir", os.path.join(d, f"out_{i}")],
+        }
+        for key, argv_of in runs.items():
+            best = None
+            for i in range(repeats):
+                argv = argv_of(i)
+                cmd = [sys.executable, os.path.join(SCRIPTS_DIR, argv[0])] + argv[1:]
+                t = time.perf_counter()
+                subprocess.run(cmd, capture_output=True, check=True)
+                wall = time.perf_counter() - t
+                best = wall if best is None else min(best, wall)
+            out[key] = round(best, 6)
+    return out
+
+
+def _cold_start_checks(cold, max_s, max_batch_s=None):
+    checks = []
+    for m in PANDAS_FREE:
+        ok = not cold["imports"][m]["loads_pandas"]
+        checks.append({"name": f"cold_start:{m}_without_pandas", "ok": ok, "issues": [] if ok else [f"import {m} loads pandas"]})
+    for key, label, limit in (("stream_update_s", "stream update", max_s), ("batch_run_s", "ssum_snow.py run", max_batch_s)):
+        if limit is not None:
+            ok = cold[key] <= limit
+            issues = [] if ok else [f"{label} took {cold[key]:.3f}s > {limit:g}s"]
+            checks.append({"name": f"cold_start:{key[:-2]}", "ok": ok, "issues": issues})
+    return checks
+
+
+def _vs_baseline(stages, path):
+    with open(path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    out = {}
+    for name, st in stages.items():
+        b = base.get("stages", {}).get(name)
+        if b and b.get("wall_s") and b.get("rows") and st["rows"]:
+            # per-row time ratio, so runs of different sizes stay comparable
+            out[name] = round((st["wall_s"] / st["rows"]) / (b["wall_s"] / b["rows"]), 3)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", dest="out_path", required=True)
+
+    # synthetic workload: stations x years station-years, generated and processed one station at a time
+    ap.add_argument("--stations", type=int, default=1)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--start_year", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--gap_rate", type=float, default=0.002)
+    ap.add_argument("--regular", action="store_true", help="strictly hourly sampling (no ISD-like specials/jitter)")
+    ap.add_argument("--no_calibration", action="store_true")
+    # per-stage allocation peaks via tracemalloc; slows pandas-heavy stages several-fold,
+    # so stage times from --memory runs should only be compared with other --memory runs
+    ap.add_argument("--memory", action="store_true")
+
+    # correctness gate against results_hourly_reference_traces/ and evidence/
+    ap.add_argument("--check", action="store_true")
+    ap.add_argument("--check_only", action="store_true")
+    # reference checks: |got - ref| <= atol + rtol * |ref| (ssum_snow_verify defaults)
+    ap.add_argument("--atol", type=float, default=ssum_snow_verify.DEFAULT_ATOL)
+    ap.add_argument("--rtol", type=float, default=ssum_snow_verify.DEFAULT_RTOL)
+    ap.add_argument("--repo_root", default=REPO_ROOT)
+
+    ap.add_argument("--baseline", default=None, help="earlier bench JSON to compare per-row stage times against")
+    # fresh-interpreter import / one-row stream update timings (0 disables outside --check)
+    ap.add_argument("--cold_start_repeats", type=int, default=5)
+    ap.add_argument("--max_cold_start_s", type=float, default=None, help="fail --check when a stream update takes longer")
+    ap.add_argument(
+        "--max_batch_cold_start_s", type=float, default=None, help="fail --check when a one-row ssum_snow.py run takes longer"
+    )
+
+    # converter / engine / calibration params (script defaults)
+    ap.add_argument("--precip_col", default="AA1")
+    ap.add_argument("--precip_depth_scale_mm", type=float, default=0.1)
+    ap.add_argument("--snow_temp_c", type=float, default=0.0)
+    ap.add_argument("--snow_ratio", type=float, default=10.0)
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+    ap.add_argument("--time_col", default="time")
+    ap.add_argument("--segment_col", default="segment_id")
+    ap.add_argument("--score_col", default="corridor_score")
+    ap.add_argument("--snow_col", default="snowfall_cm")
+    ap.add_argument("--horizon_hours", type=int, default=24)
+    ap.add_argument("--train_frac", type=float, default=0.7)
+    ap.add_argument("--rho_scale", type=float, default=1.0)
+    ap.add_argument("--min_valid_points", type=int, default=48)
+
+    args = ap.parse_args()
+    args.params = ssum_snow._params_from_args(args)
+
+    result = {
+        "bench_version": BENCH_VERSION,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "stations": int(args.stations),
+            "years": float(args.years),
+            "station_years": float(args.stations) * float(args.years),
+            "start_year": int(args.start_year),
+            "seed": int(args.seed),
+            "gap_rate": float(args.gap_rate),
+            "irregular": not args.regular,
+            "calibration": not args.no_calibration,
+            "memory": bool(args.memory),
+            "params": args.params,
+        },
+    }
+
+    t0 = time.perf_counter()
+    if not args.check_only:
+        stages = ssum_snow_profile.Profiler(memory=args.memory)
+        rows = 0
+        segments = 0
+        tmp_dir = tempfile.mkdtemp(prefix="ssum_bench_")
+        try:
+            for k in range(int(args.stations)):
+                n, s = _bench_station(k, args, stages, tmp_dir)
+                rows += n
+                segments += s
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        result["totals"] = {"rows": int(rows), "segments": int(segments)}
+        result["stages"] = stages.stage_stats()
+        if args.baseline:
+            result["vs_baseline"] = _vs_baseline(result["stages"], args.baseline)
+
+    if args.cold_start_repeats > 0 or args.check or args.check_only:
+        result["cold_start"] = _cold_start(max(1, args.cold_start_repeats))
+
+    if args.check or args.check_only:
+        checks = _run_checks(args) + _cold_start_checks(
+            result["cold_start"], args.max_cold_start_s, args.max_batch_cold_start_s
+        )
+        result["checks"] = checks
+        result["checks_ok"] = all(c["ok"] for c in checks)
+
+    result["elapsed_s"] = round(time.perf_counter() - t0, 6)
+    result["peak_rss_bytes"] = ssum_snow_profile.peak_rss_bytes()
+
+    d = os.path.dirname(args.out_path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(args.out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print("SSUM-Snow benchmark complete")
+    if "stages" in result:
+        print(f"Station-years: {result['config']['station_years']:g} (rows: {result['totals']['rows']}, segments: {result['totals']['segments']})")
+        for name, st in result["stages"].items():
+            rate = f"{st['rows_per_s']:.0f} rows/s" if st["rows_per_s"] else "-"
+            peak = f" peak={st['peak_mem_bytes'] / 2**20:.1f}MiB" if st.get("peak_mem_bytes") is not None else ""
+            ratio = f" x{result['vs_baseline'][name]}" if name in result.get("vs_baseline", {}) else ""
+            print(f"  {name}: {st['wall_s']:.3f}s cpu={st['cpu_s']:.3f}s {rate}{peak}{ratio}")
+    if "cold_start" in result:
+        cold = result["cold_start"]
+        imports = " ".join(f"{m}={v['import_s']:.3f}s{'' if v['loads_pandas'] else ' (no pandas)'}" for m, v in cold["imports"].items())
+        print(
+            f"Cold start: stream update={cold['stream_update_s']:.3f}s, "
+            f"ssum_snow.py run={cold['batch_run_s']:.3f}s, import {imports}"
+        )
+    if "checks" in result:
+        bad = [c for c in result["checks"] if not c["ok"]]
+        print(f"Checks: {len(result['checks']) - len(bad)}/{len(result['checks'])} ok")
+        for c in bad:
+            print(f"  FAILED {c['name']}: {'; '.join(c['issues'])}")
+    print(f"Saved: {args.out_path}")
+
+    if "checks" in result and not result["checks_ok"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# ssum_snow_cache.py
+import os
+import json
+import time
+import uuid
+import zipfile
+import hashlib
+
+import ssum_snow_io
+
+# bump when the cached columns, their npz encoding or the feature kernel change
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+CHUNK = 1 << 20
+
+# temp files older than this are leftovers of crashed writers
+STALE_TMP_SECONDS = 3600
+
+
+def file_digest(path, member=None):
+    # sha256 of the input bytes (a zip member's bytes when `member` is given)
+    h = hashlib.sha256()
+    if member is None:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK), b""):
+                h.update(block)
+    else:
+        with zipfile.ZipFile(path) as z, z.open(member) as f:
+            for block in iter(lambda: f.read(CHUNK), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def feature_key(digest, params):
+    # features depend only on the input and the window / gap params; thresholds and
+    # k_depth are applied after the cache
+    key = {
+        "version": CACHE_VERSION,
+        "input_sha256": digest,
+        "tct_window_hours": int(params["tct_window_hours"]),
+        "stress_window_hours": int(params["stress_window_hours"]),
+        "gap_hours": float(params["gap_hours"]),
+    }
+    # added only when set, so keys of default runs stay valid
+    for k in ("hourly", "window_mode"):
+        if params.get(k):
+            key[k] = params[k]
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cached_features(cache, digest, params, compute):
+    # (frame, hit): the cached features frame for this input + params, or compute() and store it
+    key = feature_key(digest, params)
+    df = cache.get(key)
+    if df is not None:
+        return df, True
+    df = compute()
+    cache.put(key, df)
+    return df, False
+
+
+class FeatureCache:
+    # on-disk cache of prepared input + segment_id / CP / S_struct frames, one uncompressed
+    # .npz per key (memory-mapped on load). Entries are written to a temp file and renamed
+    # into place, so concurrent readers never see partial files; LRU order is file mtime,
+    # refreshed on every hit, and the directory is trimmed to `max_bytes` after each store
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            df = ssum_snow_io.read_frame(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # missing, evicted by another worker, or unreadable: treat as a miss
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, key, df):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            ssum_snow_io.write_frame(df, tmp, "npz")
+            os.replace(tmp, path)
+        except OSError:
+            # the cache is best-effort (full disk, file in use on Windows, ...)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        self.evict(keep=path)
+        return True
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            p = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if name.endswith(".tmp") and now - st.st_mtime > STALE_TMP_SECONDS:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".npz"):
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                os.remove(p)
+            except OSError:
+                # already evicted by another worker, or still open on Windows
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -3,9 +3,32 @@ import json
 import argparse
 import numpy as np
 import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+import ssum_snow_io
+import ssum_snow_profile
 
 EPS = 1e-12
 
+FORMULAS = {
+    "score_H(t)": "sum_{h=t..t+H-1} corridor_score(h)",
+    "obs_snow_H(t)": "sum_{h=t..t+H-1} snowfall_cm(h)",
+    "alpha_seg": "a = (score^T obs) / (score^T score) fitted inside each segment on train split",
+    "alpha_global": "median(alpha_seg over segments where alpha_seg exists)",
+    "pred_snow_H_seg(t)": "alpha_seg * score_H(t)",
+    "pred_snow_H_global(t)": "alpha_global * score_H(t)",
+    "pred_depth_H_*": "rho_scale * pred_snow_H_*",
+}
+
+CALIB_COLS = [
+    "score_H",
+    "obs_snow_H",
+    "pred_snow_H_seg",
+    "pred_depth_H_seg",
+    "pred_snow_H_global",
+    "pred_depth_H_global",
+]
+
 
 def _make_outdir(p):
     os.makedirs(p, exist_ok=True)
@@ -44,28 +67,7 @@ def _metrics(y_true, y_pred):
     return {"n": int(len(yt)), "mae": mae, "rmse": rmse, "corr": corr}
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="in_path", required=True)
-    ap.add_argument("--out_dir", required=True)
-
-    ap.add_argument("--time_col", default="time")
-    ap.add_argument("--segment_col", default="segment_id")
-
-    ap.add_argument("--score_col", default="corridor_score")
-    ap.add_argument("--snow_col", default="snowfall_cm")
-
-    ap.add_argument("--horizon_hours", type=int, default=24)
-    ap.add_argument("--train_frac", type=float, default=0.7)
-
-    ap.add_argument("--rho_scale", type=float, default=1.0)
-
-    ap.add_argument("--min_valid_points", type=int, default=48)
-
-    args = ap.parse_args()
-
-    df = pd.read_csv(args.in_path)
-
+def _prepare_series(df, args):
     need = [args.time_col, args.score_col, args.snow_col]
     missing = [c for c in need if c not in df.columns]
     if missing:
@@ -77,85 +79,128 @@ def main():
     df[args.time_col] = pd.to_datetime(df[args.time_col], errors="coerce")
     df = df.dropna(subset=[args.time_col]).sort_values(args.time_col).reset_index(drop=True)
 
-    H = int(args.horizon_hours)
-
     df[args.score_col] = pd.to_numeric(df[args.score_col], errors="coerce")
     df[args.snow_col] = pd.to_numeric(df[args.snow_col], errors="coerce").fillna(0.0)
+    return df
+
+
+class _SegmentWindow(BaseIndexer):
+    # trailing `window_size`-row windows that restart at each segment start; a window
+    # starting at its segment start makes pandas recompute the sum from scratch, so the
+    # results are bit-identical to rolling each segment separately
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - int(self.window_size), self.seg_start).astype(np.int64)
+        return start, end
+
+
+def _forward_sums(x, seg_start, seg_end, H):
+    # sum_{h=t..t+H-1} x(h) inside the segment of t; NaN if the window leaves the segment
+    idx = _SegmentWindow(window_size=H, seg_start=seg_start)
+    trailing = pd.Series(x).rolling(idx, min_periods=H).sum().to_numpy()
+    out = np.full(len(x), np.nan)
+    last = np.arange(len(x)) + (H - 1)
+    ok = last < seg_end
+    out[ok] = trailing[last[ok]]
+    return out
+
+
+def _segment_layout(df, args):
+    # rows grouped by segment (first-appearance order), time order kept inside each segment
+    codes, seg_ids = pd.factorize(df[args.segment_col], sort=False)
+    keep = np.flatnonzero(codes >= 0)
+    order = keep[np.argsort(codes[keep], kind="stable")]
+    frame = df.take(order).reset_index(drop=True)
+    codes = codes[order]
+
+    n = len(frame)
+    starts = np.flatnonzero(np.diff(codes, prepend=-1) != 0)
+    ends = np.append(starts[1:], n)[: len(starts)]
+    sizes = ends - starts
+    return {
+        "frame": frame,
+        "codes": codes,
+        "seg_ids": seg_ids,
+        "starts": starts,
+        "ends": ends,
+        "sizes": sizes,
+        "seg_start": np.repeat(starts, sizes),
+        "seg_end": np.repeat(ends, sizes),
+        "score": frame[args.score_col].to_numpy(dtype=float),
+        "snow": frame[args.snow_col].to_numpy(dtype=float),
+        # output rows are time-sorted
+        "perm": frame.sort_values(args.time_col).index.to_numpy(),
+    }
 
-    out_rows = []
-    per_seg = {}
-
-    # segment-level rolling sums + alpha fits
-    for seg_id, g in df.groupby(args.segment_col, sort=False):
-        gg = g.copy()
 
-        s = gg[args.score_col].astype(float)
-        y = gg[args.snow_col].astype(float)
+def _calibrate_horizon(layout, H, args):
+    rho = float(args.rho_scale)
+    codes, seg_ids = layout["codes"], layout["seg_ids"]
+    starts, ends, sizes = layout["starts"], layout["ends"], layout["sizes"]
+    n_seg = len(seg_ids)
 
-        score_H = s.rolling(H, min_periods=H).sum().shift(-(H - 1))
-        obs_H = y.rolling(H, min_periods=H).sum().shift(-(H - 1))
+    # segment-level forward sums
+    score_H = _forward_sums(layout["score"], layout["seg_start"], layout["seg_end"], H)
+    obs_H = _forward_sums(layout["snow"], layout["seg_start"], layout["seg_end"], H)
 
-        gg["score_H"] = score_H
-        gg["obs_snow_H"] = obs_H
+    # train/test split for every segment at once
+    good = ~np.isnan(score_H) & ~np.isnan(obs_H)
+    n_good = np.bincount(codes[good], minlength=n_seg)
+    n_train = np.maximum(10, np.round(float(args.train_frac) * n_good).astype(np.int64))
+    c = np.cumsum(good)
+    rank = c - 1 - np.repeat(c[starts] - good[starts], sizes)
+    is_train = good & (rank < np.repeat(n_train, sizes))
+    is_test = good & ~is_train
 
-        good = gg.dropna(subset=["score_H", "obs_snow_H"])
-        if len(good) < int(args.min_valid_points):
-            gg["pred_snow_H_seg"] = np.nan
-            gg["pred_depth_H_seg"] = np.nan
-            per_seg[int(seg_id)] = {
-                "segment_id": int(seg_id),
+    # alpha fits + metrics, only for segments with enough valid points
+    alpha = np.full(n_seg, np.nan)
+    per_seg = {}
+    for k in range(n_seg):
+        seg_id = int(seg_ids[k])
+        a, b = starts[k], ends[k]
+        if n_good[k] < int(args.min_valid_points):
+            per_seg[seg_id] = {
+                "segment_id": seg_id,
                 "alpha_seg": None,
                 "train_metrics_seg": {"n": 0, "mae": None, "rmse": None, "corr": None},
                 "test_metrics_seg": {"n": 0, "mae": None, "rmse": None, "corr": None},
                 "note": "insufficient_valid_points",
             }
-            out_rows.append(gg)
             continue
 
-        n = len(good)
-        n_train = max(10, int(round(float(args.train_frac) * n)))
-        train = good.iloc[:n_train]
-        test = good.iloc[n_train:]
+        tr = is_train[a:b]
+        te = is_test[a:b]
+        s_tr, y_tr = score_H[a:b][tr], obs_H[a:b][tr]
+        s_te, y_te = score_H[a:b][te], obs_H[a:b][te]
 
-        alpha_seg = _fit_alpha(train["score_H"].values, train["obs_snow_H"].values)
+        alpha_seg = _fit_alpha(s_tr, y_tr)
 
         if alpha_seg is None:
-            gg["pred_snow_H_seg"] = np.nan
-            gg["pred_depth_H_seg"] = np.nan
-            per_seg[int(seg_id)] = {
-                "segment_id": int(seg_id),
+            per_seg[seg_id] = {
+                "segment_id": seg_id,
                 "alpha_seg": None,
-                "train_metrics_seg": {"n": int(len(train)), "mae": None, "rmse": None, "corr": None},
-                "test_metrics_seg": {"n": int(len(test)), "mae": None, "rmse": None, "corr": None},
+                "train_metrics_seg": {"n": int(len(s_tr)), "mae": None, "rmse": None, "corr": None},
+                "test_metrics_seg": {"n": int(len(s_te)), "mae": None, "rmse": None, "corr": None},
                 "note": "alpha_fit_failed",
             }
-            out_rows.append(gg)
             continue
 
-        gg["pred_snow_H_seg"] = alpha_seg * gg["score_H"].astype(float)
-        gg.loc[pd.isna(gg["score_H"]), "pred_snow_H_seg"] = np.nan
-
-        rho = float(args.rho_scale)
-        gg["pred_depth_H_seg"] = rho * gg["pred_snow_H_seg"].astype(float)
-
-        tr_pred = alpha_seg * train["score_H"].astype(float)
-        te_pred = alpha_seg * test["score_H"].astype(float)
-
-        tr_m = _metrics(train["obs_snow_H"].values, tr_pred.values)
-        te_m = _metrics(test["obs_snow_H"].values, te_pred.values)
-
-        per_seg[int(seg_id)] = {
-            "segment_id": int(seg_id),
+        alpha[k] = alpha_seg
+        per_seg[seg_id] = {
+            "segment_id": seg_id,
             "alpha_seg": float(alpha_seg),
             "rho_scale": float(rho),
-            "train_metrics_seg": tr_m,
-            "test_metrics_seg": te_m,
+            "train_metrics_seg": _metrics(y_tr, alpha_seg * s_tr),
+            "test_metrics_seg": _metrics(y_te, alpha_seg * s_te),
             "note": "ok",
         }
 
-        out_rows.append(gg)
-
-    out = pd.concat(out_rows, axis=0).sort_values(args.time_col).reset_index(drop=True)
+    # from here on, rows are in output (time) order
+    perm = layout["perm"]
+    score_H = score_H[perm]
+    obs_H = obs_H[perm]
+    pred_seg = np.repeat(alpha, sizes)[perm] * score_H
 
     # compute global alpha as median of segment alphas that fit successfully
     ok_alphas = [v["alpha_seg"] for v in per_seg.values() if v.get("alpha_seg") is not None]
@@ -164,60 +209,210 @@ def main():
         alpha_global = float(np.median(np.asarray(ok_alphas, dtype=float)))
 
     # add global predictions for all rows
-    out["pred_snow_H_global"] = np.nan
-    out["pred_depth_H_global"] = np.nan
+    pred_global = np.full(len(score_H), np.nan)
     if alpha_global is not None:
-        out["pred_snow_H_global"] = alpha_global * out["score_H"].astype(float)
-        out.loc[pd.isna(out["score_H"]), "pred_snow_H_global"] = np.nan
-        out["pred_depth_H_global"] = float(args.rho_scale) * out["pred_snow_H_global"].astype(float)
+        pred_global = alpha_global * score_H
 
     # global metrics across all segments for rows where we have valid obs + score
-    valid_global = out.dropna(subset=["score_H", "obs_snow_H"])
+    valid = ~np.isnan(score_H) & ~np.isnan(obs_H)
     global_metrics = {"n": 0, "mae": None, "rmse": None, "corr": None}
-    if alpha_global is not None and len(valid_global) >= 10:
-        y_true = valid_global["obs_snow_H"].values
-        y_pred = alpha_global * valid_global["score_H"].astype(float).values
-        global_metrics = _metrics(y_true, y_pred)
-
-    _make_outdir(args.out_dir)
-    pred_path = os.path.join(args.out_dir, "predictions.csv")
-    report_path = os.path.join(args.out_dir, "calibration_report.json")
+    if alpha_global is not None and int(valid.sum()) >= 10:
+        global_metrics = _metrics(obs_H[valid], alpha_global * score_H[valid])
+
+    cols = {
+        "score_H": score_H,
+        "obs_snow_H": obs_H,
+        "pred_snow_H_seg": pred_seg,
+        "pred_depth_H_seg": rho * pred_seg,
+        "pred_snow_H_global": pred_global,
+        "pred_depth_H_global": rho * pred_global,
+    }
+    result = {
+        "horizon_hours": int(H),
+        "global_alpha_median": alpha_global,
+        "global_metrics": global_metrics,
+        "per_segment": list(per_seg.values()),
+    }
+    return cols, result
 
-    out.to_csv(pred_path, index=False)
 
-    report = {
+def _report_head(df, out, args):
+    return {
         "input_rows": int(len(df)),
         "start": str(out[args.time_col].iloc[0]) if len(out) else None,
         "end": str(out[args.time_col].iloc[-1]) if len(out) else None,
-        "horizon_hours": int(H),
-        "train_frac": float(args.train_frac),
-        "rho_scale": float(args.rho_scale),
-        "global_alpha_median": alpha_global,
-        "global_metrics": global_metrics,
-        "per_segment": list(per_seg.values()),
-        "formulas": {
-            "score_H(t)": "sum_{h=t..t+H-1} corridor_score(h)",
-            "obs_snow_H(t)": "sum_{h=t..t+H-1} snowfall_cm(h)",
-            "alpha_seg": "a = (score^T obs) / (score^T score) fitted inside each segment on train split",
-            "alpha_global": "median(alpha_seg over segments where alpha_seg exists)",
-            "pred_snow_H_seg(t)": "alpha_seg * score_H(t)",
-            "pred_snow_H_global(t)": "alpha_global * score_H(t)",
-            "pred_depth_H_*": "rho_scale * pred_snow_H_*",
-        },
     }
 
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
 
-    print("SSUM-Snow calibration complete")
-    print(f"Saved: {pred_path}")
-    print(f"Saved: {report_path}")
+def _calibrate(df, args):
+    layout = _segment_layout(df, args)
+    cols, result = _calibrate_horizon(layout, int(args.horizon_hours), args)
+
+    out = layout["frame"].take(layout["perm"]).reset_index(drop=True)
+    for c in CALIB_COLS:
+        out[c] = cols[c]
+
+    report = _report_head(df, out, args)
+    report.update(
+        {
+            "horizon_hours": result["horizon_hours"],
+            "train_frac": float(args.train_frac),
+            "rho_scale": float(args.rho_scale),
+            "global_alpha_median": result["global_alpha_median"],
+            "global_metrics": result["global_metrics"],
+            "per_segment": result["per_segment"],
+            "formulas": FORMULAS,
+        }
+    )
+    return out, report
+
+
+def _calibrate_multi(df, args, horizons, layout_kind="wide"):
+    # all horizons share one read, one segment layout and one output ordering
+    layout = _segment_layout(df, args)
+    base = layout["frame"].take(layout["perm"]).reset_index(drop=True)
+
+    results = []
+    parts = []
+    out = base.copy() if layout_kind == "wide" else None
+    for H in horizons:
+        cols, result = _calibrate_horizon(layout, int(H), args)
+        results.append(result)
+        if layout_kind == "wide":
+            for c in CALIB_COLS:
+                out[f"{c}_{int(H)}h"] = cols[c]
+        else:
+            part = base.copy()
+            part["horizon_hours"] = int(H)
+            for c in CALIB_COLS:
+                part[c] = cols[c]
+            parts.append(part)
+
+    if layout_kind != "wide":
+        out = pd.concat(parts, ignore_index=True) if parts else base.assign(horizon_hours=pd.Series(dtype=np.int64))
+
+    report = _report_head(df, base, args)
+    report.update(
+        {
+            "horizons": [int(H) for H in horizons],
+            "train_frac": float(args.train_frac),
+            "rho_scale": float(args.rho_scale),
+            "predictions_layout": layout_kind,
+            "by_horizon": results,
+            "formulas": FORMULAS,
+        }
+    )
+    return out, report
+
+
+def _prefix(v):
+    return np.concatenate([[0], np.cumsum(v)])
+
+
+def _running_alpha(sy, ss, cnt, min_pairs):
+    # same acceptance rule as _fit_alpha, applied to running sums
+    ok = (cnt >= min_pairs) & (ss >= EPS)
+    return np.where(ok, sy / np.where(ok, ss, 1.0), np.nan)
+
+
+def _rolling_metrics(y_true, y_pred, window):
+    m = ~np.isnan(y_true) & ~np.isnan(y_pred)
+    err = pd.Series(np.where(m, y_pred - y_true, np.nan))
+    mp = min(10, int(window))
+    yt = pd.Series(np.where(m, y_true, np.nan))
+    yp = pd.Series(np.where(m, y_pred, np.nan))
+    return {
+        "mae": err.abs().rolling(window, min_periods=mp).mean().to_numpy(),
+        "rmse": np.sqrt((err * err).rolling(window, min_periods=mp).mean().to_numpy()),
+        "corr": yt.rolling(window, min_periods=mp).corr(yp).to_numpy(),
+    }
+
+
+def _backtest(df, args):
+    # walk-forward: at row t (refit rows every `refit_every`), alpha is fitted on every pair
+    # (score_H(s), obs_snow_H(s)) whose H-hour window has closed, i.e. s <= t - H, and scores
+    # score_H(t); running prefix sums make each refit O(1)
+    H = int(args.horizon_hours)
+    k = max(1, int(args.refit_every))
+    window = max(1, int(args.metrics_window))
+    min_pairs = max(10, int(args.min_valid_points))
+    rho = float(args.rho_scale)
+
+    layout = _segment_layout(df, args)
+    score_H = _forward_sums(layout["score"], layout["seg_start"], layout["seg_end"], H)
+    obs_H = _forward_sums(layout["snow"], layout["seg_start"], layout["seg_end"], H)
+
+    good = ~np.isnan(score_H) & ~np.isnan(obs_H)
+    p_sy = _prefix(np.where(good, score_H * obs_H, 0.0))
+    p_ss = _prefix(np.where(good, score_H * score_H, 0.0))
+    p_n = _prefix(good.astype(np.int64))
+
+    rows = np.arange(len(score_H))
+    refit = rows - rows % k
+    hi = np.clip(refit - H + 1, 0, None)
+
+    # per segment: closed pairs since the segment start
+    lo = layout["seg_start"]
+    hi_seg = np.maximum(hi, lo)
+    alpha_seg = _running_alpha(p_sy[hi_seg] - p_sy[lo], p_ss[hi_seg] - p_ss[lo], p_n[hi_seg] - p_n[lo], min_pairs)
+
+    # global: closed pairs pooled over all segments so far
+    alpha_global = _running_alpha(p_sy[hi], p_ss[hi], p_n[hi], min_pairs)
+
+    perm = layout["perm"]
+    score_H, obs_H = score_H[perm], obs_H[perm]
+    alpha_seg, alpha_global = alpha_seg[perm], alpha_global[perm]
+    pred_seg = alpha_seg * score_H
+    pred_global = alpha_global * score_H
+
+    out = layout["frame"].take(perm).reset_index(drop=True)[[args.time_col, args.segment_col]]
+    out["score_H"] = score_H
+    out["obs_snow_H"] = obs_H
+    out["alpha_seg"] = alpha_seg
+    out["alpha_global"] = alpha_global
+    out["pred_snow_H_seg"] = pred_seg
+    out["pred_snow_H_global"] = pred_global
+    out["pred_depth_H_seg"] = rho * pred_seg
+    out["pred_depth_H_global"] = rho * pred_global
+    for name, pred in (("seg", pred_seg), ("global", pred_global)):
+        for metric, values in _rolling_metrics(obs_H, pred, window).items():
+            out[f"rolling_{metric}_{name}"] = values
+
+    last_global = alpha_global[~np.isnan(alpha_global)]
+    report = _report_head(df, out, args)
+    report.update(
+        {
+            "mode": "walk_forward",
+            "horizon_hours": int(H),
+            "refit_every": int(k),
+            "refits": int(len(np.unique(refit))),
+            "metrics_window": int(window),
+            "min_pairs": int(min_pairs),
+            "rho_scale": float(rho),
+            "final_alpha_global": float(last_global[-1]) if len(last_global) else None,
+            "walk_forward_metrics_seg": _metrics(obs_H, pred_seg),
+            "walk_forward_metrics_global": _metrics(obs_H, pred_global),
+            "formulas": {
+                "score_H(t)": FORMULAS["score_H(t)"],
+                "obs_snow_H(t)": FORMULAS["obs_snow_H(t)"],
+                "alpha_seg(t)": "sum(score_H*obs_snow_H) / sum(score_H^2) over closed pairs s <= r - H in the segment of t",
+                "alpha_global(t)": "same ratio over closed pairs s <= r - H in all segments",
+                "r": "last refit row at or before t (every refit_every rows)",
+                "rolling_*": "trailing metrics_window rows of (obs_snow_H, pred_snow_H_*)",
+            },
+        }
+    )
+    return out, report
+
 
+def _print_report(report):
+    alpha_global = report["global_alpha_median"]
+    global_metrics = report["global_metrics"]
     if alpha_global is not None:
         print(f"Global alpha (median across segments): {alpha_global:.6f}")
         print(f"Global metrics (all segments): n={global_metrics['n']} corr={global_metrics['corr']} rmse={global_metrics['rmse']}")
 
-    ok_segs = [v for v in per_seg.values() if v.get("note") == "ok"]
+    ok_segs = [v for v in report["per_segment"] if v.get("note") == "ok"]
     if len(ok_segs) > 0:
         best = sorted(
             ok_segs,
@@ -231,5 +426,103 @@ def main():
         )
 
 
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", required=True)
+    ap.add_argument("--out_dir", required=True)
+
+    ap.add_argument("--time_col", default="time")
+    ap.add_argument("--segment_col", default="segment_id")
+
+    ap.add_argument("--score_col", default="corridor_score")
+    ap.add_argument("--snow_col", default="snowfall_cm")
+
+    ap.add_argument("--horizon_hours", type=int, default=24)
+    # several horizons in one pass (overrides --horizon_hours)
+    ap.add_argument("--horizons", type=int, nargs="+", default=None)
+    ap.add_argument("--layout", choices=["wide", "long"], default="wide")
+    ap.add_argument("--train_frac", type=float, default=0.7)
+
+    ap.add_argument("--rho_scale", type=float, default=1.0)
+
+    ap.add_argument("--min_valid_points", type=int, default=48)
+
+    # walk-forward backtest instead of the static train/test split
+    ap.add_argument("--backtest", action="store_true")
+    ap.add_argument("--refit_every", type=int, default=1)
+    ap.add_argument("--metrics_window", type=int, default=720)
+
+    # --in may be series.csv, series.npz or series.parquet (detected by extension)
+    ap.add_argument("--format", choices=ssum_snow_io.FORMATS, default="csv")
+    ap.add_argument("--float32", action="store_true")
+
+    # per-stage wall / CPU / peak RSS into the report's "timings" block; optional cProfile dump
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--cprofile", default=None, help="write cProfile stats to this path")
+
+    args = ap.parse_args()
+
+    if args.backtest and args.horizons:
+        raise SystemExit("--backtest uses a single --horizon_hours; drop --horizons")
+
+    prof = ssum_snow_profile.Profiler(enabled=args.profile)
+
+    with ssum_snow_profile.cprofile(args.cprofile):
+        with prof.stage("read"):
+            df = ssum_snow_io.read_frame(args.in_path)
+        with prof.stage("time_parsing", len(df)):
+            df = _prepare_series(df, args)
+
+        with prof.stage("calibrate", len(df)):
+            if args.backtest:
+                out, report = _backtest(df, args)
+            elif args.horizons:
+                horizons = sorted(set(int(h) for h in args.horizons))
+                if horizons[0] < 1:
+                    raise SystemExit(f"Horizons must be >= 1 hour: {args.horizons}")
+                out, report = _calibrate_multi(df, args, horizons, args.layout)
+            else:
+                out, report = _calibrate(df, args)
+
+        _make_outdir(args.out_dir)
+        stem = "backtest" if args.backtest else "predictions"
+        pred_path = os.path.join(args.out_dir, stem + ssum_snow_io.EXT[args.format])
+        report_path = os.path.join(args.out_dir, "backtest_report.json" if args.backtest else "calibration_report.json")
+
+        with prof.stage("predictions_write", len(out)):
+            ssum_snow_io.write_frame(out, pred_path, args.format, float32=args.float32)
+
+        with prof.stage("json_write"):
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.profile:
+        # second write adds the timings block (json_write above is the plain report write)
+        report["timings"] = prof.to_dict(rows=len(df), segments=df[args.segment_col].nunique())
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print("SSUM-Snow calibration complete")
+    print(f"Saved: {pred_path}")
+    print(f"Saved: {report_path}")
+
+    if args.backtest:
+        wf = report["walk_forward_metrics_global"]
+        print(f"Walk-forward refits: {report['refits']} (every {report['refit_every']} rows)")
+        print(f"Walk-forward global metrics: n={wf['n']} corr={wf['corr']} rmse={wf['rmse']}")
+    elif args.horizons:
+        for result in report["by_horizon"]:
+            print(f"Horizon {result['horizon_hours']}h:")
+            _print_report(result)
+    else:
+        _print_report(report)
+
+    if args.profile:
+        print("Timings:")
+        prof.print()
+    if args.cprofile:
+        print(f"Saved: {args.cprofile}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,319 @@
+# ssum_snow_chunked.py
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+import ssum_snow
+import ssum_snow_io
+import ssum_snow_core
+import ssum_snow_profile
+
+# ssum_snow.py --chunk_rows: the input is read in chunks and processed in time-sorted blocks;
+# series.csv and summary.json match the in-memory run exactly:
+# - each block carries a halo of max(tct_window_hours, stress_window_hours) rows with their CP
+#   and |dCP|, enough for every window of the block, and the segment id of its first row
+# - S_struct prefix sums continue from a running total carried between blocks, so every
+#   window sum is the in-memory one (np.cumsum is sequential)
+# - top-k lists keep the 12 best (value, row) pairs per list; earlier rows win ties, as in top_k
+# - a first pass fixes what a whole-file read decides per column: the time format to_datetime
+#   infers from the first value, float columns whose first chunks hold only integers, and the
+#   text format of naive times
+# - the input must already be in time order. Rows with equal times are put in the order the
+#   in-memory quicksort gives them, which needs one argsort over all times (16 bytes per row,
+#   only for inputs that repeat a timestamp); blocks never split a run of equal times
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+# what to_datetime skips when it looks for the value to infer the format from
+NAT_STRINGS = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "now", "today"}
+
+TOP_K = 12
+
+SNOW_EVENTS = "observed_snow_events_first200"
+
+SNOW_EVENTS_MAX = 200
+
+
+def time_format(values):
+    # format to_datetime infers for a whole column: from its first non-null value, "mixed"
+    # (per-element parsing) when that is not a string or has no recognisable format
+    for v in values:
+        if v is None or (not isinstance(v, str) and pd.isna(v)) or (isinstance(v, str) and v in NAT_STRINGS):
+            continue
+        return (guess_datetime_format(v) if isinstance(v, str) else None) or "mixed"
+    return None
+
+
+def _parse_times(col, fmt):
+    if fmt is None:
+        return pd.to_datetime(col, errors="coerce")
+    return pd.to_datetime(col, errors="coerce", format=fmt)
+
+
+def _probe_times(ns):
+    # naive times whose presence decides how pandas writes a time column: one that is not at
+    # midnight (else dates only) and the first with ms / us / ns digits
+    out = {}
+    for key, step in (("clock", 86400 * 10**9), ("ms", 10**9), ("us", 10**6), ("ns", 10**3)):
+        hit = ns[ns % step != 0]
+        if len(hit):
+            out[key] = hit[0]
+    return out
+
+
+class Scan:
+    # first pass over the input: columns, rows kept after time parsing, dtype fixes and the
+    # rows the in-memory sort moves (moved[i] takes the row at source[i])
+
+    def __init__(self, src, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.src = src
+        self.chunk_rows = int(chunk_rows)
+        self.columns = None
+        self.rows = 0
+        self.fmt = None
+        self.float_cols = []
+        self.naive = None
+        self.probes = {}
+        self.moved = np.empty(0, dtype=np.int64)
+        self.source = np.empty(0, dtype=np.int64)
+
+        kinds = {}
+        fmt_seen = False
+        last = None
+        ties = False
+        for c in pd.read_csv(src, float_precision="round_trip", chunksize=self.chunk_rows):
+            if self.columns is None:
+                self.columns = list(c.columns)
+                missing = [x for x in ssum_snow_core.INPUT_COLS if x not in self.columns]
+                if missing:
+                    raise SystemExit(f"Missing required columns: {missing}")
+            for name in self.columns:
+                if name != "time":
+                    kinds.setdefault(name, set()).add(c[name].dtype.kind)
+            if not fmt_seen:
+                self.fmt = time_format(c["time"].to_numpy(dtype=object))
+                fmt_seen = self.fmt is not None
+            t = _parse_times(c["time"], self.fmt).dropna()
+            if not len(t):
+                continue
+            self.naive = t.dt.tz is None
+            ns = ssum_snow_io._to_epoch_ns(t)
+            d = np.diff(ns if last is None else np.r_[last, ns])
+            if (d < 0).any():
+                raise SystemExit("--chunk_rows needs the input in time order; sort it or run without --chunk_rows")
+            ties = ties or bool((d == 0).any())
+            if self.naive:
+                for k, v in _probe_times(ns).items():
+                    self.probes.setdefault(k, v)
+            last = ns[-1]
+            self.rows += len(ns)
+        if self.columns is None:
+            raise SystemExit(f"Empty input: {src}")
+
+        # an integer chunk of a column that is float elsewhere is read as float by a whole-file read
+        self.float_cols = [k for k, v in kinds.items() if "f" in v and v <= {"i", "u", "f"} and len(v) > 1]
+        if ties:
+            self._sort_order()
+
+    def _sort_order(self):
+        # the in-memory sort_values("time") order over all kept rows; only runs of equal times move
+        ns = np.empty(self.rows, dtype=np.int64)
+        at = 0
+        for c in pd.read_csv(self.src, usecols=["time"], chunksize=self.chunk_rows):
+            t = ssum_snow_io._to_epoch_ns(_parse_times(c["time"], self.fmt).dropna())
+            ns[at : at + len(t)] = t
+            at += len(t)
+        # pandas sorts datetimes with numpy's datetime64 quicksort (not the int64 one)
+        order = np.argsort(ns.view("M8[ns]"), kind="quicksort")
+        del ns
+        moved = []
+        for start in range(0, len(order), self.chunk_rows):
+            part = order[start : start + self.chunk_rows]
+            moved.append(start + np.flatnonzero(part != np.arange(start, start + len(part))))
+        self.moved = np.concatenate(moved) if moved else np.empty(0, dtype=np.int64)
+        self.source = order[self.moved]
+
+    def blocks(self, prof=None):
+        # (first row, frame) per block of >= chunk_rows rows in time order, time parsed and
+        # dtypes as in a whole-file read; a trailing run of equal times waits for the next chunk
+        prof = prof or ssum_snow_profile.NULL
+        pending = None
+        pos = 0
+        reader = iter(pd.read_csv(self.src, float_precision="round_trip", chunksize=self.chunk_rows))
+        while True:
+            with prof.stage("read_csv"):
+                c = next(reader, None)
+            if c is None:
+                break
+            with prof.stage("time_parsing", len(c)):
+                c["time"] = _parse_times(c["time"], self.fmt)
+                c = c.dropna(subset=["time"])
+                if self.float_cols:
+                    c = c.astype({k: np.float64 for k in self.float_cols})
+                pending = c if pending is None else pd.concat([pending, c], ignore_index=True)
+                ns = ssum_snow_io._to_epoch_ns(pending["time"])
+                cut = int(np.searchsorted(ns, ns[-1], side="left")) if len(ns) else 0
+            if cut:
+                yield pos, self._in_order(pending.iloc[:cut], pos)
+                pending = pending.iloc[cut:].reset_index(drop=True)
+                pos += cut
+        if pending is not None and len(pending):
+            yield pos, self._in_order(pending, pos)
+
+    def _in_order(self, df, pos):
+        a, b = np.searchsorted(self.moved, [pos, pos + len(df)])
+        order = np.arange(len(df))
+        order[self.moved[a:b] - pos] = self.source[a:b] - pos
+        return df.iloc[order].reset_index(drop=True)
+
+    def time_text(self, time):
+        # naive times as a whole-file to_csv writes them (dates only / sub-second digits are
+        # decided over the whole column); tz-aware times are written value by value already
+        if not self.naive or not self.probes:
+            return time
+        probes = pd.Series(np.array(list(self.probes.values()), dtype="M8[ns]")).astype(time.dtype)
+        both = pd.concat([time, probes], ignore_index=True).to_frame()
+        text = both.to_csv(index=False, header=False, lineterminator="\n").split("\n")
+        return pd.Series(text[: len(time)], index=time.index)
+
+
+class _Features:
+    # segment_id / CP / S_struct of consecutive blocks. A block sees a halo of the rows before it
+    # that its windows reach (max(tct, stress) rows, or hours with time windows) with the CP and
+    # |dCP| they got as block rows, the segment id of the first of them, and the running total
+    # of the valid |dCP| before the halo
+
+    def __init__(self, params):
+        self.win = int(params["tct_window_hours"])
+        self.win_stress = int(params["stress_window_hours"])
+        self.gap_hours = params["gap_hours"]
+        self.time_windows = params.get("window_mode") == "time"
+        self.reach = max(self.win, self.win_stress, 1)
+        self.time_ns = np.empty(0, dtype=np.int64)
+        self.temp = np.empty(0)
+        self.rh = np.empty(0)
+        self.cp = np.empty(0)
+        self.jerk = np.empty(0)
+        self.seg0 = 0
+        self.total = 0.0
+
+    def push(self, time_ns, temp, rh):
+        h = len(self.time_ns)
+        t = np.r_[self.time_ns, time_ns]
+        temp = np.r_[self.temp, temp]
+        rh = np.r_[self.rh, rh]
+        if not len(t):
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        seg = self.seg0 + ssum_snow_core.segment_ids(t, self.gap_hours)
+        seg_start = ssum_snow_core.segment_starts(seg)
+        tw = t if self.time_windows else None
+        cp, jerk = ssum_snow_core.core_potential(seg_start, temp, rh, self.win, tw)
+
+        # halo windows may reach past the halo: keep their earlier values, and redo the first
+        # block row's |dCP| against them
+        cp[:h] = self.cp
+        jerk[:h] = self.jerk
+        if 0 < h < len(t) and seg_start[h] != h:
+            jerk[h] = np.abs(cp[h] - cp[h - 1])
+
+        # prefix sums go on from the carried total: the same sums as one cumsum over all rows
+        if self.time_windows:
+            lo = ssum_snow_core.time_window_lo(t, seg_start, self.win_stress)
+            keep = int(np.searchsorted(t, t[-1] - self.reach * ssum_snow_core.HOUR_NS, side="right"))
+        else:
+            lo = ssum_snow_core.window_lo(seg_start, self.win_stress)
+            keep = max(len(t) - self.reach, 0)
+        s_struct = ssum_snow_core.rolling_sum(jerk, lo, self.win_stress, start=self.total)[h:]
+
+        x = jerk[:keep]
+        self.total = ssum_snow_core.prefix_sum(np.where(np.isfinite(x), x, 0.0), start=self.total)[-1]
+        self.time_ns, self.temp, self.rh = t[keep:], temp[keep:], rh[keep:]
+        self.cp, self.jerk = cp[keep:], jerk[keep:]
+        self.seg0 = int(seg[keep])
+        return seg[h:], cp[h:], s_struct
+
+
+class _Summary:
+    # summary.json of the whole series from block summaries: counts, first / last time and
+    # the merged top lists (row = global row index)
+
+    def __init__(self, params):
+        self.params = params
+        self.rows = 0
+        self.start = None
+        self.end = None
+        self.segments = 0
+        self.tops = {k: [] for k in ssum_snow_core.TOP_LISTS}
+        self.first = {}
+        self.snow = []
+
+    def add(self, df, pos):
+        block, tops = ssum_snow._build_summary(df, self.params)
+        if self.start is None:
+            self.start = block["start"]
+        self.end = block["end"]
+        self.rows += len(df)
+        self.segments = int(df["segment_id"].iloc[-1]) + 1
+        for key, col in ssum_snow_core.TOP_LISTS.items():
+            cand = self.tops[key] + [(-r[col], pos + int(i), r) for r, i in zip(block[key], tops[key])]
+            cand.sort(key=lambda c: (c[0], c[1]))
+            self.tops[key] = cand[:TOP_K]
+            if self.tops[key] and self.tops[key][0][1] >= pos:
+                self.first[key] = df.iloc[[self.tops[key][0][1] - pos]]
+        self.snow += block[SNOW_EVENTS][: SNOW_EVENTS_MAX - len(self.snow)]
+
+    def summary(self):
+        out = {
+            "rows": self.rows,
+            "start": self.start,
+            "end": self.end,
+            "segments": self.segments,
+            "params": dict(self.params),
+        }
+        for key in ssum_snow_core.TOP_LISTS:
+            out[key] = [r for _, _, r in self.tops[key]]
+        out[SNOW_EVENTS] = self.snow
+        return out
+
+    def shown(self):
+        # the rows _print_tops shows: the first row of each top list as a small frame, plus tops
+        # indexing into it
+        keys = [k for k in ssum_snow_core.TOP_LISTS if k in self.first]
+        small = pd.concat([self.first[k] for k in keys], ignore_index=True) if keys else pd.DataFrame()
+        none = np.empty(0, dtype=np.int64)
+        tops = {k: (np.array([keys.index(k)]) if k in keys else none) for k in ssum_snow_core.TOP_LISTS}
+        return small, tops
+
+
+def run(src, series_path, params, chunk_rows=DEFAULT_CHUNK_ROWS, prof=None):
+    # chunked run of ssum_snow.py (csv series) -> (summary, small frame, tops) for _print_tops
+    prof = prof or ssum_snow_profile.NULL
+    with prof.stage("scan"):
+        scan = Scan(src, chunk_rows)
+    feats = _Features(params)
+    acc = _Summary(params)
+    columns = scan.columns + [c for c in ssum_snow_core.SERIES_COLS if c not in scan.columns]
+
+    with open(series_path, "w", encoding="utf-8", newline="") as f:
+        for pos, df in scan.blocks(prof):
+            n = len(df)
+            with prof.stage("compute_feats_by_segment", n):
+                seg, cp, s_struct = feats.push(
+                    ssum_snow_io._to_epoch_ns(df["time"]),
+                    df["temperature_C"].to_numpy(dtype=float),
+                    df["humidity_pct"].to_numpy(dtype=float),
+                )
+                df["segment_id"] = seg
+                df["CP"] = cp
+                df["S_struct"] = s_struct
+            with prof.stage("sce_admissibility", n):
+                df = ssum_snow._finish_series(df, params)
+            with prof.stage("summary_build", n):
+                acc.add(df, pos)
+            with prof.stage("series_write", n):
+                out = df.assign(time=scan.time_text(df["time"]))
+                out.to_csv(f, index=False, header=pos == 0)
+        if scan.rows == 0:
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
+
+    small, tops = acc.shown()
+    return acc.summary(), small, tops
@@ -0,0 +1,296 @@
+# ssum_snow_compact.py
+import json
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow_io
+import ssum_snow_core
+import ssum_snow_chunked
+import ssum_snow_profile
+import ssum_snow_corridors
+
+# ssum_snow.py --compact against the float64 reference outputs. Every float column is the
+# reference value rounded to the nearest float32: relative error <= 2**-24 (~6.0e-8) for
+# |x| >= 2**-126 (~1.2e-38), absolute error <= 2**-150 below that (tiny SCE / corridor_score
+# values may flush to 0). depth_min_cm / depth_max_cm are rebuilt from the float32 depth and
+# SCE: <= 3 * 2**-24 relative (while SCE >= 2**-126). CSV text adds <= 2**-24 relative
+# (shortest float32 repr). time, segment_id, admissible, NaN positions and summary.json are exact
+REL_ERR = {"float32": 2.0**-24, "depth_band": 3 * 2.0**-24, "csv_text": 2.0**-24}
+
+ABS_ERR_SUBNORMAL = 2.0**-150
+
+# peak bytes per input row (tracemalloc, 0.2M / 0.5M / 1M rows of six-column evidence inputs,
+# MEASURED_COLUMNS) of a default run (whole-file parse, float64 frame) and a compact run
+# (chunked parse and write: the parsed input columns plus the compact series), plus the compact
+# run's float64 feature block, per row of the block (min(rows, BLOCK_ROWS) rows)
+REFERENCE_PEAK_BYTES_PER_ROW = 170
+PEAK_BYTES_PER_ROW = 66
+BLOCK_PEAK_BYTES_PER_ROW = 340
+
+MEASURED_COLUMNS = ("time", "temperature_C", "humidity_pct", "snowfall_cm", "precip_mm", "dewpoint_C")
+
+# input rows sampled for the size of the other columns
+SAMPLE_ROWS = 1000
+
+NEED = ["time", "temperature_C", "humidity_pct", "snowfall_cm"]
+
+# inputs the engine reads; kept float64 until the features and summary are done
+FLOAT64_INPUTS = ("temperature_C", "humidity_pct", "snowfall_cm")
+
+ON_DEMAND = ("depth_min_cm", "depth_max_cm")
+
+# engine columns held as float32
+STORED_SERIES = ("CP", "S_struct", "SCE", "depth_est_cm", "corridor_score")
+
+CHUNK_ROWS = 1 << 12
+
+# rows per feature block (a multiple of 8, so the admissible bits of each block are whole bytes)
+BLOCK_ROWS = 1 << 16
+
+
+class CompactSeries:
+    # one station's series in compact form: int64 epoch ns times (+ tz name), float32 value
+    # columns (other input columns as given), int32 segment ids, a bit-packed admissible mask,
+    # and depth_min_cm / depth_max_cm computed on demand; `columns` keeps the reference order
+
+    def __init__(self, time_ns, tz, values, segment_id, admissible_bits, columns):
+        self.n = int(len(time_ns))
+        self.time_ns = np.asarray(time_ns, dtype=np.int64)
+        self.tz = tz
+        self.values = {c: (v.astype(np.float32, copy=False) if v.dtype.kind == "f" else v) for c, v in values.items()}
+        self.segment_id = np.asarray(segment_id, dtype=np.int32)
+        self.admissible_bits = np.asarray(admissible_bits, dtype=np.uint8)
+        self.columns = list(columns)
+
+    @property
+    def nbytes(self):
+        arrays = [self.time_ns, self.segment_id, self.admissible_bits]
+        return int(sum(a.nbytes for a in arrays + list(self.values.values())))
+
+    def admissible(self, sl=slice(None)):
+        return np.unpackbits(self.admissible_bits, count=self.n).astype(bool)[sl]
+
+    def column(self, name, sl=slice(None)):
+        if name == "segment_id":
+            return self.segment_id[sl]
+        if name == "admissible":
+            return self.admissible(sl)
+        if name in ON_DEMAND:
+            depth = self.values["depth_est_cm"][sl].astype(np.float64)
+            sce_c = np.clip(self.values["SCE"][sl].astype(np.float64), 0.0, 1.0)
+            band = depth * sce_c if name == "depth_min_cm" else depth * (2.0 - sce_c)
+            return band.astype(np.float32)
+        return self.values[name][sl]
+
+    def frame(self, sl=slice(None)):
+        # pandas frame of rows `sl` with every column, time as datetimes
+        data = {c: self.column(c, sl) for c in self.columns if c != "time"}
+        data["time"] = _times(self.time_ns[sl], self.tz)
+        return pd.DataFrame(data, columns=self.columns)
+
+    def write(self, path, fmt, chunk_rows=CHUNK_ROWS):
+        if fmt == "csv":
+            # a chunk of rows at a time, so no full-size text or float64 frame is built
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                for start in range(0, max(self.n, 1), int(chunk_rows)):
+                    sl = slice(start, min(start + int(chunk_rows), self.n))
+                    self.frame(sl).to_csv(f, index=False, header=start == 0)
+        elif fmt == "npz":
+            # same layout as ssum_snow_io._write_npz(float32=True), straight from the arrays
+            meta = {"columns": self.columns, "time_cols": {"time": self.tz}, "text_cols": [], "float32": True}
+            arrays = {}
+            for c in self.columns:
+                if c == "time":
+                    arrays[c] = self.time_ns
+                elif c == "segment_id":
+                    arrays[c] = self.segment_id.astype(np.int64)
+                elif c in self.values and self.values[c].dtype.kind == "O":
+                    meta["text_cols"].append(c)
+                    arrays[c] = ssum_snow_io._text_array(self.values[c])
+                else:
+                    arrays[c] = self.column(c)
+            arrays[ssum_snow_io.META_KEY] = np.array(json.dumps(meta))
+            with open(path, "wb") as f:
+                np.savez(f, **arrays)
+        else:
+            ssum_snow_io.write_frame(self.frame(), path, fmt, float32=True)
+        return path
+
+
+def _times(time_ns, tz):
+    t = pd.to_datetime(np.asarray(time_ns, dtype=np.int64), unit="ns", utc=True)
+    return t.tz_convert(tz) if tz is not None else t.tz_localize(None)
+
+
+def _read_columns(src, chunk_rows, prof, narrow=True):
+    # csv -> columns, sorted epoch ns times, tz and {column: array}, one chunk of text at a
+    # time; float columns the engine does not read are narrowed to float32 per chunk
+    times, parts, columns, tz, fmt = [], {}, None, None, None
+    with prof.stage("read_csv"):
+        for c in pd.read_csv(src, float_precision="round_trip", chunksize=int(chunk_rows)):
+            if columns is None:
+                columns = list(c.columns)
+                missing = [x for x in NEED if x not in columns]
+                if missing:
+                    raise SystemExit(f"Missing required columns: {missing}")
+            # the format a whole-column to_datetime would infer (from the first value)
+            fmt = fmt or ssum_snow_chunked.time_format(c["time"].to_numpy(dtype=object))
+            t = ssum_snow_chunked._parse_times(c["time"], fmt)
+            keep = t.notna().to_numpy()
+            if keep.any():
+                tz = t.dt.tz
+            times.append(ssum_snow_io._to_epoch_ns(t[keep]))
+            for name in columns:
+                if name == "time":
+                    continue
+                v = c[name].to_numpy()[keep]
+                if narrow and v.dtype.kind == "f" and name not in FLOAT64_INPUTS:
+                    v = v.astype(np.float32)
+                parts.setdefault(name, []).append(v)
+    if columns is None:
+        raise SystemExit(f"Empty input: {src}")
+
+    with prof.stage("time_parsing"):
+        time_ns = np.concatenate(times)
+        del times
+        # already in time order (no equal times) needs no sort; else the permutation of the
+        # reference sort_values("time"): numpy's datetime64 quicksort
+        order = None
+        if len(time_ns) > 1 and not (np.diff(time_ns) > 0).all():
+            order = np.argsort(time_ns.view("M8[ns]"), kind="quicksort")
+            time_ns = time_ns[order]
+        values = {}
+        for name in list(parts):
+            v = np.concatenate(parts.pop(name))
+            if order is not None:
+                v = v[order]
+            if narrow and v.dtype == np.float64 and name not in FLOAT64_INPUTS:
+                # integer chunks of a float column
+                v = v.astype(np.float32)
+            values[name] = v
+    return columns, time_ns, (None if tz is None else str(tz)), values
+
+
+def compute(src, params, prof=None, corridors=None, chunk_rows=CHUNK_ROWS, block_rows=BLOCK_ROWS):
+    # csv input -> (CompactSeries, summary, small frame + tops for _print_tops, corridor extract or
+    # None). Features, summary and corridors run block by block on float64 values, as in
+    # ssum_snow_chunked, and each block goes straight into the compact columns
+    prof = prof or ssum_snow_profile.NULL
+    rule = params.get("hourly")
+    # hourly means are taken in float64 (as ssum_snow._normalize_hourly does), so nothing is
+    # narrowed before the normalization
+    columns, time_ns, tz, values = _read_columns(src, chunk_rows, prof, narrow=not rule)
+    if rule:
+        with prof.stage("hourly_normalization", len(time_ns)):
+            time_ns, values = _hourly(time_ns, values, rule)
+    n = len(time_ns)
+    for c in ssum_snow_core.SERIES_COLS:
+        if c not in columns:
+            columns.append(c)
+
+    segment_id = np.empty(n, dtype=np.int32)
+    admissible_bits = np.empty((n + 7) // 8, dtype=np.uint8)
+    out = {c: np.empty(n, dtype=np.float32) for c in STORED_SERIES}
+    feats = ssum_snow_chunked._Features(params)
+    acc = ssum_snow_chunked._Summary(params)
+    runs = ssum_snow_corridors.Blocks(corridors) if corridors else None
+    step = max(8, int(block_rows) // 8 * 8)
+    for a in range(0, n, step):
+        b = min(a + step, n)
+        t = time_ns[a:b]
+        snow = values["snowfall_cm"][a:b].astype(np.float64)
+        with prof.stage("compute_feats_by_segment", b - a):
+            seg, cp, s_struct = feats.push(
+                t,
+                values["temperature_C"][a:b].astype(np.float64),
+                values["humidity_pct"][a:b].astype(np.float64),
+            )
+        with prof.stage("sce_admissibility", b - a):
+            cols = ssum_snow_core.finish(cp, s_struct, params)
+            cols.update(segment_id=seg, CP=cp, S_struct=s_struct)
+        with prof.stage("summary_build", b - a):
+            acc.add(pd.DataFrame({"time": _times(t, tz), "snowfall_cm": snow, **cols}), a)
+        if runs is not None:
+            with prof.stage("corridors", b - a):
+                runs.push(t, cols["admissible"], seg, cols["corridor_score"], cols["depth_est_cm"], snow)
+        with prof.stage("compact", b - a):
+            segment_id[a:b] = seg
+            admissible_bits[a // 8 : (b + 7) // 8] = np.packbits(cols["admissible"])
+            for c in STORED_SERIES:
+                out[c][a:b] = cols[c]
+
+    # engine inputs are narrowed last, one at a time
+    for c in FLOAT64_INPUTS:
+        if values[c].dtype.kind == "f":
+            values[c] = values[c].astype(np.float32)
+    values.update(out)
+    series = CompactSeries(time_ns, tz, values, segment_id, admissible_bits, columns)
+    small, tops = acc.shown()
+    return series, acc.summary(), small, tops, (None if runs is None else runs.result())
+
+
+def _hourly(time_ns, values, rule):
+    # array form of ssum_snow._normalize_hourly: numeric columns reduced per hour, others take
+    # the hour's last row; float columns outside FLOAT64_INPUTS are narrowed afterwards
+    hours, first = ssum_snow_core.hourly_bins(time_ns)
+    last = np.r_[first[1:], len(time_ns)] - 1
+    out = {}
+    for name, v in values.items():
+        if v.dtype.kind in "iuf":
+            v = ssum_snow_core.hourly_reduce(v.astype(np.float64), first, ssum_snow_core.hourly_rule(name, rule))
+            out[name] = v if name in FLOAT64_INPUTS else v.astype(np.float32)
+        else:
+            out[name] = v[last]
+    return hours, out
+
+
+def count_rows(path):
+    # data rows of a csv input without parsing it (newlines minus the header)
+    n = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            n += block.count(b"\n")
+            last = block[-1:]
+    return max(0, n - 1 + (last != b"\n"))
+
+
+def extra_bytes_per_row(path, compact=True):
+    # bytes per row of the input columns beyond MEASURED_COLUMNS, from the first SAMPLE_ROWS
+    # rows: float columns at the width they are held in, others at their in-memory size
+    sample = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    if not len(sample):
+        return 0.0
+    extra = 0.0
+    for c in sample.columns:
+        if c in MEASURED_COLUMNS:
+            continue
+        if sample[c].dtype.kind == "f":
+            extra += 4 if compact else 8
+        else:
+            extra += sample[c].memory_usage(deep=True, index=False) / len(sample)
+    return extra
+
+
+def estimate_peak(rows, extra_per_row=0.0, compact=True):
+    # estimated peak bytes of a run over `rows` rows (one block of a chunked run)
+    if compact:
+        return int(rows * (PEAK_BYTES_PER_ROW + extra_per_row) + min(rows, BLOCK_ROWS) * BLOCK_PEAK_BYTES_PER_ROW)
+    return int(rows * (REFERENCE_PEAK_BYTES_PER_ROW + extra_per_row))
+
+
+def budget_check(rows, budget_bytes, compact=True, chunked=False, extra_per_row=0.0):
+    # estimated peak bytes; SystemExit when it exceeds the budget. Memory is not tracked
+    # during the run
+    need = estimate_peak(rows, extra_per_row, compact)
+    if need > budget_bytes:
+        if chunked:
+            hint = "lower --chunk_rows"
+        else:
+            hint = "split the input by station or year" + ("" if compact else ", or use --compact")
+        raise SystemExit(
+            f"Memory budget exceeded: ~{need / 2**20:.1f} MiB estimated for {rows} rows "
+            f"(budget {budget_bytes / 2**20:.1f} MiB); {hint}"
+        )
+    return need
\ No newline at end of file
@@ -0,0 +1,419 @@
+# ssum_snow_core.py
+# structural core on NumPy and the standard library only: importing it does not load pandas,
+# so scheduled incremental runs start fast. ssum_snow.py wraps it for DataFrames
+import io
+import csv
+import datetime as dt
+
+import numpy as np
+
+INPUT_COLS = ["time", "temperature_C", "humidity_pct", "snowfall_cm"]
+
+SERIES_COLS = [
+    "segment_id",
+    "CP",
+    "S_struct",
+    "SCE",
+    "admissible",
+    "depth_est_cm",
+    "depth_min_cm",
+    "depth_max_cm",
+    "corridor_score",
+]
+
+# summary.json top lists and the column each is ranked by
+TOP_LISTS = {
+    "top_CP": "CP",
+    "top_depth_any": "depth_est_cm",
+    "top_depth_admissible": "depth_est_cm",
+    "top_depth_admissible_snow": "depth_est_cm",
+    "top_corridor_any": "corridor_score",
+    "top_corridor_admissible": "corridor_score",
+    "top_corridor_admissible_snow": "corridor_score",
+}
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+HOUR_NS = 3600 * 1_000_000_000
+
+# hourly normalization: state variables take the last / first valid observation of the hour
+# or the mean of its valid observations; accumulated amounts take the largest report, since
+# ISD specials within an hour repeat the running total
+HOURLY_RULES = ("last", "first", "mean")
+
+HOURLY_MAX_COLS = ("snowfall_cm", "precip_mm")
+
+
+def segment_ids(time_ns: np.ndarray, gap_hours: float) -> np.ndarray:
+    # a new segment after every gap > gap_hours, same cut as ssum_snow._segment_ids
+    cut = np.zeros(time_ns.shape, dtype=np.int64)
+    if time_ns.shape[-1] > 1:
+        dt_h = (np.diff(time_ns, axis=-1) / 1e9) / 3600.0
+        cut[..., 1:] = dt_h > float(gap_hours)
+    return np.cumsum(cut, axis=-1)
+
+
+def segment_starts(seg: np.ndarray) -> np.ndarray:
+    # index of the first row of the segment each row belongs to (along the last axis)
+    n = seg.shape[-1]
+    first = np.ones(seg.shape, dtype=bool)
+    if n > 1:
+        first[..., 1:] = seg[..., 1:] != seg[..., :-1]
+    return np.maximum.accumulate(np.where(first, np.arange(n), 0), axis=-1)
+
+
+def window_lo(seg_start: np.ndarray, win: int) -> np.ndarray:
+    # first row of the trailing `win`-row window, clipped at the segment start
+    return np.maximum(np.arange(seg_start.shape[-1]) - (int(win) - 1), seg_start)
+
+
+def time_window_lo(time_ns: np.ndarray, seg_start: np.ndarray, hours: float) -> np.ndarray:
+    # first row of the trailing time window (t - hours, t], clipped at the segment start
+    # (pandas rolling("<hours>h") per segment). Running max keeps matrix padding sorted
+    t = np.maximum.accumulate(np.asarray(time_ns, dtype=np.int64), axis=-1)
+    edge = t - int(round(float(hours) * HOUR_NS))
+    lo = np.empty(t.shape, dtype=np.int64)
+    t2, e2, lo2 = t.reshape(-1, t.shape[-1]), edge.reshape(-1, t.shape[-1]), lo.reshape(-1, t.shape[-1])
+    for i in range(t2.shape[0]):
+        lo2[i] = np.searchsorted(t2[i], e2[i], side="right")
+    return np.maximum(lo, seg_start)
+
+
+def window_span(lo: np.ndarray) -> int:
+    # rows in the longest window
+    return int((np.arange(lo.shape[-1]) - lo).max()) + 1 if lo.size else 1
+
+
+def prefix_sum(x: np.ndarray, dtype=None, start=0) -> np.ndarray:
+    # running sums along the last axis with a leading zero, or a running total `start` carried
+    # in from earlier rows (the same sequential sums as one cumsum over all the rows)
+    c = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,), dtype=dtype or x.dtype)
+    if start:
+        c[..., 0] = start
+        c[..., 1:] = x
+        np.cumsum(c, axis=-1, out=c)
+    else:
+        np.cumsum(x, axis=-1, dtype=dtype, out=c[..., 1:])
+    return c
+
+
+def window_count(valid: np.ndarray, lo: np.ndarray) -> np.ndarray:
+    c = prefix_sum(valid, np.int64)
+    return c[..., 1:] - np.take_along_axis(c, lo, axis=-1)
+
+
+def sparse_table(x: np.ndarray, win: int, op) -> list:
+    levels = [x]
+    span = 1
+    while 2 * span <= max(1, int(win)):
+        prev = levels[-1]
+        nxt = prev.copy()
+        m = max(prev.shape[-1] - span, 0)
+        nxt[..., :m] = op(prev[..., :m], prev[..., span:])
+        levels.append(nxt)
+        span *= 2
+    return levels
+
+
+def window_reduce(levels: list, lo: np.ndarray, op) -> np.ndarray:
+    n = lo.shape[-1]
+    hi = np.arange(n)
+    length = hi - lo + 1
+    top = len(levels) - 1
+    win = int(length.max()) if length.size else 0
+
+    # full-length windows (all but the first rows of each segment): two shifted slices
+    # of the widest level
+    out = np.empty(lo.shape, dtype=levels[0].dtype)
+    span = 1 << top
+    if win >= span:
+        out[..., win - 1 :] = op(levels[top][..., : n - win + 1], levels[top][..., win - span : n - span + 1])
+        clipped = length < win
+    else:
+        clipped = np.ones(lo.shape, dtype=bool)
+
+    # clipped windows near segment starts: gather from the widest level that fits
+    r = int(np.prod(lo.shape[:-1]))
+    rows, slots = np.nonzero(clipped.reshape(r, n))
+    lo_c = lo.reshape(r, n)[rows, slots]
+    k = np.zeros(len(slots), dtype=np.int64)
+    for j in range(1, len(levels)):
+        k[slots - lo_c + 1 >= (1 << j)] = j
+    flat = out.reshape(r, n)
+    for j in range(len(levels)):
+        sel = k == j
+        level = levels[j].reshape(r, n)
+        rs, ss = rows[sel], slots[sel]
+        flat[rs, ss] = op(level[rs, lo_c[sel]], level[rs, ss - (1 << j) + 1])
+    return out
+
+
+def rolling_range(x: np.ndarray, lo: np.ndarray, win: int, span: int = None) -> np.ndarray:
+    # equivalent to rolling(win, min_periods=max(6, win // 3)) max - min, per segment;
+    # `span` is the longest window in rows when the windows are time-based
+    x = np.asarray(x, dtype=float)
+    valid = np.isfinite(x)
+    mp = max(6, win // 3)
+    span = win if span is None else span
+    rmax = window_reduce(sparse_table(np.where(valid, x, -np.inf), span, np.maximum), lo, np.maximum)
+    rmin = window_reduce(sparse_table(np.where(valid, x, np.inf), span, np.minimum), lo, np.minimum)
+    out = rmax - rmin
+    out[window_count(valid, lo) < mp] = np.nan
+    return out
+
+
+def rolling_sum(x: np.ndarray, lo: np.ndarray, win: int, start=0.0) -> np.ndarray:
+    # equivalent to rolling(win, min_periods=max(6, win // 3)).sum(), per segment; `start` is
+    # the sum of the valid values before x (ssum_snow_chunked)
+    valid = np.isfinite(x)
+    mp = max(6, int(win) // 3)
+    c = prefix_sum(np.where(valid, x, 0.0), start=start)
+    out = c[..., 1:] - np.take_along_axis(c, lo, axis=-1)
+    out[window_count(valid, lo) < mp] = np.nan
+    return out
+
+
+def core_potential(seg_start: np.ndarray, temp: np.ndarray, rh: np.ndarray, win: int, time_ns=None):
+    # CP and |dCP| between consecutive rows (NaN at segment starts), the input of S_struct
+    if time_ns is None:
+        lo, span = window_lo(seg_start, win), None
+    else:
+        lo = time_window_lo(time_ns, seg_start, win)
+        span = window_span(lo)
+
+    dT = rolling_range(temp, lo, win, span)
+    dH = rolling_range(rh, lo, win, span)
+
+    # Core Potential (CP)
+    cp = (dT * dH) / float(max(1, win))
+
+    # Structural stress: rolling sum of CP "jerk"
+    cp_jerk = np.full(cp.shape, np.nan)
+    if cp.shape[-1] > 1:
+        cp_jerk[..., 1:] = np.abs(cp[..., 1:] - cp[..., :-1])
+    cp_jerk[seg_start == np.arange(cp.shape[-1])] = np.nan
+    return cp, cp_jerk
+
+
+def features(seg: np.ndarray, temp: np.ndarray, rh: np.ndarray, win: int, win_stress: int, time_ns=None):
+    # CP and S_struct along the last axis: one series, or a stations x rows matrix. Windows
+    # are `win` rows, or `win` hours of time when the row times are given
+    seg_start = segment_starts(seg)
+    cp, cp_jerk = core_potential(seg_start, temp, rh, win, time_ns)
+    if time_ns is None:
+        lo_stress = window_lo(seg_start, win_stress)
+    else:
+        lo_stress = time_window_lo(time_ns, seg_start, win_stress)
+    s_struct = rolling_sum(cp_jerk, lo_stress, win_stress)
+    return cp, s_struct
+
+
+def hourly_bins(time_ns: np.ndarray):
+    # sorted epoch ns -> (start of each observed hour, first row of each hour)
+    hour = (np.asarray(time_ns, dtype=np.int64) // HOUR_NS) * HOUR_NS
+    first = np.flatnonzero(np.r_[True, hour[1:] != hour[:-1]]) if len(hour) else np.empty(0, dtype=np.int64)
+    return hour[first], first
+
+
+def hourly_reduce(x: np.ndarray, first: np.ndarray, rule: str) -> np.ndarray:
+    # one value per hour (rows first[i] .. first[i + 1] - 1): the last / first valid value, the
+    # mean of the valid values, or the largest ("max"); NaN when the hour has no valid value
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n == 0:
+        return x
+    valid = ~np.isnan(x)
+    if rule == "max":
+        return np.fmax.reduceat(x, first)
+    if rule == "mean":
+        count = np.add.reduceat(valid.astype(np.int64), first)
+        total = np.add.reduceat(np.where(valid, x, 0.0), first)
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    pos = np.arange(n)
+    if rule == "last":
+        pick = np.maximum.reduceat(np.where(valid, pos, -1), first)
+    elif rule == "first":
+        pick = np.minimum.reduceat(np.where(valid, pos, n), first)
+    else:
+        raise ValueError(f"Unknown hourly rule: {rule}")
+    found = (pick >= 0) & (pick < n)
+    return np.where(found, x[np.clip(pick, 0, n - 1)], np.nan)
+
+
+def hourly_rule(column: str, rule: str) -> str:
+    return "max" if column in HOURLY_MAX_COLS else rule
+
+
+def top_k(values: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    # row indices of the k largest `values` among `mask` rows;
+    # ties keep row (time) order, like a stable descending sort
+    idx = np.flatnonzero(mask)
+    if k <= 0:
+        return idx[:0]
+    if len(idx) > k:
+        v = values[idx]
+        kth = np.partition(v, len(v) - k)[len(v) - k]
+        above = idx[v > kth]
+        ties = idx[v == kth][: k - len(above)]
+        idx = np.concatenate((above, ties))
+    order = np.lexsort((idx, -values[idx]))
+    return idx[order]
+
+
+def finish(cp: np.ndarray, s_struct: np.ndarray, params: dict) -> dict:
+    # SCE, admissibility and depth / corridor columns from CP and S_struct (any shape)
+    cp = np.asarray(cp, dtype=float)
+    s_struct = np.asarray(s_struct, dtype=float)
+
+    # Structural Confidence Envelope
+    # `SCE = exp(-S_struct)`
+    sce = np.exp(-s_struct)
+    sce[np.isnan(s_struct)] = np.nan
+
+    # Admissibility corridor rule
+    with np.errstate(invalid="ignore"):
+        admissible = (
+            (cp >= float(params["cp_threshold"]))
+            & (s_struct <= float(params["s_max"]))
+            & (~np.isnan(cp))
+            & (~np.isnan(s_struct))
+        )
+
+    # Depth estimate (monotone in CP)
+    # `depth_est_cm = k_depth * log(CP + 1)`
+    with np.errstate(divide="ignore", invalid="ignore"):
+        depth = float(params["k_depth"]) * np.log(cp + 1.0)
+    depth[np.isnan(cp)] = 0.0
+    depth[depth < 0.0] = 0.0
+
+    # Optional min/max band using SCE (kept for continuity)
+    sce_c = np.clip(sce, 0.0, 1.0)
+
+    # NEW: Corridor Score (forecastable snow window score)
+    # `corridor_score = depth_est_cm * SCE`
+    corridor = depth * sce_c
+    corridor[np.isnan(sce)] = np.nan
+
+    return {
+        "SCE": sce,
+        "admissible": admissible,
+        "depth_est_cm": depth,
+        "depth_min_cm": depth * sce_c,
+        "depth_max_cm": depth * (2.0 - sce_c),
+        "corridor_score": corridor,
+    }
+
+
+def compute_series(time_ns: np.ndarray, temp: np.ndarray, rh: np.ndarray, params: dict) -> dict:
+    # every SERIES_COLS column for one time-sorted station series
+    time_ns = np.asarray(time_ns, dtype=np.int64)
+    seg = segment_ids(time_ns, params["gap_hours"])
+    cp, s_struct = features(
+        seg,
+        np.asarray(temp, dtype=float),
+        np.asarray(rh, dtype=float),
+        int(params["tct_window_hours"]),
+        int(params["stress_window_hours"]),
+        time_ns if params.get("window_mode") == "time" else None,
+    )
+    out = {"segment_id": seg, "CP": cp, "S_struct": s_struct}
+    out.update(finish(cp, s_struct, params))
+    return out
+
+
+def parse_time(text):
+    # ISO-8601 text -> datetime (naive times are UTC); None when unparseable
+    text = str(text).strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return dt.datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def to_ns(t):
+    # int64 epoch nanoseconds from an int (already ns), ISO text, datetime / pandas Timestamp
+    # or numpy datetime64; naive times are UTC
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    if isinstance(t, np.datetime64):
+        return int(t.astype("datetime64[ns]").astype(np.int64))
+    if isinstance(getattr(t, "value", None), (int, np.integer)):
+        # pandas Timestamp: exact nanoseconds
+        return int(t.value)
+    if isinstance(t, str):
+        parsed = parse_time(t)
+        if parsed is None:
+            raise ValueError(f"Unparseable time: {t!r}")
+        t = parsed
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=dt.timezone.utc)
+    d = t - _EPOCH
+    return (d.days * 86400 + d.seconds) * 1_000_000_000 + d.microseconds * 1000
+
+
+def from_ns(ns):
+    # epoch nanoseconds -> UTC datetime (microsecond precision)
+    return _EPOCH + dt.timedelta(microseconds=int(ns) // 1000)
+
+
+def format_times(times):
+    # datetimes as pandas writes a datetime column ("2024-01-01 00:00:00+00:00"); microseconds
+    # are written for every row when any row has them
+    spec = "microseconds" if any(t.microsecond for t in times) else "seconds"
+    return [t.isoformat(sep=" ", timespec=spec) for t in times]
+
+
+def format_value(v):
+    # CSV text as pandas writes it: NaN empty, floats shortest round-trip, bools True / False
+    if isinstance(v, (bool, np.bool_)):
+        return "True" if v else "False"
+    if isinstance(v, (float, np.floating)):
+        return "" if v != v else repr(float(v))
+    return str(v)
+
+
+def read_csv(src, need=INPUT_COLS):
+    # stdlib read of an SSUM input CSV: (header, rows, times) with rows whose time does not
+    # parse dropped and the rest stably sorted by time (equal timestamps keep file order, as
+    # in ssum_snow_stream.py); cell values stay text
+    if isinstance(src, (bytes, bytearray)):
+        src = io.StringIO(src.decode("utf-8"))
+    f = open(src, "r", encoding="utf-8", newline="") if isinstance(src, str) else src
+    try:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        missing = [c for c in need if c not in header]
+        if missing:
+            raise SystemExit(f"Missing required columns: {missing}")
+        ti = header.index("time")
+        rows = []
+        times = []
+        for row in reader:
+            if not row:
+                continue
+            t = parse_time(row[ti]) if ti < len(row) else None
+            if t is None:
+                continue
+            rows.append(row)
+            times.append(t)
+    finally:
+        if f is not src:
+            f.close()
+
+    ns = np.array([to_ns(t) for t in times], dtype=np.int64)
+    order = np.argsort(ns, kind="stable")
+    return header, [rows[i] for i in order], [times[i] for i in order]
+
+
+def float_column(header, rows, name):
+    # text cells -> float64 (empty / unparseable cells are NaN, as pandas reads them)
+    i = header.index(name)
+    out = np.full(len(rows), np.nan)
+    for j, row in enumerate(rows):
+        try:
+            out[j] = float(row[i])
+        except (ValueError, IndexError):
+            pass
+    return out
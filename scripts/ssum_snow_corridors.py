@@ -0,0 +1,285 @@
+# ssum_snow_corridors.py
+import os
+import glob
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow_io
+import ssum_snow_core
+
+# admissible: runs of admissible rows; snow: runs of admissible rows with snowfall_cm > 0
+MODES = ("admissible", "snow")
+
+COLUMNS = [
+    "station",
+    "corridor_id",
+    "segment_id",
+    "start",
+    "end",
+    "rows",
+    "duration_h",
+    "peak_corridor_score",
+    "peak_time",
+    "depth_cm_h",
+    "snow_rows",
+]
+
+TABLE_NAME = "corridors.csv"
+
+HOUR_NS = 3600 * 1_000_000_000
+
+# epoch-ns value pandas reads as NaT (a corridor whose scores are all NaN has no peak_time)
+NAT = np.iinfo(np.int64).min
+
+
+def _runs(mask, seg):
+    # first / last row of each run of True in `mask` that stays within one segment
+    n = len(mask)
+    cut = np.ones(n + 1, dtype=bool)
+    cut[1:-1] = seg[1:] != seg[:-1]
+    starts = np.flatnonzero(mask & (cut[:-1] | ~np.r_[False, mask[:-1]]))
+    ends = np.flatnonzero(mask & (cut[1:] | ~np.r_[mask[1:], False]))
+    return starts, ends
+
+
+def _reduce(op, x, starts, stops, fill):
+    # op over x[starts[i]:stops[i]] for every run (stops > starts)
+    if len(starts) == 0:
+        return np.empty(0, dtype=x.dtype)
+    return op.reduceat(np.append(x, fill), np.ravel([starts, stops], order="F"))[::2]
+
+
+def extract(time_ns, admissible, segment_id, corridor_score, depth_est_cm, snowfall_cm, mode="admissible"):
+    # corridors of one station's series (rows in time order) -> dict of per-corridor arrays:
+    # contiguous runs of admissible rows within one segment (and snowfall_cm > 0 in "snow" mode)
+    t = np.asarray(time_ns, dtype=np.int64)
+    seg = np.asarray(segment_id)
+    score = np.asarray(corridor_score, dtype=float)
+    depth = np.asarray(depth_est_cm, dtype=float)
+    snow = np.asarray(snowfall_cm, dtype=float) > 0.0
+    mask = np.asarray(admissible, dtype=bool)
+    if mode == "snow":
+        mask = mask & snow
+    starts, ends = _runs(mask, seg)
+    n = len(t)
+
+    # first row holding the run's peak score (NaN scores are skipped)
+    peak = _reduce(np.fmax, score, starts, ends + 1, np.nan)
+    rows = np.flatnonzero(mask)
+    run_of = np.searchsorted(starts, rows, side="right") - 1
+    at_peak = np.full(n, n, dtype=np.int64)
+    at_peak[rows] = np.where(score[rows] == peak[run_of], rows, n)
+    peak_row = _reduce(np.minimum, at_peak, starts, ends + 1, n)
+
+    # trapezoidal time integral of depth_est_cm (cm * h) between consecutive corridor rows
+    area = np.zeros(n)
+    if n > 1:
+        area[:-1] = np.nan_to_num(0.5 * (depth[:-1] + depth[1:]) * (np.diff(t) / HOUR_NS))
+    depth_cm_h = np.where(ends > starts, _reduce(np.add, area, starts, np.maximum(ends, starts + 1), 0.0), 0.0)
+
+    return {
+        "segment_id": seg[starts],
+        "start_ns": t[starts],
+        "end_ns": t[ends],
+        "rows": ends - starts + 1,
+        "duration_h": (t[ends] - t[starts]) / HOUR_NS,
+        "peak_corridor_score": peak,
+        "peak_ns": np.where(peak_row < n, t[np.minimum(peak_row, max(n - 1, 0))], NAT),
+        "depth_cm_h": depth_cm_h,
+        "snow_rows": _reduce(np.add, snow.astype(np.int64), starts, ends + 1, 0),
+    }
+
+
+class Blocks:
+    # extract() over consecutive blocks of one series (same arguments, block by block): a run
+    # still open at the end of a block is carried into the next one, so every corridor is
+    # extracted from all of its rows at once and matches the whole-series result
+
+    def __init__(self, mode="admissible"):
+        self.mode = mode
+        self.tail = None
+        self.parts = []
+
+    def push(self, time_ns, admissible, segment_id, corridor_score, depth_est_cm, snowfall_cm):
+        cols = [
+            np.asarray(time_ns, dtype=np.int64),
+            np.asarray(admissible, dtype=bool),
+            np.asarray(segment_id),
+            np.asarray(corridor_score, dtype=float),
+            np.asarray(depth_est_cm, dtype=float),
+            np.asarray(snowfall_cm, dtype=float),
+        ]
+        if self.tail is not None:
+            cols = [np.concatenate((a, b)) for a, b in zip(self.tail, cols)]
+        c = extract(*cols, self.mode)
+        self.tail = None
+        last = cols[1][-1:] & (cols[5][-1:] > 0.0) if self.mode == "snow" else cols[1][-1:]
+        if last.any():
+            start = len(cols[0]) - int(c["rows"][-1])
+            self.tail = [a[start:] for a in cols]
+            c = {k: v[:-1] for k, v in c.items()}
+        self.parts.append(c)
+
+    def result(self):
+        parts = self.parts + ([extract(*self.tail, self.mode)] if self.tail is not None else [])
+        if not parts:
+            none = np.empty(0, dtype=np.int64)
+            return extract(none, none, none, none, none, none, self.mode)
+        return {k: np.concatenate([c[k] for c in parts]) for k in parts[0]}
+
+
+def table(df, station, mode="admissible"):
+    # finished series frame -> corridor table (COLUMNS), times in the series' timezone
+    time = df["time"]
+    c = extract(
+        ssum_snow_io._to_epoch_ns(time),
+        df["admissible"].to_numpy(dtype=bool),
+        df["segment_id"].to_numpy(),
+        df["corridor_score"].to_numpy(dtype=float),
+        df["depth_est_cm"].to_numpy(dtype=float),
+        df["snowfall_cm"].to_numpy(dtype=float),
+        mode,
+    )
+    return frame(c, station, time.dt.tz)
+
+
+def frame(c, station, tz=None):
+    # extract() result -> corridor table (COLUMNS), times in timezone `tz` (naive when None)
+
+    def times(ns):
+        t = pd.to_datetime(ns, unit="ns", utc=True)
+        return t.tz_convert(tz) if tz is not None else t.tz_localize(None)
+
+    k = len(c["start_ns"])
+    return pd.DataFrame(
+        {
+            "station": [station] * k,
+            "corridor_id": np.arange(k),
+            "segment_id": c["segment_id"],
+            "start": times(c["start_ns"]),
+            "end": times(c["end_ns"]),
+            "rows": c["rows"],
+            "duration_h": c["duration_h"],
+            "peak_corridor_score": c["peak_corridor_score"],
+            "peak_time": times(c["peak_ns"]),
+            "depth_cm_h": c["depth_cm_h"],
+            "snow_rows": c["snow_rows"],
+        },
+        columns=COLUMNS,
+    )
+
+
+def station_name(path):
+    name = os.path.basename(str(path))
+    suffix = "_SSUM_INPUT.csv"
+    return name[: -len(suffix)] if name.endswith(suffix) else os.path.splitext(name)[0]
+
+
+def write_table(tab, path):
+    tab.to_csv(path, index=False)
+    return path
+
+
+def read_table(path):
+    tab = pd.read_csv(path, float_precision="round_trip", dtype={"station": str})
+    for c in ("start", "end", "peak_time"):
+        tab[c] = pd.to_datetime(tab[c], errors="coerce", utc=True)
+    return tab
+
+
+class CorridorIndex:
+    # corridors of many stations sorted by (station, start), with a per-station running max of
+    # `end`: "which corridors overlap [t0, t1]" is two binary searches per station. One
+    # station's corridors never overlap, so the result needs no further scan; tables that
+    # repeat a station (overlapping inputs) are filtered on `end` after the searches
+
+    def __init__(self, tab):
+        tab = tab.copy()
+        for c in ("start", "end", "peak_time"):
+            tab[c] = pd.to_datetime(tab[c], errors="coerce", utc=True)
+        tab = tab.sort_values(["station", "start"], kind="stable").reset_index(drop=True)
+        self.table = tab
+        self.start = ssum_snow_io._to_epoch_ns(tab["start"])
+        self.end = ssum_snow_io._to_epoch_ns(tab["end"])
+        names = tab["station"].to_numpy(dtype=object)
+        cuts = np.flatnonzero(np.r_[True, names[1:] != names[:-1], True]) if len(names) else np.array([0])
+        self.bounds = {names[lo]: (int(lo), int(hi)) for lo, hi in zip(cuts[:-1], cuts[1:])}
+        self.max_end = self.end.copy()
+        for lo, hi in self.bounds.values():
+            self.max_end[lo:hi] = np.maximum.accumulate(self.end[lo:hi])
+
+    @classmethod
+    def load(cls, paths, mode="admissible"):
+        # corridor tables, result directories (searched for corridors.csv) or series files
+        # (corridors extracted on the fly, station = parent directory name)
+        tabs = []
+        for p in paths:
+            if os.path.isdir(p):
+                found = sorted(glob.glob(os.path.join(p, "**", TABLE_NAME), recursive=True))
+                top = os.path.join(p, TABLE_NAME)
+                # a batch out_dir holds the combined table next to the per-station ones
+                tabs += [read_table(top)] if top in found else [read_table(f) for f in found]
+            elif os.path.basename(p) == TABLE_NAME:
+                tabs.append(read_table(p))
+            elif os.path.isfile(p):
+                station = os.path.basename(os.path.dirname(os.path.abspath(p)))
+                df = ssum_snow_io.read_frame(p)
+                df["time"] = pd.to_datetime(df["time"], errors="coerce")
+                tabs.append(table(df.dropna(subset=["time"]), station, mode))
+            else:
+                raise SystemExit(f"Not a corridor table, series file or directory: {p}")
+        tabs = [t for t in tabs if len(t)]
+        return cls(pd.concat(tabs, ignore_index=True) if tabs else pd.DataFrame(columns=COLUMNS))
+
+    def stations(self):
+        return list(self.bounds)
+
+    def overlapping(self, t0=None, t1=None, stations=None):
+        # row positions (into self.table) of corridors with start <= t1 and end >= t0
+        t0 = None if t0 is None else ssum_snow_core.to_ns(t0)
+        t1 = None if t1 is None else ssum_snow_core.to_ns(t1)
+        out = []
+        for name in self.stations() if stations is None else stations:
+            if name not in self.bounds:
+                continue
+            lo, hi = self.bounds[name]
+            a = lo if t0 is None else lo + int(np.searchsorted(self.max_end[lo:hi], t0, side="left"))
+            b = hi if t1 is None else lo + int(np.searchsorted(self.start[lo:hi], t1, side="right"))
+            idx = np.arange(a, max(a, b))
+            if t0 is not None:
+                idx = idx[self.end[idx] >= t0]
+            out.append(idx)
+        return np.concatenate(out) if out else np.empty(0, dtype=np.int64)
+
+    def query(self, t0=None, t1=None, stations=None):
+        return self.table.iloc[self.overlapping(t0, t1, stations)].reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    # corridors.csv tables, result directories or series files
+    ap.add_argument("--in", dest="in_paths", nargs="+", required=True)
+    ap.add_argument("--start", default=None)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--stations", nargs="+", default=None)
+    ap.add_argument("--mode", choices=MODES, default="admissible", help="for series inputs")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    index = CorridorIndex.load(args.in_paths, args.mode)
+    hits = index.query(args.start, args.end, args.stations)
+
+    print("SSUM-Snow corridors")
+    print(f"Indexed: {len(index.table)} corridors, {len(index.bounds)} stations")
+    print(f"Overlapping: {len(hits)}")
+    if args.out:
+        write_table(hits, args.out)
+        print(f"Saved: {args.out}")
+    else:
+        print(hits.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
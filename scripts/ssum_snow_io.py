@@ -0,0 +1,160 @@
+# ssum_snow_io.py
+import os
+import json
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "npz", "parquet")
+
+EXT = {"csv": ".csv", "npz": ".npz", "parquet": ".parquet"}
+
+META_KEY = "__meta__"
+
+
+def format_from_path(path):
+    ext = os.path.splitext(str(path))[1].lower()
+    for fmt, e in EXT.items():
+        if ext == e:
+            return fmt
+    return "csv"
+
+
+def _time_cols(df):
+    return [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+
+
+def _to_epoch_ns(s):
+    # int64 nanoseconds since 1970-01-01 UTC (naive times are taken as UTC)
+    if hasattr(s.dt, "as_unit"):
+        s = s.dt.as_unit("ns")
+    return s.astype("int64").to_numpy()
+
+
+def _text_array(values):
+    # text column -> fixed-width str array; missing cells are written as "" (as CSV does) and
+    # read back as NaN (text_cols in the npz meta)
+    s = pd.Series(values, copy=False)
+    return s.astype(object).where(s.notna(), "").astype(str).to_numpy(dtype=str)
+
+
+def _from_text_array(arr):
+    out = np.asarray(arr).astype(object)
+    out[out == ""] = np.nan
+    return out
+
+
+def _write_npz(df, path, float32):
+    tcols = _time_cols(df)
+    arrays = {}
+    meta = {"columns": [str(c) for c in df.columns], "time_cols": {}, "text_cols": [], "float32": bool(float32)}
+    for c in df.columns:
+        s = df[c]
+        if c in tcols:
+            tz = getattr(s.dt, "tz", None)
+            meta["time_cols"][str(c)] = None if tz is None else str(tz)
+            arr = _to_epoch_ns(s)
+        elif pd.api.types.is_bool_dtype(s):
+            arr = s.to_numpy(dtype=bool)
+        elif pd.api.types.is_integer_dtype(s):
+            arr = s.to_numpy(dtype=np.int64)
+        elif pd.api.types.is_float_dtype(s):
+            arr = s.to_numpy(dtype=np.float32 if float32 else np.float64)
+        else:
+            meta["text_cols"].append(str(c))
+            arr = _text_array(s)
+        arrays[str(c)] = arr
+    arrays[META_KEY] = np.array(json.dumps(meta))
+    # uncompressed members so columns can be memory-mapped on load
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _npz_member_offset(fh, info):
+    fh.seek(info.header_offset)
+    local = fh.read(30)
+    if local[:4] != b"PK\x03\x04":
+        raise ValueError(f"Bad zip member header: {info.filename}")
+    name_len, extra_len = struct.unpack("<HH", local[26:30])
+    return info.header_offset + 30 + name_len + extra_len
+
+
+def _mmap_npz(path):
+    out = {}
+    with zipfile.ZipFile(path) as z, open(path, "rb") as fh:
+        for info in z.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                out[key] = None
+                continue
+            fh.seek(_npz_member_offset(fh, info))
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(fh)
+            if dtype.hasobject or len(shape) != 1 or shape[0] == 0:
+                out[key] = None
+                continue
+            out[key] = np.memmap(path, dtype=dtype, mode="r", offset=fh.tell(), shape=shape)
+    if any(v is None for v in out.values()):
+        with np.load(path, allow_pickle=False) as z:
+            for k, v in out.items():
+                if v is None:
+                    out[k] = z[k]
+    return out
+
+
+def _read_npz(path, columns=None, mmap=True):
+    if mmap:
+        arrays = _mmap_npz(path)
+    else:
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+    meta = json.loads(str(np.asarray(arrays.pop(META_KEY))[()]))
+    cols = meta["columns"] if columns is None else [c for c in meta["columns"] if c in columns]
+    data = {}
+    for c in cols:
+        arr = arrays[c]
+        if c in meta["time_cols"]:
+            tz = meta["time_cols"][c]
+            t = pd.to_datetime(np.asarray(arr, dtype=np.int64), unit="ns", utc=True)
+            data[c] = t.tz_convert(tz) if tz is not None else t.tz_localize(None)
+        elif c in meta.get("text_cols", ()):
+            data[c] = _from_text_array(arr)
+        else:
+            data[c] = arr
+    return pd.DataFrame(data, columns=cols)
+
+
+def write_frame(df, path, fmt=None, float32=False):
+    fmt = fmt or format_from_path(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "npz":
+        _write_npz(df, path, float32)
+    elif fmt == "parquet":
+        out = df
+        if float32:
+            out = df.astype({c: np.float32 for c in df.columns if pd.api.types.is_float_dtype(df[c])})
+        try:
+            out.to_parquet(path, index=False)
+        except ImportError as e:
+            raise SystemExit(f"Parquet output needs pyarrow or fastparquet: {e}")
+    else:
+        raise SystemExit(f"Unknown format: {fmt} (expected one of {FORMATS})")
+    return path
+
+
+def read_frame(path, columns=None, mmap=True):
+    fmt = format_from_path(path)
+    if fmt == "npz":
+        return _read_npz(path, columns=columns, mmap=mmap)
+    if fmt == "parquet":
+        try:
+            return pd.read_parquet(path, columns=columns)
+        except ImportError as e:
+            raise SystemExit(f"Parquet input needs pyarrow or fastparquet: {e}")
+    return pd.read_csv(path, usecols=columns, float_precision="round_trip")
@@ -0,0 +1,101 @@
+# ssum_snow_matrix.py
+import numpy as np
+import pandas as pd
+
+import ssum_snow
+import ssum_snow_io
+import ssum_snow_core
+
+DEFAULT_BLOCK_STATIONS = 16
+
+# input columns the feature kernels read as float
+FEATURE_INPUT_COLS = ["temperature_C", "humidity_pct"]
+
+
+def _lengths(frames):
+    return np.array([len(df) for df in frames], dtype=np.int64)
+
+
+def _pad(frames, lengths, col, fill=np.nan, dtype=float):
+    # stations x slots array: station i fills slots [0, lengths[i]) in row order, the rest is
+    # `fill`. Windows only look back, so trailing padding never reaches a real row
+    n_slot = int(lengths.max()) if len(frames) else 0
+    out = np.full((len(frames), n_slot), fill, dtype=dtype)
+    for i, df in enumerate(frames):
+        if col == "time":
+            out[i, : lengths[i]] = ssum_snow_io._to_epoch_ns(df["time"])
+        else:
+            out[i, : lengths[i]] = df[col].to_numpy(dtype=dtype)
+    return out
+
+
+def _attach(df, cols):
+    # one concat instead of a column insert per array; inputs that already carry one of the
+    # columns are overwritten in place, like the frame engine does
+    if any(c in df.columns for c in cols):
+        for c, v in cols.items():
+            df[c] = v
+        return df
+    return pd.concat([df, pd.DataFrame(cols, index=df.index)], axis=1)
+
+
+def segment_ids(time_ns, lengths, gap_hours):
+    # ssum_snow._segment_ids per row; the padding of each station is one extra trailing segment
+    n_st, n_slot = time_ns.shape
+    slot = np.arange(n_slot)
+    cut = np.zeros((n_st, n_slot), dtype=bool)
+    if n_slot > 1:
+        dt_h = (np.diff(time_ns, axis=1) / 1e9) / 3600.0
+        cut[:, 1:] = dt_h > float(gap_hours)
+    cut &= slot < lengths[:, None]
+    cut |= (slot == lengths[:, None]) & (slot > 0)
+    return np.cumsum(cut, axis=1, dtype=np.int64)
+
+
+def prepare_frame(df, params):
+    # one station's prepared input as the kernels read it (hourly rows when params["hourly"] is set);
+    # values the kernels cannot convert raise here, for this station only, with the frame engine's error
+    if params.get("hourly"):
+        df = ssum_snow._normalize_hourly(df, params["hourly"])
+    for c in FEATURE_INPUT_COLS:
+        df[c].to_numpy(dtype=float)
+    return df
+
+
+def feature_frames(frames, params):
+    # frames from prepare_frame -> new frames with segment_id / CP / S_struct (ssum_snow._compute_features),
+    # computed for all stations as one stations x slots matrix
+    if not frames:
+        return []
+    lengths = _lengths(frames)
+    time_ns = _pad(frames, lengths, "time", 0, np.int64)
+    seg = segment_ids(time_ns, lengths, params["gap_hours"])
+    cp, s_struct = ssum_snow_core.features(
+        seg,
+        _pad(frames, lengths, "temperature_C"),
+        _pad(frames, lengths, "humidity_pct"),
+        int(params["tct_window_hours"]),
+        int(params["stress_window_hours"]),
+        time_ns if params.get("window_mode") == "time" else None,
+    )
+    out = []
+    for i, df in enumerate(frames):
+        n = lengths[i]
+        out.append(_attach(df, {"segment_id": seg[i, :n], "CP": cp[i, :n], "S_struct": s_struct[i, :n]}))
+    return out
+
+
+def finish_frames(frames, params):
+    # SCE / admissibility / depth / corridor columns (ssum_snow._finish_series) on the matrix
+    if not frames:
+        return []
+    lengths = _lengths(frames)
+    cols = ssum_snow_core.finish(_pad(frames, lengths, "CP"), _pad(frames, lengths, "S_struct"), params)
+    return [_attach(df, {c: v[i, : lengths[i]] for c, v in cols.items()}) for i, df in enumerate(frames)]
+
+
+def blocks(lengths, block_stations=DEFAULT_BLOCK_STATIONS):
+    # station positions grouped into blocks of similar length (less padding per block)
+    order = np.argsort(np.asarray(lengths, dtype=np.int64), kind="stable")
+    size = max(1, int(block_stations))
+    return [order[i : i + size].tolist() for i in range(0, len(order), size)]
@@ -0,0 +1,117 @@
+# ssum_snow_pipeline.py
+import os
+import json
+import argparse
+
+import pandas as pd
+
+import ssum_snow
+import ssum_snow_io
+import ssum_snow_calibrate
+import noaa_isd_to_ssum_input
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", required=True)
+    ap.add_argument("--out_dir", required=True)
+    # calibration outputs; defaults to <out_dir>_calibration (same layout as the three-script run)
+    ap.add_argument("--calib_dir", default=None)
+    ap.add_argument("--no_calibration", action="store_true")
+
+    # intermediate artifacts are only written when asked for
+    ap.add_argument("--write_input", default=None, help="also write the SSUM input CSV to this path")
+    ap.add_argument("--write_series", action="store_true", help="also write <out_dir>/series.*")
+    ap.add_argument("--format", choices=ssum_snow_io.FORMATS, default="csv")
+    ap.add_argument("--float32", action="store_true")
+
+    # noaa_isd_to_ssum_input.py
+    ap.add_argument("--precip_col", default="AA1")
+    ap.add_argument("--precip_depth_scale_mm", type=float, default=0.1)
+    ap.add_argument("--snow_temp_c", type=float, default=0.0)
+    ap.add_argument("--snow_ratio", type=float, default=10.0)
+
+    # ssum_snow.py
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+
+    # ssum_snow_calibrate.py
+    ap.add_argument("--time_col", default="time")
+    ap.add_argument("--segment_col", default="segment_id")
+    ap.add_argument("--score_col", default="corridor_score")
+    ap.add_argument("--snow_col", default="snowfall_cm")
+    ap.add_argument("--horizon_hours", type=int, default=24)
+    ap.add_argument("--train_frac", type=float, default=0.7)
+    ap.add_argument("--rho_scale", type=float, default=1.0)
+    ap.add_argument("--min_valid_points", type=int, default=48)
+
+    args = ap.parse_args()
+    params = ssum_snow._params_from_args(args)
+
+    # 1) NOAA ISD -> SSUM input
+    raw = pd.read_csv(args.in_path, low_memory=False)
+    need = ["DATE", "TMP", "DEW"]
+    miss = [c for c in need if c not in raw.columns]
+    if miss:
+        raise SystemExit(f"Missing required columns: {miss}")
+    inp = noaa_isd_to_ssum_input._convert_frame(raw, args)
+    del raw
+
+    if args.write_input:
+        d = os.path.dirname(args.write_input)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        inp.to_csv(args.write_input, index=False)
+
+    # 2) structural engine
+    df = ssum_snow._prepare_input(inp)
+    df = ssum_snow._compute_series(df, params)
+    summary, tops = ssum_snow._build_summary(df, params)
+
+    ssum_snow._make_outdir(args.out_dir)
+    summary_path = os.path.join(args.out_dir, "summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    series_path = None
+    if args.write_series:
+        series_path = os.path.join(args.out_dir, "series" + ssum_snow_io.EXT[args.format])
+        ssum_snow_io.write_frame(df, series_path, args.format, float32=args.float32)
+
+    print("SSUM-Snow pipeline complete")
+    print(f"Rows: {len(df)}")
+    print(f"Segments: {summary['segments']}")
+    print(f"Time: {summary['start']} -> {summary['end']}")
+    if args.write_input:
+        print(f"Saved: {args.write_input}")
+    if series_path:
+        print(f"Saved: {series_path}")
+    print(f"Saved: {summary_path}")
+    ssum_snow._print_tops(df, tops)
+
+    if args.no_calibration:
+        return
+
+    # 3) calibration audit
+    calib_dir = args.calib_dir or (args.out_dir.rstrip("/\\") + "_calibration")
+    cal = ssum_snow_calibrate._prepare_series(df, args)
+    out, report = ssum_snow_calibrate._calibrate(cal, args)
+
+    ssum_snow._make_outdir(calib_dir)
+    pred_path = os.path.join(calib_dir, "predictions" + ssum_snow_io.EXT[args.format])
+    report_path = os.path.join(calib_dir, "calibration_report.json")
+    ssum_snow_io.write_frame(out, pred_path, args.format, float32=args.float32)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Saved: {pred_path}")
+    print(f"Saved: {report_path}")
+    ssum_snow_calibrate._print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# ssum_snow_profile.py
+import sys
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(rss) if sys.platform == "darwin" else int(rss) * 1024
+
+
+class Profiler:
+    # per-stage wall / CPU time, process peak RSS after the stage and row counts;
+    # repeated stages (chunks, stations) accumulate. memory=True also records the
+    # tracemalloc peak of allocations made inside each stage (slow; opt-in)
+
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = bool(enabled)
+        self.memory = bool(memory) and self.enabled
+        self.stats = {}
+        self.wall0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        w0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - w0
+            cpu = time.process_time() - c0
+            st = self.stats.setdefault(
+                name,
+                {"calls": 0, "rows": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_bytes": None, "peak_mem_bytes": None},
+            )
+            st["calls"] += 1
+            st["rows"] += int(rows)
+            st["wall_s"] += wall
+            st["cpu_s"] += cpu
+            rss = peak_rss_bytes()
+            if rss is not None:
+                st["peak_rss_bytes"] = max(rss, st["peak_rss_bytes"] or 0)
+            if self.memory:
+                peak = int(tracemalloc.get_traced_memory()[1] - base)
+                st["peak_mem_bytes"] = max(peak, st["peak_mem_bytes"] or 0)
+
+    def stage_stats(self):
+        out = {}
+        for name, st in self.stats.items():
+            d = dict(st)
+            d["wall_s"] = round(st["wall_s"], 6)
+            d["cpu_s"] = round(st["cpu_s"], 6)
+            d["rows_per_s"] = round(st["rows"] / st["wall_s"], 1) if st["rows"] and st["wall_s"] > 0 else None
+            if not self.memory:
+                d.pop("peak_mem_bytes")
+            out[name] = d
+        return out
+
+    def to_dict(self, **counts):
+        d = {k: int(v) for k, v in counts.items()}
+        d["total_wall_s"] = round(time.perf_counter() - self.wall0, 6)
+        d["total_cpu_s"] = round(time.process_time() - self.cpu0, 6)
+        d["peak_rss_bytes"] = peak_rss_bytes()
+        d["stages"] = self.stage_stats()
+        return d
+
+    def print(self):
+        for name, st in self.stage_stats().items():
+            rss = f" peak_rss={st['peak_rss_bytes'] / 2**20:.1f}MiB" if st["peak_rss_bytes"] is not None else ""
+            print(f"  {name}: wall={st['wall_s']:.3f}s cpu={st['cpu_s']:.3f}s rows={st['rows']}{rss}")
+
+
+NULL = Profiler(enabled=False)
+
+
+@contextmanager
+def cprofile(path):
+    # dump cProfile stats of the enclosed block to `path` (no-op when path is empty)
+    if not path:
+        yield
+        return
+    pr = cProfile.Profile()
+    pr.enable()
+    try:
+        yield
+    finally:
+        pr.disable()
+        pr.dump_stats(path)
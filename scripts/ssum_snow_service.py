@@ -0,0 +1,356 @@
+# ssum_snow_service.py
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow
+import ssum_snow_io
+import ssum_snow_core
+import ssum_snow_batch
+import ssum_snow_cache
+import ssum_snow_stream
+
+SERIES_FIELDS = {
+    "CP": np.float64,
+    "S_struct": np.float64,
+    "SCE": np.float64,
+    "admissible": np.bool_,
+    "depth_est_cm": np.float64,
+    "corridor_score": np.float64,
+    "segment_id": np.int64,
+    "snowfall_cm": np.float64,
+}
+
+DEFAULT_FIELDS = ["SCE", "admissible", "depth_est_cm", "corridor_score"]
+
+HOUR_NS = 3600 * 1_000_000_000
+
+# longest accepted request / response line (large push batches)
+MAX_LINE_BYTES = 64 << 20
+
+
+def _to_ns(t):
+    ts = pd.Timestamp(t)
+    if ts.tz is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.value)
+
+
+def _iso(t_ns):
+    return np.datetime_as_string(np.asarray(t_ns, dtype="datetime64[ns]"), unit="s", timezone="UTC")
+
+
+def _jsonable(values):
+    # NaN -> null (strict JSON)
+    out = values.tolist()
+    if values.dtype.kind == "f":
+        out = [None if v != v else v for v in out]
+    return out
+
+
+class _StationSeries:
+    # append-only columnar series (capacity doubling) with binary-search time lookups,
+    # plus the streaming state that scores new observations exactly like a batch rerun
+
+    def __init__(self, df, params):
+        n = len(df)
+        cap = max(1024, 2 * n)
+        self.n = n
+        self.t = np.empty(cap, dtype=np.int64)
+        self.t[:n] = ssum_snow_io._to_epoch_ns(df["time"])
+        self.cols = {}
+        for c, dtype in SERIES_FIELDS.items():
+            self.cols[c] = np.empty(cap, dtype=dtype)
+            self.cols[c][:n] = df[c].to_numpy(dtype=dtype)
+        self.state = ssum_snow_stream.SnowStructState.from_series(df, **params)
+
+    def _grow(self):
+        cap = 2 * len(self.t)
+        t = np.empty(cap, dtype=np.int64)
+        t[: self.n] = self.t[: self.n]
+        self.t = t
+        for c, arr in self.cols.items():
+            new = np.empty(cap, dtype=arr.dtype)
+            new[: self.n] = arr[: self.n]
+            self.cols[c] = new
+
+    def parse(self, observations):
+        # observations -> (time ns, temperature_C, humidity_pct, snowfall_cm) tuples, all checked
+        # (fields and time order) before any of them is pushed
+        out = []
+        last = self.state.last_time_ns
+        for k, obs in enumerate(observations):
+            where = f"observation {k}" if len(observations) > 1 else "observation"
+            if not isinstance(obs, dict):
+                raise ValueError(f"Bad {where}: must be a JSON object")
+            missing = [c for c in ("time", "temperature_C", "humidity_pct") if obs.get(c) is None]
+            if missing:
+                raise ValueError(f"Bad {where}: missing {missing}")
+            try:
+                t_ns = _to_ns(obs["time"])
+                values = tuple(float(obs[c]) for c in ("temperature_C", "humidity_pct"))
+                snow = float(obs.get("snowfall_cm", 0.0) or 0.0)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Bad {where}: {e}") from None
+            if last is not None and t_ns < last:
+                raise ValueError(f"Bad {where}: out of order ({_iso(t_ns)} < {_iso(last)})")
+            last = t_ns
+            out.append((t_ns, *values, snow))
+        return out
+
+    def push(self, parsed):
+        # parse() output -> row indexes; the state and the columns take each row together
+        idx = []
+        for t_ns, temp, rh, snow in parsed:
+            row = self.state.push(t_ns, temp, rh)
+            if self.n == len(self.t):
+                self._grow()
+            i = self.n
+            self.t[i] = t_ns
+            for c in SERIES_FIELDS:
+                self.cols[c][i] = row[c] if c != "snowfall_cm" else snow
+            self.n += 1
+            idx.append(i)
+        return idx
+
+    def rows(self, idx, fields):
+        idx = np.asarray(idx, dtype=np.int64)
+        out = {"time": _iso(self.t[idx]).tolist()}
+        for c in fields:
+            out[c] = _jsonable(self.cols[c][idx])
+        return [dict(zip(out, vals)) for vals in zip(*out.values())]
+
+    def at(self, t_ns=None):
+        # last row at or before t_ns (latest row when None); -1 if none
+        if t_ns is None:
+            return self.n - 1
+        return int(np.searchsorted(self.t[: self.n], t_ns, side="right")) - 1
+
+    def span(self, t0_ns, t1_ns):
+        t = self.t[: self.n]
+        lo = 0 if t0_ns is None else int(np.searchsorted(t, t0_ns, side="left"))
+        hi = self.n if t1_ns is None else int(np.searchsorted(t, t1_ns, side="right"))
+        return lo, max(lo, hi)
+
+
+class SnowService:
+    def __init__(self, stations, params):
+        self.stations = stations
+        self.params = params
+        self.requests = 0
+
+    def _station(self, req):
+        name = req.get("station")
+        st = self.stations.get(name)
+        if st is None:
+            raise KeyError(f"Unknown station: {name}")
+        return st
+
+    def _fields(self, req):
+        fields = req.get("fields") or DEFAULT_FIELDS
+        bad = [f for f in fields if f not in SERIES_FIELDS]
+        if bad:
+            raise KeyError(f"Unknown fields: {bad} (available: {list(SERIES_FIELDS)})")
+        return fields
+
+    def _op_ping(self, req):
+        return {"time": time.time()}
+
+    def _op_stations(self, req):
+        out = []
+        for name, st in self.stations.items():
+            out.append(
+                {
+                    "station": name,
+                    "rows": int(st.n),
+                    "start": str(_iso(st.t[0])) if st.n else None,
+                    "end": str(_iso(st.t[st.n - 1])) if st.n else None,
+                    "segment_id": int(st.state.segment_id),
+                }
+            )
+        return {"stations": out, "params": self.params}
+
+    def _op_point(self, req):
+        # row in effect at `time` (latest row if omitted)
+        st = self._station(req)
+        t_ns = None if req.get("time") is None else _to_ns(req["time"])
+        i = st.at(t_ns)
+        return {"row": st.rows([i], self._fields(req))[0] if i >= 0 else None}
+
+    def _op_range(self, req):
+        st = self._station(req)
+        t0 = None if req.get("start") is None else _to_ns(req["start"])
+        t1 = None if req.get("end") is None else _to_ns(req["end"])
+        lo, hi = st.span(t0, t1)
+        limit = req.get("limit")
+        if limit is not None:
+            hi = min(hi, lo + int(limit))
+        return {"rows": st.rows(np.arange(lo, hi), self._fields(req))}
+
+    def _op_top(self, req):
+        # top-k corridor_score rows in the last `hours` before `end` (latest row if omitted)
+        st = self._station(req)
+        end = st.t[st.n - 1] if req.get("end") is None and st.n else _to_ns(req.get("end", 0))
+        hours = float(req.get("hours", 72))
+        lo, hi = st.span(int(end - hours * HOUR_NS), int(end))
+        field = req.get("by", "corridor_score")
+        if field not in ("corridor_score", "depth_est_cm", "CP"):
+            raise KeyError(f"Cannot rank by: {field}")
+        values = st.cols[field][lo:hi]
+        mask = np.isfinite(values)
+        if req.get("admissible_only", True):
+            mask &= st.cols["admissible"][lo:hi]
+        k = int(req.get("k", 12))
+        if k < 0:
+            raise ValueError(f"k must be >= 0: {k}")
+        idx = lo + ssum_snow_core.top_k(values, mask, k)
+        return {"rows": st.rows(idx, self._fields(req))}
+
+    def _op_push(self, req):
+        st = self._station(req)
+        obs = req.get("observations")
+        if obs is None:
+            obs = [req]
+        if not isinstance(obs, list):
+            raise ValueError("observations must be a JSON array")
+        # a batch is pushed whole or not at all
+        idx = st.push(st.parse(obs))
+        return {"rows": st.rows(idx, self._fields(req))}
+
+    def handle(self, req):
+        self.requests += 1
+        rid = req.get("id") if isinstance(req, dict) else None
+        try:
+            if not isinstance(req, dict):
+                raise ValueError("Request must be a JSON object")
+            op = getattr(self, "_op_" + str(req.get("op")), None)
+            if op is None:
+                raise ValueError(f"Unknown op: {req.get('op')}")
+            out = {"ok": True, "result": op(req)}
+        except KeyError as e:
+            out = {"ok": False, "error": str(e.args[0]) if e.args else str(e)}
+        except Exception as e:
+            # any bad request answers for itself; the connection and the rest of a batch go on
+            out = {"ok": False, "error": str(e) or type(e).__name__}
+        if rid is not None:
+            out["id"] = rid
+        return out
+
+    def handle_line(self, line):
+        # one JSON object per line; a JSON array is a batch answered with an array
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"Bad JSON: {e}"})
+        if isinstance(req, list):
+            return json.dumps([self.handle(r) for r in req])
+        return json.dumps(self.handle(req))
+
+    async def client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(json.dumps({"ok": False, "error": "Request line too long"}).encode("utf-8") + b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(self.handle_line(line).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _load_stations(args, params):
+    stations = {}
+    cache_max_bytes = int(args.cache_max_mb * 2**20)
+    for station, path, member in ssum_snow_batch._discover(args.in_paths):
+        df, _ = ssum_snow_batch._features(path, member, params, args.cache_dir, cache_max_bytes)
+        df = ssum_snow._finish_series(df, params)
+        stations[station] = _StationSeries(df, params)
+    return stations
+
+
+async def _serve(service, host, port, port_file=None):
+    server = await asyncio.start_server(service.client, host, port, limit=MAX_LINE_BYTES)
+    bound = server.sockets[0].getsockname()[1]
+    if port_file:
+        with open(port_file, "w", encoding="utf-8") as f:
+            f.write(str(bound))
+    print(f"Listening on {host}:{bound}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+async def _request(host, port, payloads):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    try:
+        for p in payloads:
+            writer.write(json.dumps(p).encode("utf-8") + b"\n")
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in payloads]
+    finally:
+        writer.close()
+
+
+def query(payload, host="127.0.0.1", port=8765):
+    # one request (dict) or batch (list) -> parsed response
+    return asyncio.run(_request(host, port, [payload]))[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_paths", nargs="+", default=None)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--port_file", default=None, help="write the bound port here (useful with --port 0)")
+
+    # client mode: send one JSON request (or array) to a running service and print the reply
+    ap.add_argument("--query", default=None)
+
+    ap.add_argument("--cache_dir", default=None)
+    ap.add_argument("--cache_max_mb", type=float, default=ssum_snow_cache.DEFAULT_MAX_BYTES / 2**20)
+
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+
+    args = ap.parse_args()
+
+    if args.query is not None:
+        print(json.dumps(query(json.loads(args.query), args.host, args.port), indent=2))
+        return
+
+    if not args.in_paths:
+        raise SystemExit("--in is required to start the service")
+
+    params = ssum_snow._params_from_args(args)
+    t0 = time.perf_counter()
+    stations = _load_stations(args, params)
+    if not stations:
+        raise SystemExit(f"No *{ssum_snow_batch.INPUT_SUFFIX} inputs found in: {args.in_paths}")
+
+    print("SSUM-Snow service")
+    print(f"Stations: {len(stations)} (rows: {sum(st.n for st in stations.values())})")
+    print(f"Loaded in {time.perf_counter() - t0:.2f}s")
+
+    try:
+        asyncio.run(_serve(SnowService(stations, params), args.host, args.port, args.port_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
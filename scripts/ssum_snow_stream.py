@@ -0,0 +1,403 @@
+# ssum_snow_stream.py
+import os
+import csv
+import json
+import argparse
+from collections import deque
+
+import numpy as np
+
+import ssum_snow_core
+
+STATE_VERSION = 1
+
+SERIES_COLS = ssum_snow_core.SERIES_COLS
+
+
+def _is_finite(x):
+    return x is not None and bool(np.isfinite(x))
+
+
+class _RollingRange:
+    # trailing max - min over `win` rows with monotonic deques
+    # (min_periods = max(6, win // 3), NaN inputs skipped)
+
+    def __init__(self, win):
+        self.win = int(win)
+        self.mp = max(6, self.win // 3)
+        self.qmax = deque()
+        self.qmin = deque()
+        self.valid = deque()
+
+    def reset(self):
+        self.qmax.clear()
+        self.qmin.clear()
+        self.valid.clear()
+
+    def push(self, i, x):
+        lo = i - self.win + 1
+        if _is_finite(x):
+            while self.qmax and self.qmax[-1][1] <= x:
+                self.qmax.pop()
+            self.qmax.append((i, x))
+            while self.qmin and self.qmin[-1][1] >= x:
+                self.qmin.pop()
+            self.qmin.append((i, x))
+            self.valid.append(i)
+        while self.qmax and self.qmax[0][0] < lo:
+            self.qmax.popleft()
+        while self.qmin and self.qmin[0][0] < lo:
+            self.qmin.popleft()
+        while self.valid and self.valid[0] < lo:
+            self.valid.popleft()
+        if len(self.valid) < self.mp:
+            return np.nan
+        return self.qmax[0][1] - self.qmin[0][1]
+
+    def to_dict(self):
+        return {
+            "qmax": [list(e) for e in self.qmax],
+            "qmin": [list(e) for e in self.qmin],
+            "valid": list(self.valid),
+        }
+
+    def load(self, d):
+        self.qmax = deque((int(i), float(v)) for i, v in d["qmax"])
+        self.qmin = deque((int(i), float(v)) for i, v in d["qmin"])
+        self.valid = deque(int(i) for i in d["valid"])
+
+
+class _RollingSum:
+    # trailing sum over `win` rows from running prefix sums
+    # (same arithmetic as the cumsum-based batch kernel in ssum_snow.py)
+
+    def __init__(self, win):
+        self.win = int(win)
+        self.mp = max(6, self.win // 3)
+        self.total = 0.0
+        self.count = 0
+        self.prefix = deque()
+
+    def reset(self):
+        self.prefix.clear()
+
+    def push(self, i, x):
+        self.prefix.append((i, self.total, self.count))
+        if _is_finite(x):
+            self.total = self.total + x
+            self.count += 1
+        else:
+            self.total = self.total + 0.0
+        lo = i - self.win + 1
+        while self.prefix[0][0] < lo:
+            self.prefix.popleft()
+        _, total_lo, count_lo = self.prefix[0]
+        if self.count - count_lo < self.mp:
+            return np.nan
+        return self.total - total_lo
+
+    def to_dict(self):
+        return {"total": self.total, "count": self.count, "prefix": [list(e) for e in self.prefix]}
+
+    def load(self, d):
+        self.total = float(d["total"])
+        self.count = int(d["count"])
+        self.prefix = deque((int(i), float(t), int(c)) for i, t, c in d["prefix"])
+
+
+class SnowStructState:
+    def __init__(
+        self,
+        tct_window_hours=24,
+        stress_window_hours=None,
+        cp_threshold=0.08,
+        s_max=2.5,
+        k_depth=13.0,
+        gap_hours=6.0,
+    ):
+        self.win = int(tct_window_hours)
+        self.win_stress = self.win if stress_window_hours is None else int(stress_window_hours)
+        self.cp_threshold = float(cp_threshold)
+        self.s_max = float(s_max)
+        self.k_depth = float(k_depth)
+        self.gap_hours = float(gap_hours)
+
+        self.n = 0
+        self.segment_id = 0
+        self.last_time_ns = None
+        # rows pushed so far at last_time_ns (None: unknown, a state saved before this was kept)
+        self.last_time_rows = 0
+        self.prev_cp = np.nan
+
+        self.temp_range = _RollingRange(self.win)
+        self.rh_range = _RollingRange(self.win)
+        self.stress = _RollingSum(self.win_stress)
+
+    @property
+    def params(self):
+        return {
+            "tct_window_hours": int(self.win),
+            "stress_window_hours": int(self.win_stress),
+            "cp_threshold": float(self.cp_threshold),
+            "s_max": float(self.s_max),
+            "k_depth": float(self.k_depth),
+            "gap_hours": float(self.gap_hours),
+        }
+
+    def push(self, time, temperature_C, humidity_pct):
+        t_ns = ssum_snow_core.to_ns(time)
+        if self.last_time_ns is not None and t_ns < self.last_time_ns:
+            times = [ssum_snow_core.from_ns(t_ns), ssum_snow_core.from_ns(self.last_time_ns)]
+            new, last = ssum_snow_core.format_times(times)
+            raise ValueError(f"Observation out of order: {new} < last pushed time {last}")
+
+        new_segment = False
+        if self.last_time_ns is not None:
+            dt_h = ((t_ns - self.last_time_ns) / 1e9) / 3600.0
+            if dt_h > self.gap_hours:
+                self.segment_id += 1
+                new_segment = True
+        if new_segment:
+            self.temp_range.reset()
+            self.rh_range.reset()
+            self.stress.reset()
+            self.prev_cp = np.nan
+
+        i = self.n
+        dT = self.temp_range.push(i, float(temperature_C))
+        dH = self.rh_range.push(i, float(humidity_pct))
+
+        # Core Potential (CP)
+        cp = (dT * dH) / float(max(1, self.win))
+
+        # Structural stress: rolling sum of CP "jerk"
+        cp_jerk = np.abs(cp - self.prev_cp)
+        s_struct = self.stress.push(i, cp_jerk)
+
+        sce = np.exp(-np.float64(s_struct))
+
+        admissible = bool(
+            (cp >= self.cp_threshold) and (s_struct <= self.s_max) and _is_finite(cp) and _is_finite(s_struct)
+        )
+
+        if _is_finite(cp):
+            depth = self.k_depth * np.log(cp + 1.0)
+            if depth < 0.0:
+                depth = 0.0
+        else:
+            depth = 0.0
+
+        sce_c = np.clip(sce, 0.0, 1.0)
+        corridor = depth * sce_c
+
+        self.n += 1
+        if t_ns == self.last_time_ns and self.last_time_rows is not None:
+            self.last_time_rows += 1
+        elif t_ns != self.last_time_ns:
+            self.last_time_rows = 1
+        self.last_time_ns = t_ns
+        self.prev_cp = cp
+
+        return {
+            "segment_id": int(self.segment_id),
+            "CP": float(cp),
+            "S_struct": float(s_struct),
+            "SCE": float(sce),
+            "admissible": admissible,
+            "depth_est_cm": float(depth),
+            "depth_min_cm": float(depth * sce_c),
+            "depth_max_cm": float(depth * (2.0 - sce_c)),
+            "corridor_score": float(corridor),
+        }
+
+    def to_dict(self):
+        last = None
+        if self.last_time_ns is not None:
+            last = ssum_snow_core.format_times([ssum_snow_core.from_ns(self.last_time_ns)])[0]
+        return {
+            "version": STATE_VERSION,
+            "params": self.params,
+            "n": int(self.n),
+            "segment_id": int(self.segment_id),
+            "last_time_ns": self.last_time_ns,
+            "last_time": last,
+            "last_time_rows": self.last_time_rows,
+            "prev_cp": float(self.prev_cp),
+            "temp_range": self.temp_range.to_dict(),
+            "rh_range": self.rh_range.to_dict(),
+            "stress": self.stress.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        if int(d.get("version", 0)) != STATE_VERSION:
+            raise ValueError(f"Unsupported state version: {d.get('version')}")
+        st = cls(**d["params"])
+        st.n = int(d["n"])
+        st.segment_id = int(d["segment_id"])
+        st.last_time_ns = None if d["last_time_ns"] is None else int(d["last_time_ns"])
+        rows = d.get("last_time_rows", None if st.last_time_ns is not None else 0)
+        st.last_time_rows = None if rows is None else int(rows)
+        st.prev_cp = float(d["prev_cp"])
+        st.temp_range.load(d["temp_range"])
+        st.rh_range.load(d["rh_range"])
+        st.stress.load(d["stress"])
+        return st
+
+    @classmethod
+    def from_series(cls, df, **params):
+        # state equivalent to having pushed every row of `df`, a batch series from
+        # ssum_snow._compute_series with the same params: the stress prefix sums come from
+        # the batch CP column and only the last TCT window is replayed into the range deques
+        import ssum_snow_io  # DataFrame input: pandas is already loaded
+
+        st = cls(**params)
+        n = len(df)
+        if n == 0:
+            return st
+        t_ns = ssum_snow_io._to_epoch_ns(df["time"])
+        seg = df["segment_id"].to_numpy()
+        cp = df["CP"].to_numpy(dtype=float)
+        s0 = int(np.flatnonzero(seg == seg[-1])[0])
+
+        jerk = np.full(n, np.nan)
+        if n > 1:
+            jerk[1:] = np.abs(cp[1:] - cp[:-1])
+            jerk[1:][seg[1:] != seg[:-1]] = np.nan
+        valid = np.isfinite(jerk)
+        # sequential running sums, the same order as pushing row by row
+        total = np.concatenate(([0.0], np.cumsum(np.where(valid, jerk, 0.0))))
+        count = np.concatenate(([0], np.cumsum(valid)))
+        st.stress.total = float(total[n])
+        st.stress.count = int(count[n])
+        st.stress.prefix = deque(
+            (i, float(total[i]), int(count[i])) for i in range(max(s0, n - st.win_stress), n)
+        )
+
+        temp = df["temperature_C"].to_numpy(dtype=float)
+        rh = df["humidity_pct"].to_numpy(dtype=float)
+        for i in range(max(s0, n - st.win), n):
+            st.temp_range.push(i, float(temp[i]))
+            st.rh_range.push(i, float(rh[i]))
+
+        st.n = n
+        st.segment_id = int(seg[-1])
+        st.last_time_ns = int(t_ns[-1])
+        st.last_time_rows = int(n - np.searchsorted(t_ns, t_ns[-1], side="left"))
+        st.prev_cp = float(cp[-1])
+        return st
+
+    def save(self, path):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", required=True)
+    ap.add_argument("--state", required=True)
+    ap.add_argument("--out", dest="out_path", default=None)
+
+    # used only when --state does not exist yet; a saved state keeps its own params
+    ap.add_argument("--tct_window_hours", type=int, default=24)
+    ap.add_argument("--stress_window_hours", type=int, default=None)
+    ap.add_argument("--cp_threshold", type=float, default=0.08)
+    ap.add_argument("--s_max", type=float, default=2.5)
+    ap.add_argument("--k_depth", type=float, default=13.0)
+    ap.add_argument("--gap_hours", type=float, default=6.0)
+
+    args = ap.parse_args()
+
+    if os.path.exists(args.state):
+        st = SnowStructState.load(args.state)
+    else:
+        st = SnowStructState(
+            tct_window_hours=args.tct_window_hours,
+            stress_window_hours=args.stress_window_hours,
+            cp_threshold=args.cp_threshold,
+            s_max=args.s_max,
+            k_depth=args.k_depth,
+            gap_hours=args.gap_hours,
+        )
+
+    # standard-library CSV path: a scheduled update never imports pandas
+    header, obs, times = ssum_snow_core.read_csv(args.in_path)
+
+    # rows before the state's last time are skipped, and of the rows at that time as many as
+    # the state already took there (in input order): a timestamp can repeat (ISD specials)
+    skipped = 0
+    if st.last_time_ns is not None and obs:
+        keep, at_last = [], 0
+        for t in times:
+            t_ns = ssum_snow_core.to_ns(t)
+            if t_ns == st.last_time_ns:
+                at_last += 1
+                keep.append(st.last_time_rows is not None and at_last > st.last_time_rows)
+            else:
+                keep.append(t_ns > st.last_time_ns)
+        if st.last_time_rows is None and at_last:
+            print(
+                f"Warning: skipped {at_last} row(s) at the state's last time; the state predates "
+                "last_time_rows, so rows repeating that timestamp cannot be told apart"
+            )
+        skipped = keep.count(False)
+        obs = [r for r, k in zip(obs, keep) if k]
+        times = [t for t, k in zip(times, keep) if k]
+
+    temp = ssum_snow_core.float_column(header, obs, "temperature_C")
+    rh = ssum_snow_core.float_column(header, obs, "humidity_pct")
+    rows = [st.push(t, temp[i], rh[i]) for i, t in enumerate(times)]
+
+    if args.out_path and rows:
+        d = os.path.dirname(args.out_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        write_header = not os.path.exists(args.out_path)
+        ti = header.index("time")
+        cols = header + [c for c in SERIES_COLS if c not in header]
+        with open(args.out_path, "a", encoding="utf-8", newline="") as f:
+            w = csv.writer(f, lineterminator="\n")
+            if write_header:
+                w.writerow(cols)
+            for row, t_text, r in zip(obs, ssum_snow_core.format_times(times), rows):
+                cells = dict(zip(header, row))
+                cells[header[ti]] = t_text
+                cells.update((c, ssum_snow_core.format_value(r[c])) for c in SERIES_COLS)
+                w.writerow([cells.get(c, "") for c in cols])
+
+    st.save(args.state)
+
+    print("SSUM-Snow stream update complete")
+    print(f"Rows pushed: {len(rows)} (skipped already-seen: {skipped})")
+    print(f"Rows in state: {st.n}")
+    print(f"Segment: {st.segment_id}")
+    if args.out_path and rows:
+        print(f"Appended: {args.out_path}")
+    print(f"Saved state: {args.state}")
+
+    if rows:
+        r = rows[-1]
+        print("Latest observation:")
+        print(
+            f"  time={ssum_snow_core.format_times(times[-1:])[0]} "
+            f"CP={r['CP']:.6f} "
+            f"SCE={r['SCE']:.6f} "
+            f"admissible={r['admissible']} "
+            f"depth_est_cm={r['depth_est_cm']:.3f} "
+            f"corridor_score={r['corridor_score']:.6f} "
+            f"segment_id={r['segment_id']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
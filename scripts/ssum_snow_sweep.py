@@ -0,0 +1,178 @@
+# ssum_snow_sweep.py
+import os
+import time
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow
+
+# rows x (cp_threshold, s_max) pairs evaluated per broadcast block
+BLOCK_ELEMS = 1 << 24
+
+
+def _grid_values(tokens, cast):
+    # accepts plain values and "start:stop:num" (inclusive linspace)
+    out = []
+    for tok in tokens:
+        s = str(tok)
+        if ":" in s:
+            parts = s.split(":")
+            if len(parts) != 3:
+                raise SystemExit(f"Bad grid range (want start:stop:num): {s}")
+            start, stop, num = float(parts[0]), float(parts[1]), int(parts[2])
+            out.extend(cast(round(v, 12)) if cast is not int else int(round(v)) for v in np.linspace(start, stop, num))
+        else:
+            out.append(cast(s) if cast is not int else int(round(float(s))))
+    seen = []
+    for v in out:
+        if v not in seen:
+            seen.append(v)
+    return seen
+
+
+def _first_hit(order, adm_thr, adm_smax):
+    # first position in `order` admissible for every (cp_threshold, s_max) pair; -1 if none
+    a = adm_thr[:, order]
+    b = adm_smax[:, order]
+    n = len(order)
+    out = np.full((a.shape[0], b.shape[0]), -1, dtype=np.int64)
+    if n == 0:
+        return out
+    step = max(1, BLOCK_ELEMS // max(1, n * b.shape[0]))
+    for i in range(0, a.shape[0], step):
+        both = a[i : i + step, None, :] & b[None, :, :]
+        pos = np.argmax(both, axis=2)
+        hit = np.take_along_axis(both, pos[..., None], axis=2)[..., 0]
+        out[i : i + step] = np.where(hit, order[pos], -1)
+    return out
+
+
+def _sweep_features(df, win, win_stress, gap_hours, thr, smax, kdep):
+    seg = ssum_snow._segment_ids(df["time"], gap_hours)
+    df = df.assign(segment_id=seg)
+    feats = ssum_snow._compute_feats_by_segment(df, int(win), int(win_stress))
+
+    cp = feats["CP"].to_numpy(dtype=float)
+    s_struct = feats["S_struct"].to_numpy(dtype=float)
+    sce_c = np.clip(np.exp(-s_struct), 0.0, 1.0)
+    log_cp = np.log(cp + 1.0)
+    snow = df["snowfall_cm"].to_numpy(dtype=float) > 0.0
+    finite = np.isfinite(cp) & np.isfinite(s_struct)
+
+    thr = np.asarray(thr, dtype=float)
+    smax = np.asarray(smax, dtype=float)
+    kdep = np.asarray(kdep, dtype=float)
+
+    # (n_thr, rows) and (n_smax, rows) halves of the admissibility rule
+    adm_thr = (cp[None, :] >= thr[:, None]) & finite[None, :]
+    adm_smax = s_struct[None, :] <= smax[:, None]
+
+    n_adm = adm_thr.astype(np.int64) @ adm_smax.T.astype(np.int64)
+    n_adm_snow = (adm_thr & snow[None, :]).astype(np.int64) @ adm_smax.T.astype(np.int64)
+
+    # corridor_score = max(k * log(CP + 1), 0) * clip(SCE); for k > 0 the row order
+    # does not depend on k, so one descending order serves every k_depth
+    base = np.where(finite, log_cp * sce_c, -np.inf)
+    order = np.lexsort((np.arange(len(base)), -base))
+    order = order[np.isfinite(base[order])]
+    top_any = _first_hit(order, adm_thr, adm_smax)
+    order_snow = order[snow[order]]
+    top_snow = _first_hit(order_snow, adm_thr, adm_smax)
+
+    times = df["time"]
+    n_snow = int(snow.sum())
+    n_seg = int(seg.nunique())
+
+    def corridor(r, k):
+        if r < 0:
+            return None
+        d = k * log_cp[r]
+        if d < 0.0:
+            d = 0.0
+        return float(d * sce_c[r])
+
+    rows = []
+    for (i, t), (j, s), k in itertools.product(enumerate(thr), enumerate(smax), kdep):
+        na = int(n_adm[i, j])
+        ns = int(n_adm_snow[i, j])
+        ra = int(top_any[i, j])
+        rows.append(
+            {
+                "tct_window_hours": int(win),
+                "stress_window_hours": int(win_stress),
+                "gap_hours": float(gap_hours),
+                "cp_threshold": float(t),
+                "s_max": float(s),
+                "k_depth": float(k),
+                "rows": int(len(df)),
+                "segments": n_seg,
+                "snow_rows": n_snow,
+                "admissible_rows": na,
+                "admissible_snow_rows": ns,
+                "snow_hit_rate": (ns / na) if na > 0 else None,
+                "snow_capture_rate": (ns / n_snow) if n_snow > 0 else None,
+                "top_corridor_admissible": corridor(ra, k),
+                "top_corridor_admissible_time": str(times.iloc[ra]) if ra >= 0 else None,
+                "top_corridor_admissible_snow": corridor(int(top_snow[i, j]), k),
+            }
+        )
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", required=True)
+    ap.add_argument("--out", dest="out_path", required=True)
+
+    # each accepts one or more values and/or start:stop:num ranges
+    ap.add_argument("--tct_window_hours", nargs="+", default=["24"])
+    ap.add_argument("--stress_window_hours", nargs="+", default=None)
+    ap.add_argument("--gap_hours", nargs="+", default=["6.0"])
+
+    ap.add_argument("--cp_threshold", nargs="+", default=["0.08"])
+    ap.add_argument("--s_max", nargs="+", default=["2.5"])
+    ap.add_argument("--k_depth", nargs="+", default=["13.0"])
+
+    args = ap.parse_args()
+
+    wins = _grid_values(args.tct_window_hours, int)
+    stresses = None if args.stress_window_hours is None else _grid_values(args.stress_window_hours, int)
+    gaps = _grid_values(args.gap_hours, float)
+    thr = _grid_values(args.cp_threshold, float)
+    smax = _grid_values(args.s_max, float)
+    kdep = _grid_values(args.k_depth, float)
+
+    t0 = time.perf_counter()
+    df = ssum_snow._read_input(args.in_path)
+
+    feature_sets = []
+    for win in wins:
+        # matches ssum_snow.py: stress window defaults to the TCT window
+        for ws in ([win] if stresses is None else stresses):
+            for gap in gaps:
+                feature_sets.append((win, ws, gap))
+
+    rows = []
+    for win, ws, gap in feature_sets:
+        rows.extend(_sweep_features(df, win, ws, gap, thr, smax, kdep))
+
+    out = pd.DataFrame(rows)
+    d = os.path.dirname(args.out_path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    out.to_csv(args.out_path, index=False)
+    elapsed = time.perf_counter() - t0
+
+    print("SSUM-Snow sweep complete")
+    print(f"Rows: {len(df)}")
+    print(f"Feature sets: {len(feature_sets)}")
+    print(f"Grid points: {len(out)}")
+    print(f"Elapsed: {elapsed:.2f}s")
+    print(f"Saved: {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+# ssum_snow_verify.py
+import os
+import json
+import argparse
+import zipfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ssum_snow_core
+
+# station outputs are found by name, in directories or zips:
+# <Station>/series.csv + <Station>/summary.json (ssum_snow.py / batch out_dir) or
+# <Station>_series.csv + <Station>_summary.json (reference traces, evidence archives)
+SERIES_CSV = "series.csv"
+SUMMARY_JSON = "summary.json"
+
+EXACT_COLS = ["time", "admissible", "segment_id"]
+
+# summary.json fields compared as they are
+SUMMARY_KEYS = ["rows", "start", "end", "segments", "params"]
+
+SNOW_EVENTS = "observed_snow_events_first200"
+
+DEFAULT_ATOL = 1e-12
+DEFAULT_RTOL = 1e-9
+
+CHUNK_ROWS = 1 << 16
+
+BLOCK_BYTES = 1 << 20
+
+
+def _classify(name):
+    # (station, "series" / "summary") for a path inside a results tree, else None
+    parts = name.replace("\\", "/").rstrip("/").split("/")
+    base = parts[-1]
+    for kind, plain in (("series", SERIES_CSV), ("summary", SUMMARY_JSON)):
+        if base == plain and len(parts) > 1 and parts[-2]:
+            return parts[-2], kind
+        if base.endswith("_" + plain):
+            return base[: -len(plain) - 1], kind
+    return None
+
+
+def discover(paths):
+    # station -> {"series": (path, member), "summary": (path, member)}; member is None for plain files.
+    # A station file found twice (e.g. an evidence zip and the reference traces) keeps the first
+    # copy when both are byte-identical; otherwise the later one wins (later paths override
+    # earlier ones) and the choice is printed
+    found = {}
+    for p in paths:
+        if os.path.isdir(p):
+            root = os.path.abspath(p)
+            names = []
+            for d, _, files in os.walk(root):
+                names += [os.path.join(d, f) for f in files]
+            entries = [(n, n, None) for n in sorted(names)]
+        elif zipfile.is_zipfile(p):
+            with zipfile.ZipFile(p) as z:
+                entries = [(m, p, m) for m in sorted(z.namelist())]
+        elif os.path.isfile(p):
+            entries = [(os.path.abspath(p), p, None)]
+        else:
+            raise SystemExit(f"Not a directory, zip or results file: {p}")
+        for name, path, member in entries:
+            hit = _classify(name)
+            if hit is None:
+                continue
+            station, kind = hit
+            slot = found.setdefault(station, {})
+            if kind in slot:
+                if _same_bytes(slot[kind], (path, member)):
+                    continue
+                print(f"Duplicate {kind} for station {station}: using {_label((path, member))} over {_label(slot[kind])}")
+            slot[kind] = (path, member)
+    return found
+
+
+def _label(src):
+    path, member = src
+    return path if member is None else f"{path}:{member}"
+
+
+@contextlib.contextmanager
+def _open(src):
+    path, member = src
+    if member is None:
+        with open(path, "rb") as f:
+            yield f
+    else:
+        with zipfile.ZipFile(path) as z, z.open(member) as f:
+            yield f
+
+
+def _same_bytes(a, b):
+    # identical files (the usual case for deterministic reruns) skip the parsed comparison
+    with _open(a) as fa, _open(b) as fb:
+        while True:
+            x, y = fa.read(BLOCK_BYTES), fb.read(BLOCK_BYTES)
+            if x != y:
+                return False
+            if not x:
+                return True
+
+
+def _load_json(src):
+    with _open(src) as f:
+        return json.loads(f.read().decode("utf-8"))
+
+
+def _tolerance(tol, col):
+    return tol["cols"].get(col, (tol["atol"], tol["rtol"]))
+
+
+def _diverging(x, y, atol, rtol):
+    # rows where |x - y| > atol + rtol * |y| or only one side is NaN
+    nx, ny = np.isnan(x), np.isnan(y)
+    with np.errstate(invalid="ignore"):
+        close = (x == y) | (np.abs(x - y) <= atol + rtol * np.abs(y))
+    return (nx != ny) | (~nx & ~ny & ~close)
+
+
+class _Column:
+    # running comparison state of one series column
+
+    def __init__(self):
+        self.first_row = None
+        self.first_got = None
+        self.first_ref = None
+        self.rows = 0
+        self.max_abs = 0.0
+        self.max_rel = 0.0
+
+    def add(self, bad, start, got, ref):
+        k = int(bad.sum())
+        if k and self.first_row is None:
+            i = int(np.argmax(bad))
+            self.first_row = start + i
+            self.first_got = _jsonable(got[i])
+            self.first_ref = _jsonable(ref[i])
+        self.rows += k
+
+    def to_dict(self):
+        d = {"diverging_rows": self.rows, "first_row": self.first_row}
+        if self.first_row is not None:
+            d["got"] = self.first_got
+            d["ref"] = self.first_ref
+        d["max_abs_diff"] = self.max_abs
+        d["max_rel_diff"] = self.max_rel
+        return d
+
+
+def _jsonable(v):
+    if isinstance(v, (np.floating, float)):
+        return None if np.isnan(v) else float(v)
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.bool_):
+        return bool(v)
+    return None if pd.isna(v) else str(v)
+
+
+def _compare_chunk(g, r, start, state, tol):
+    n = min(len(g), len(r))
+    for c, st in state.items():
+        a, b = g[c].to_numpy()[:n], r[c].to_numpy()[:n]
+        numeric = a.dtype.kind in "iufb" and b.dtype.kind in "iufb"
+        if c in tol["exact"] or not numeric:
+            # exact: same text (NaN only against NaN)
+            sa = np.where(pd.isna(a), "", a.astype(str))
+            sb = np.where(pd.isna(b), "", b.astype(str))
+            st.add(sa != sb, start, a, b)
+            continue
+        x, y = a.astype(float), b.astype(float)
+        atol, rtol = _tolerance(tol, c)
+        st.add(_diverging(x, y, atol, rtol), start, x, y)
+        both = np.isfinite(x) & np.isfinite(y)
+        if both.any():
+            d = np.abs(x[both] - y[both])
+            st.max_abs = max(st.max_abs, float(d.max()))
+            nz = y[both] != 0.0
+            if nz.any():
+                st.max_rel = max(st.max_rel, float((d[nz] / np.abs(y[both][nz])).max()))
+
+
+def compare_series(got, ref, tol, chunk_rows=CHUNK_ROWS):
+    # stream both series.csv files in lockstep chunks -> report dict
+    if _same_bytes(got, ref):
+        return {"ok": True, "identical": True, "issues": []}
+    issues, state = [], {}
+    rows_got = rows_ref = 0
+    text = {c: str for c in tol["exact"]}
+    with _open(got) as fg, _open(ref) as fr:
+        rg = pd.read_csv(fg, chunksize=chunk_rows, float_precision="round_trip", dtype=text)
+        rr = pd.read_csv(fr, chunksize=chunk_rows, float_precision="round_trip", dtype=text)
+        for g, r in _zip_chunks(rg, rr):
+            if g is not None and r is not None:
+                if not state:
+                    if list(g.columns) != list(r.columns):
+                        issues.append(f"columns differ: {list(g.columns)} != {list(r.columns)}")
+                    state = {c: _Column() for c in r.columns if c in g.columns}
+                # rows before this chunk: equal on both sides while both files go on
+                _compare_chunk(g, r, rows_ref, state, tol)
+            rows_got += 0 if g is None else len(g)
+            rows_ref += 0 if r is None else len(r)
+    if rows_got != rows_ref:
+        issues.append(f"rows differ: {rows_got} != {rows_ref}")
+    columns = {c: st.to_dict() for c, st in state.items() if st.rows}
+    for c, d in columns.items():
+        first = f"first at row {d['first_row']} (got {d['got']!r}, ref {d['ref']!r})"
+        issues.append(f"{c}: {d['diverging_rows']} rows, {first}")
+    return {"ok": not issues, "identical": False, "rows": rows_ref, "issues": issues, "columns": columns}
+
+
+def _zip_chunks(a, b):
+    while True:
+        x, y = next(a, None), next(b, None)
+        if x is None and y is None:
+            return
+        yield x, y
+
+
+def _close_enough(a, b, atol, rtol):
+    if a is None or b is None:
+        return a is None and b is None
+    return bool(~_diverging(np.array([float(a)]), np.array([float(b)]), atol, rtol)[0])
+
+
+def compare_summary(got, ref, tol):
+    # the run-independent fields of summary.json; top lists by their ranked values (rows of tied
+    # values may legitimately trade places), snow events by time
+    issues = []
+    for key in SUMMARY_KEYS:
+        if got.get(key) != ref.get(key):
+            issues.append(f"{key}: {got.get(key)!r} != {ref.get(key)!r}")
+    for key, col in ssum_snow_core.TOP_LISTS.items():
+        a, b = got.get(key, []), ref.get(key, [])
+        atol, rtol = _tolerance(tol, col)
+        bad = [i for i, (x, y) in enumerate(zip(a, b)) if not _close_enough(x.get(col), y.get(col), atol, rtol)]
+        if bad:
+            i = bad[0]
+            issues.append(f"{key}[{i}]: {col} {a[i].get(col)!r} != {b[i].get(col)!r}")
+        elif len(a) != len(b):
+            issues.append(f"{key}: {len(a)} entries != {len(b)}")
+    a = [r["time"] for r in got.get(SNOW_EVENTS, [])]
+    b = [r["time"] for r in ref.get(SNOW_EVENTS, [])]
+    if a != b:
+        i = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+        issues.append(f"{SNOW_EVENTS}[{i}]: times differ")
+    return issues
+
+
+def verify_station(job):
+    station, got, ref, tol, chunk_rows = job
+    out = {"station": station, "issues": []}
+    try:
+        if "summary" in ref:
+            if "summary" not in got:
+                out["issues"].append("summary.json missing")
+            else:
+                issues = compare_summary(_load_json(got["summary"]), _load_json(ref["summary"]), tol)
+                out["summary"] = {"ok": not issues, "issues": issues}
+                out["issues"] += [f"summary {x}" for x in issues]
+        if "series" in ref:
+            if "series" not in got:
+                out["issues"].append("series.csv missing")
+            else:
+                out["series"] = compare_series(got["series"], ref["series"], tol, chunk_rows)
+                out["issues"] += [f"series {x}" for x in out["series"]["issues"]]
+    except (Exception, SystemExit) as e:
+        out["issues"].append(f"error: {e}")
+    out["ok"] = not out["issues"]
+    return out
+
+
+def _parse_tol(items):
+    # COL=ATOL,RTOL -> {col: (atol, rtol)}
+    cols = {}
+    for item in items or []:
+        try:
+            col, vals = item.split("=", 1)
+            atol, rtol = (float(v) for v in vals.split(","))
+        except ValueError:
+            raise SystemExit(f"Bad --tol {item!r} (expected COL=ATOL,RTOL)")
+        cols[col] = (atol, rtol)
+    return cols
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    # new outputs and references: result directories, zips or files (see discover)
+    ap.add_argument("--got", nargs="+", required=True)
+    ap.add_argument("--ref", nargs="+", required=True)
+    ap.add_argument("--stations", nargs="+", default=None)
+    # float columns (and top-list values): |got - ref| <= atol + rtol * |ref|; per column COL=ATOL,RTOL
+    ap.add_argument("--atol", type=float, default=DEFAULT_ATOL)
+    ap.add_argument("--rtol", type=float, default=DEFAULT_RTOL)
+    ap.add_argument("--tol", nargs="+", default=None)
+    # compared as text, no tolerance
+    ap.add_argument("--exact", nargs="+", default=EXACT_COLS)
+    ap.add_argument("--chunk_rows", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default=None, help="JSON report")
+    args = ap.parse_args()
+
+    tol = {"atol": args.atol, "rtol": args.rtol, "cols": _parse_tol(args.tol), "exact": list(args.exact)}
+    got, ref = discover(args.got), discover(args.ref)
+    stations = sorted(ref) if args.stations is None else list(args.stations)
+    if not stations:
+        raise SystemExit(f"No reference outputs found in: {args.ref}")
+    missing = [s for s in stations if s not in got]
+    jobs = [(s, got[s], ref.get(s, {}), tol, args.chunk_rows) for s in stations if s in got]
+
+    workers = args.workers or os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(jobs) or 1))
+    if workers == 1:
+        results = [verify_station(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(verify_station, jobs))
+    results += [{"station": s, "ok": False, "issues": ["no outputs found"]} for s in missing]
+    results.sort(key=lambda r: r["station"])
+
+    failed = [r for r in results if not r["ok"]]
+    report = {
+        "stations": len(results),
+        "failed": len(failed),
+        "tolerance": {"atol": args.atol, "rtol": args.rtol, "cols": tol["cols"], "exact": tol["exact"]},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print("SSUM-Snow verify complete")
+    print(f"Stations: {len(results)} (failed: {len(failed)})")
+    print(f"Workers: {workers}")
+    if args.out:
+        print(f"Saved: {args.out}")
+    for r in results:
+        parts = []
+        if "series" in r:
+            s = r["series"]
+            parts.append("series identical" if s.get("identical") else f"series {s.get('rows')} rows")
+        if "summary" in r:
+            parts.append("summary")
+        print(f"  {r['station']}: {'ok' if r['ok'] else 'FAILED'} ({', '.join(parts) or 'nothing compared'})")
+        for issue in r["issues"]:
+            print(f"    {issue}")
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()